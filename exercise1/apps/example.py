@@ -2,8 +2,9 @@ from epyc import *
 from utils import *
 
 # Create a node
-# The maximum number of nodes allocatabel is 2 but this can be modified by
-# changing the MAX_NODES constant in the init module file
+# Nodes created in this way all belong to the same default cluster, which grows
+# every time a new node is created. Independent clusters of any shape can be
+# created with the Cluster class, e.g. Cluster(nodes=4, cores_per_socket=32)
 node1 = Node()
 node2 = Node()
 
@@ -43,4 +44,15 @@ print(f"\t - chain broadcast latency: {chain_bcast(p, 1)} us")
 print(f"\t - binary broadcast latency: {binary_bcast(p, 1)} us")
 print(f"\t - linear reduce latency: {linear_reduce(p, 1)} us")
 print(f"\t - chain reduce latency: {chain_reduce(p, 1)} us")
-print(f"\t - binary reduce latency: {binary_reduce(p, 1)} us")
\ No newline at end of file
+print(f"\t - binary reduce latency: {binary_reduce(p, 1)} us")
+# New nodes can be initialized at any time: as when a new MPI job is started,
+# the processes still running on the other nodes of the default cluster are
+# released
+node3 = Node()
+node4 = Node()
+p = initialize(node3, node4, n_processes=10, mapby='node')
+
+print("Finally we initialize two new nodes with 10 processes, releasing the ones of the first two nodes:")
+print(f"\t - active cores of the new nodes: {node3.active_cores()} and {node4.active_cores()}")
+print(f"\t - active cores of the first nodes: {node1.active_cores()} and {node2.active_cores()}")
+print(f"\t - binary broadcast latency: {binary_bcast(p, 1)} us")
@@ -1,7 +1,8 @@
 # Imports ----------------------------------------------------------------------
-import pandas as pd
-import re
 import os
+import sys
+
+from utils.osu import convert
 
 cwd = os.getcwd()
 
@@ -10,25 +11,14 @@ cwd = os.getcwd()
 input_file = os.path.join(cwd, 'outputs/nbft_reduce.txt')
 output_file = os.path.join(cwd, 'datasets/nbft_reduce.csv')
 
-data = []
-mapby = None
-cores = None
-with open(input_file, 'r') as f:
-    for line in f:
-        if 'A:1|M:' in line:
-            parts = line.split('|')
-            mapby = parts[1].split(':')[1].strip()
-            cores = int(parts[2].split(':')[1].strip())
-            comm = cores-1
-        elif line[0].isdigit():
-            size, latency, min, max, iterations, p50, p95, p99 = line.split()
-            data.append([mapby, cores, comm, size, latency, min, max, iterations, p50, p95, p99])
-
-# Create the DataFrame
-df = pd.DataFrame(data, columns=['mapby', 'p', 'comm', 'size', 'latency', 'min', 'max', 'iterations', 'p50', 'p95', 'p99'])
+# Other files can be given on the command line: OUTPUT INPUT [INPUT ...]
+# (e.g. the splitted nbft_cache.txt, ..., nbft_node.txt files at once)
+input_files = [input_file]
+if len(sys.argv) > 2:
+    output_file, input_files = sys.argv[1], sys.argv[2:]
 
-# Write the reshaped DataFrame to a new CSV file
-df.to_csv(output_file, index=False)
+# Parse the 'A:1|M:' runs in a single streaming pass
+convert(input_files, output_file, 'nbft')
 
 # Version for splitted files ---------------------------------------------------
 # Convert txt to csv -----------------------------------------------------------
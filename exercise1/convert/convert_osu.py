@@ -0,0 +1,8 @@
+# Imports ----------------------------------------------------------------------
+from utils.osu import main
+
+# Convert any OSU output to csv, parquet or arrow ------------------------------
+# Usage: python convert/convert_osu.py {p2p,nbft,collective} OUTPUT INPUT [...]
+# (plain text or gzip compressed inputs, see utils.osu for the formats)
+if __name__ == '__main__':
+    main()
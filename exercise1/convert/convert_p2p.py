@@ -1,7 +1,8 @@
 # Imports ----------------------------------------------------------------------
-import pandas as pd
-import re
 import os
+import sys
+
+from utils.osu import convert
 
 # Current working directory
 cwd = os.getcwd()
@@ -12,25 +13,13 @@ input_file = os.path.join(cwd, 'outputs_full/p2p.txt')
 # outout_file_full = os.path.join(cwd, 'datasets/p2p_full.csv')
 output_file = os.path.join(cwd, 'datasets/p2p.csv') # <- now this is the full output file
 
-data = []
-mapby = None
-with open(input_file, 'r') as f:
-    for line in f:
-        if 'T:osu_latency|M:' in line:
-            parts = line.split('|')
-            mapby = parts[1].split(':')[1].strip()
-            recv = parts[2].split(',')[1].strip()
-            iterations = int(parts[3].split(':')[1].strip())
-            # iterations = 1000
-        elif line[0].isdigit():
-            size, latency, p50, p95, p99 = line.split()
-            data.append([mapby, size, latency, iterations, p50, p95, p99, recv])
-
-df = pd.DataFrame(data, columns=['mapby', 'size', 'latency', 'iterations',
-                                 'p50', 'p95', 'p99', 'recv'])
+# Other files can be given on the command line: OUTPUT INPUT [INPUT ...]
+input_files = [input_file]
+if len(sys.argv) > 2:
+    output_file, input_files = sys.argv[1], sys.argv[2:]
 
-# Save the  DataFrame to a CSV file
-df.to_csv(output_file, index=False)
+# Parse the 'T:osu_latency|M:' runs in a single streaming pass
+convert(input_files, output_file, 'p2p')
 
 # Averages (not needed anymore) ------------------------------------------------
 # df = df.drop(columns=['recv'])
@@ -10,50 +10,53 @@ copyright file COPYRIGHT in the top level OMB directory.
 
 
 from mpi4py import MPI
-from util.osu_util_mpi import util
+from util.osu_util_mpi import util, Timer
 from util.options import Options
 
 
-def osu_alltoall(args):
+def osu_alltoall(args, comm=None):
 
-    comm = MPI.COMM_WORLD
+    if comm is None:
+        comm = MPI.COMM_WORLD
     myid = comm.Get_rank()
     numprocs = comm.Get_size()
 
     options = Options("Alltoall", args)
     util.check_numprocs(numprocs, myid, limit=3)
-    util.print_header(options.benchmark, myid)
+    util.print_header(options.benchmark, myid, options)
 
     structure = util.find_structure(options.buffer)
     s_buf = util.allocate(options.max_message_size*numprocs, structure)
     r_buf = util.allocate(options.max_message_size*numprocs, structure)
+    timer = Timer(comm, options)
+    samples = timer.samples
 
     for size in util.message_sizes(options):
         if size > options.large_message_size:
             options.skip = options.skip_large
             options.iterations = options.iterations_large
-        iterations = list(range(options.iterations+options.skip))
 
         s_msg = [s_buf, size, MPI.BYTE]
         r_msg = [r_buf, size, MPI.BYTE]
 
         if options.pickle:
-            s_msg = s_buf[0:size]
+            s_msg = [util.pickle_message(s_buf, size)] * numprocs
             comm.Barrier()
-            for i in iterations:
-                if i == options.skip:
+            for batch in timer.batches(options.iterations, options.skip):
+                for i in batch:
                     t_start = MPI.Wtime()
-                r_msg = comm.alltoall([(s_msg) for i in range(numprocs)])
-            t_end = MPI.Wtime()
+                    r_msg = comm.alltoall(s_msg)
+                    samples[i] = MPI.Wtime() - t_start
             comm.Barrier()
         else:
             comm.Barrier()
-            for i in iterations:
-                if i == options.skip:
+            for batch in timer.batches(options.iterations, options.skip):
+                for i in batch:
                     t_start = MPI.Wtime()
-                comm.Alltoall(s_msg, r_msg)
-            t_end = MPI.Wtime()
+                    comm.Alltoall(s_msg, r_msg)
+                    samples[i] = MPI.Wtime() - t_start
             comm.Barrier()
 
-        util.print_stats(t_end, t_start, options.iterations,
-                         myid, comm, numprocs, size)
+        timer.report(size)
+
+    return timer.rows
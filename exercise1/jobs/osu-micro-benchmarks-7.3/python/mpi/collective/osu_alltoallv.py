@@ -11,19 +11,20 @@ copyright file COPYRIGHT in the top level OMB directory.
 
 from mpi4py import MPI
 from array import array
-from util.osu_util_mpi import util
+from util.osu_util_mpi import util, Timer
 from util.options import Options
 
 
-def osu_alltoallv(args):
+def osu_alltoallv(args, comm=None):
 
-    comm = MPI.COMM_WORLD
+    if comm is None:
+        comm = MPI.COMM_WORLD
     myid = comm.Get_rank()
     numprocs = comm.Get_size()
 
     options = Options("Alltoallv", args)
     util.check_numprocs(numprocs, myid, limit=3)
-    util.print_header(options.benchmark, myid)
+    util.print_header(options.benchmark, myid, options)
 
     structure = util.find_structure(options.buffer)
 
@@ -34,12 +35,13 @@ def osu_alltoallv(args):
     s_displs = array_int(numprocs)
     r_counts = array_int(numprocs)
     r_displs = array_int(numprocs)
+    timer = Timer(comm, options)
+    samples = timer.samples
 
     for size in util.message_sizes(options):
         if size > options.large_message_size:
             options.skip = options.skip_large
             options.iterations = options.iterations_large
-        iterations = list(range(options.iterations+options.skip))
         disp = 0
         for i in range(numprocs):
             s_counts[i] = r_counts[i] = size
@@ -49,12 +51,13 @@ def osu_alltoallv(args):
         r_msg = [r_buf, (r_counts, r_displs), MPI.BYTE]
 
         comm.Barrier()
-        for i in iterations:
-            if i == options.skip:
+        for batch in timer.batches(options.iterations, options.skip):
+            for i in batch:
                 t_start = MPI.Wtime()
-            comm.Alltoallv(s_msg, r_msg)
-        t_end = MPI.Wtime()
+                comm.Alltoallv(s_msg, r_msg)
+                samples[i] = MPI.Wtime() - t_start
         comm.Barrier()
 
-        util.print_stats(t_end, t_start, options.iterations,
-                         myid, comm, numprocs, size)
+        timer.report(size)
+
+    return timer.rows
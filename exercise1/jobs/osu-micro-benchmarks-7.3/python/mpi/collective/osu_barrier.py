@@ -9,30 +9,32 @@ copyright file COPYRIGHT in the top level OMB directory.
 """
 
 from mpi4py import MPI
-from util.osu_util_mpi import util
+from util.osu_util_mpi import util, Timer
 from util.options import Options
 
 
-def osu_barrier(args):
+def osu_barrier(args, comm=None):
 
-    comm = MPI.COMM_WORLD
+    if comm is None:
+        comm = MPI.COMM_WORLD
     myid = comm.Get_rank()
     numprocs = comm.Get_size()
 
     options = Options("Barrier", args)
     util.check_numprocs(numprocs, myid, limit=3)
-    util.print_header(options.benchmark, myid)
+    util.print_header(options.benchmark, myid, options)
 
-    iterations = list(range(options.iterations+options.skip))
+    timer = Timer(comm, options)
+    samples = timer.samples
 
     comm.Barrier()
-    for i in iterations:
-        if i == options.skip:
+    for batch in timer.batches(options.iterations, options.skip):
+        for i in batch:
             t_start = MPI.Wtime()
-        comm.Barrier()
-    t_end = MPI.Wtime()
+            comm.Barrier()
+            samples[i] = MPI.Wtime() - t_start
     comm.Barrier()
 
-    avg_lat = util.avg_lat(t_end, t_start, options.iterations, comm, numprocs)
-    if myid == 0:
-        print('%-10d%18.2f' % (0, avg_lat))
+    timer.report(0)
+
+    return timer.rows
@@ -9,47 +9,50 @@ copyright file COPYRIGHT in the top level OMB directory.
 """
 
 from mpi4py import MPI
-from util.osu_util_mpi import util
+from util.osu_util_mpi import util, Timer
 from util.options import Options
 
 
-def osu_bcast(args):
+def osu_bcast(args, comm=None):
 
-    comm = MPI.COMM_WORLD
+    if comm is None:
+        comm = MPI.COMM_WORLD
     myid = comm.Get_rank()
     numprocs = comm.Get_size()
 
     options = Options("Bcast", args)
     util.check_numprocs(numprocs, myid, limit=3)
-    util.print_header(options.benchmark, myid)
+    util.print_header(options.benchmark, myid, options)
 
     structure = util.find_structure(options.buffer)
     buf = util.allocate(options.max_message_size, structure)
+    timer = Timer(comm, options)
+    samples = timer.samples
 
     for size in util.message_sizes(options):
         if size > options.large_message_size:
             options.skip = options.skip_large
             options.iterations = options.iterations_large
-        iterations = list(range(options.iterations+options.skip))
         msg = [buf, size, MPI.BYTE]
 
         if(options.pickle):
-            msg = buf[0:size]
+            msg = util.pickle_message(buf, size)
             comm.Barrier()
-            for i in iterations:
-                if i == options.skip:
+            for batch in timer.batches(options.iterations, options.skip):
+                for i in batch:
                     t_start = MPI.Wtime()
-                msg = comm.bcast(msg, 0)
-            t_end = MPI.Wtime()
+                    msg = comm.bcast(msg, 0)
+                    samples[i] = MPI.Wtime() - t_start
             comm.Barrier()
         else:
             comm.Barrier()
-            for i in iterations:
-                if i == options.skip:
+            for batch in timer.batches(options.iterations, options.skip):
+                for i in batch:
                     t_start = MPI.Wtime()
-                comm.Bcast(msg, 0)
-            t_end = MPI.Wtime()
+                    comm.Bcast(msg, 0)
+                    samples[i] = MPI.Wtime() - t_start
             comm.Barrier()
 
-        util.print_stats(t_end, t_start, options.iterations,
-                         myid, comm, numprocs, size)
+        timer.report(size)
+
+    return timer.rows
@@ -10,53 +10,56 @@ copyright file COPYRIGHT in the top level OMB directory.
 
 from mpi4py import MPI
 import numpy as np
-from util.osu_util_mpi import util
+from util.osu_util_mpi import util, Timer
 from util.options import Options
 
 
-def osu_reduce(args):
+def osu_reduce(args, comm=None):
 
-    comm = MPI.COMM_WORLD
+    if comm is None:
+        comm = MPI.COMM_WORLD
     myid = comm.Get_rank()
     numprocs = comm.Get_size()
 
     options = Options("Reduce", args)
     util.check_numprocs(numprocs, myid, limit=3)
-    util.print_header(options.benchmark, myid)
+    util.print_header(options.benchmark, myid, options)
 
     structure = util.find_structure(options.buffer, reduce=True)
     r_buf = util.allocate((int)(options.max_message_size/4), structure)
     s_buf = util.allocate((int)(options.max_message_size/4), structure)
+    timer = Timer(comm, options)
+    samples = timer.samples
 
     for size in util.message_sizes(options):
         if size > options.large_message_size:
             options.skip = options.skip_large
             options.iterations = options.iterations_large
-        iterations = list(range(options.iterations+options.skip))
 
-        s_msg = [s_buf, size/4, MPI.FLOAT]
+        s_msg = [s_buf, size//4, MPI.FLOAT]
         if myid == 0:
-            r_msg = [r_buf, size/4, MPI.FLOAT]
+            r_msg = [r_buf, size//4, MPI.FLOAT]
         else:
             r_msg = None
 
         if options.pickle:
-            s_msg = s_buf[0:int(size/4)]
+            s_msg = util.pickle_message(s_buf, size//4)
             comm.Barrier()
-            for i in iterations:
-                if i == options.skip:
+            for batch in timer.batches(options.iterations, options.skip):
+                for i in batch:
                     t_start = MPI.Wtime()
-                r_msg = comm.reduce(s_msg, op=MPI.SUM, root=0)
-            t_end = MPI.Wtime()
+                    r_msg = comm.reduce(s_msg, op=MPI.SUM, root=0)
+                    samples[i] = MPI.Wtime() - t_start
             comm.Barrier()
         else:
             comm.Barrier()
-            for i in iterations:
-                if i == options.skip:
+            for batch in timer.batches(options.iterations, options.skip):
+                for i in batch:
                     t_start = MPI.Wtime()
-                comm.Reduce(s_msg, r_msg, op=MPI.SUM, root=0)
-            t_end = MPI.Wtime()
+                    comm.Reduce(s_msg, r_msg, op=MPI.SUM, root=0)
+                    samples[i] = MPI.Wtime() - t_start
             comm.Barrier()
 
-        util.print_stats(t_end, t_start, options.iterations,
-                         myid, comm, numprocs, size)
+        timer.report(size)
+
+    return timer.rows
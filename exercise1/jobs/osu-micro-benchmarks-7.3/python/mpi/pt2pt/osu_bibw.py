@@ -11,10 +11,12 @@ copyright file COPYRIGHT in the top level OMB directory.
 from mpi4py import MPI
 from util.osu_util_mpi import util
 from util.options import Options
+from util.output import result_row
 
-def osu_bibw(args):
+def osu_bibw(args, comm=None):
 
-    comm = MPI.COMM_WORLD
+    if comm is None:
+        comm = MPI.COMM_WORLD
     myid = comm.Get_rank()
     numprocs = comm.Get_size()
 
@@ -26,26 +28,27 @@ def osu_bibw(args):
     s_buf = util.allocate(options.max_message_size, structure)
     r_buf = util.allocate(options.max_message_size*2, structure)
 
-    if myid == 0:
+    rows = []
+    if myid == 0 and options.format == 'text':
         print ('# OMB-Py MPI %s Test' % (options.benchmark))
         print ('# %-8s%18s' % ("Size (B)", "Bandwidth (MB/s)"))
 
     window_size = 64
+    window_sizes = range(window_size)
+    send_request = [MPI.REQUEST_NULL] * window_size
+    recv_request = [MPI.REQUEST_NULL] * window_size
     for size in util.message_sizes(options):
         if size > options.large_message_size:
             options.skip = options.skip_large
             options.iterations = options.iterations_large
 
-        iterations = list(range(options.iterations+options.skip))
-        window_sizes = list(range(window_size))
+        iterations = range(options.iterations+options.skip)
         s_msg = [s_buf, size, MPI.BYTE]
         r_msg = [r_buf, size, MPI.BYTE]
-        send_request = [MPI.REQUEST_NULL] * window_size
-        recv_request = [MPI.REQUEST_NULL] * window_size
         
         #TODO review pickle code
         if options.pickle:
-            s_msg = s_buf[0:size]
+            s_msg = util.pickle_message(s_buf, size)
             r_msg = r_buf
             comm.Barrier()
             if myid == 0:
@@ -68,28 +71,41 @@ def osu_bibw(args):
                     MPI.Request.Waitall(send_request)
                     MPI.Request.Waitall(recv_request)
         else:
+            # Persistent requests of the window, started at every iteration
+            partner = 1 - myid
+            for j in window_sizes:
+                recv_request[j] = comm.Recv_init(
+                    r_msg, partner, 10 if myid == 0 else 100)
+                send_request[j] = comm.Send_init(
+                    s_msg, partner, 100 if myid == 0 else 10)
             comm.Barrier()
             if myid == 0:
                 for i in iterations:
                     if i == options.skip:
                         t_start = MPI.Wtime()
-                    for j in window_sizes:
-                        recv_request[j] = comm.Irecv(r_msg, 1, 10)
-                    for j in window_sizes:
-                        send_request[j] = comm.Isend(s_msg, 1, 100)
+                    MPI.Prequest.Startall(recv_request)
+                    MPI.Prequest.Startall(send_request)
                     MPI.Request.Waitall(send_request)
                     MPI.Request.Waitall(recv_request)
                 t_end = MPI.Wtime()
             elif myid == 1:
                 for i in iterations:
-                    for j in window_sizes:
-                        recv_request[j] = comm.Irecv(r_msg, 0, 100)
-                    for j in window_sizes:
-                        send_request[j] = comm.Isend(s_msg, 0, 10)
+                    MPI.Prequest.Startall(recv_request)
+                    MPI.Prequest.Startall(send_request)
                     MPI.Request.Waitall(send_request)
                     MPI.Request.Waitall(recv_request)
+            for j in window_sizes:
+                send_request[j].Free()
+                recv_request[j].Free()
         
         if myid == 0:
             bw = size / 1e6 * options.iterations * window_size * 2
             time = t_end - t_start
-            print ('%-10d%18.2f' % (size, bw/time), flush=True)
+            if options.format == 'text':
+                print ('%-10d%18.2f' % (size, bw/time), flush=True)
+            else:
+                rows.append(result_row(options, numprocs, size=size,
+                                       iterations=options.iterations,
+                                       bandwidth=bw/time))
+
+    return rows
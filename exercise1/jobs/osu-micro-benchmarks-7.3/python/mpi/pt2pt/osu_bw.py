@@ -11,10 +11,12 @@ copyright file COPYRIGHT in the top level OMB directory.
 from mpi4py import MPI
 from util.osu_util_mpi import util
 from util.options import Options
+from util.output import result_row
 
-def osu_bw(args):
+def osu_bw(args, comm=None):
 
-    comm = MPI.COMM_WORLD
+    if comm is None:
+        comm = MPI.COMM_WORLD
     myid = comm.Get_rank()
     numprocs = comm.Get_size()
 
@@ -27,25 +29,26 @@ def osu_bw(args):
     r_buf = util.allocate(options.max_message_size*2, structure)
 
 
-    if myid == 0:
+    rows = []
+    if myid == 0 and options.format == 'text':
         print ('# OMB-Py MPI %s Test' % (options.benchmark))
         print ('# %-8s%18s' % ("Size (B)", "Bandwidth (MB/s)"))
 
     window_size = 64
+    window_sizes = range(window_size)
+    requests = [MPI.REQUEST_NULL] * window_size
     for size in util.message_sizes(options):
         if size > options.large_message_size:
             options.skip = options.skip_large
             options.iterations = options.iterations_large
 
-        iterations = list(range(options.iterations+options.skip))
-        window_sizes = list(range(window_size))
-        requests = [MPI.REQUEST_NULL] * window_size
+        iterations = range(options.iterations+options.skip)
         
         #TODO review pickle code
         if options.pickle:
             comm.Barrier()
             if myid == 0:
-                s_msg = s_buf[0:size]
+                s_msg = util.pickle_message(s_buf, size)
                 for i in iterations:
                     if i == options.skip:
                         t_start = MPI.Wtime()
@@ -55,7 +58,7 @@ def osu_bw(args):
                     r_msg = comm.recv(source=1, tag=101)
                 t_end = MPI.Wtime()
             elif myid == 1:
-                s_msg = s_buf[0:4]
+                s_msg = util.pickle_message(s_buf, 4)
                 r_msg = r_buf
                 for i in iterations:
                     for j in window_sizes:
@@ -63,28 +66,42 @@ def osu_bw(args):
                     MPI.Request.Waitall(requests)
                     comm.send(s_msg, 0, 101)
         else:
-            comm.Barrier()
+            # Persistent requests of the window, started at every iteration
             if myid == 0:
                 s_msg = [s_buf, size, MPI.BYTE]
                 r_msg = [r_buf,    4, MPI.BYTE]
+                for j in window_sizes:
+                    requests[j] = comm.Send_init(s_msg, 1, 100)
+            elif myid == 1:
+                s_msg = [s_buf,    4, MPI.BYTE]
+                r_msg = [r_buf, size, MPI.BYTE]
+                for j in window_sizes:
+                    requests[j] = comm.Recv_init(r_msg, 0, 100)
+            comm.Barrier()
+            if myid == 0:
                 for i in iterations:
                     if i == options.skip:
                         t_start = MPI.Wtime()
-                    for j in window_sizes:
-                        requests[j] = comm.Isend(s_msg, 1, 100)
+                    MPI.Prequest.Startall(requests)
                     MPI.Request.Waitall(requests)
                     comm.Recv(r_msg, 1, 101)
                 t_end = MPI.Wtime()
             elif myid == 1:
-                s_msg = [s_buf,    4, MPI.BYTE]
-                r_msg = [r_buf, size, MPI.BYTE]
                 for i in iterations:
-                    for j in window_sizes:
-                        requests[j] = comm.Irecv(r_msg, 0, 100)
+                    MPI.Prequest.Startall(requests)
                     MPI.Request.Waitall(requests)
                     comm.Send(s_msg, 0, 101)
+            for j in window_sizes:
+                requests[j].Free()
 
         if myid == 0:
             bw = size / 1e6 * options.iterations * window_size
             time = t_end - t_start
-            print ('%-10d%18.2f' % (size, bw/time), flush=True)
\ No newline at end of file
+            if options.format == 'text':
+                print ('%-10d%18.2f' % (size, bw/time), flush=True)
+            else:
+                rows.append(result_row(options, numprocs, size=size,
+                                       iterations=options.iterations,
+                                       bandwidth=bw/time))
+
+    return rows
\ No newline at end of file
@@ -9,69 +9,76 @@ copyright file COPYRIGHT in the top level OMB directory.
 """
 
 from mpi4py import MPI
-from util.osu_util_mpi import util
+from util.osu_util_mpi import util, Timer
 from util.options import Options
+from util.locality import placement_sweep
 
-def osu_multi_lat(args):
+def osu_multi_lat(args, comm=None):
 
-    comm = MPI.COMM_WORLD
+    if comm is None:
+        comm = MPI.COMM_WORLD
+    if args.placement:
+        return placement_sweep(osu_multi_lat, args, comm, 'osu_multi_lat')
     myid = comm.Get_rank()
     numprocs = comm.Get_size()
-    pairs = numprocs/2
+    pairs = numprocs//2
 
     options = Options("Multi Latency", args)
 
     structure = util.find_structure(options.buffer)
     s_buf = util.allocate(options.max_message_size, structure)
     r_buf = util.allocate(options.max_message_size*2, structure)
-    util.print_header(options.benchmark, myid)
+    util.print_header(options.benchmark, myid, options)
+    timer = Timer(comm, options, scale=2)
+    samples = timer.samples
 
     for size in util.message_sizes(options):
         if size > options.large_message_size:
             options.skip = options.skip_large
             options.iterations = options.iterations_large
 
-        iterations = list(range(options.iterations+options.skip))
         s_msg = [s_buf, size, MPI.BYTE]
         r_msg = [r_buf, size, MPI.BYTE]
         
         #TODO review pickle code
         if options.pickle:
-            s_msg = s_buf[0:size]
+            s_msg = util.pickle_message(s_buf, size)
             comm.Barrier()
             if myid < pairs:
                 partner = myid + pairs
-                for i in iterations:
-                    if i == options.skip:
+                for batch in timer.batches(options.iterations, options.skip):
+                    for i in batch:
                         t_start = MPI.Wtime()
-                    comm.send(s_msg, partner, 1)
-                    r_msg = comm.recv(source=partner, tag=1)
-                t_end = MPI.Wtime()
+                        comm.send(s_msg, partner, 1)
+                        r_msg = comm.recv(source=partner, tag=1)
+                        samples[i] = MPI.Wtime() - t_start
             else:
                 partner = myid - pairs
-                for i in iterations:
-                    if i == options.skip:
+                for batch in timer.batches(options.iterations, options.skip):
+                    for i in batch:
                         t_start = MPI.Wtime()
-                    r_msg = comm.recv(source=partner, tag=1)
-                    comm.send(s_msg, partner, 1)
-                t_end = MPI.Wtime()
+                        r_msg = comm.recv(source=partner, tag=1)
+                        comm.send(s_msg, partner, 1)
+                        samples[i] = MPI.Wtime() - t_start
         else:
             comm.Barrier()
             if myid < pairs:
                 partner = myid + pairs
-                for i in iterations:
-                    if i == options.skip:
+                for batch in timer.batches(options.iterations, options.skip):
+                    for i in batch:
                         t_start = MPI.Wtime()
-                    comm.Send(s_msg, partner, 1)
-                    comm.Recv(r_msg, partner, 1)
-                t_end = MPI.Wtime()
+                        comm.Send(s_msg, partner, 1)
+                        comm.Recv(r_msg, partner, 1)
+                        samples[i] = MPI.Wtime() - t_start
             else:
                 partner = myid - pairs
-                for i in iterations:
-                    if i == options.skip:
+                for batch in timer.batches(options.iterations, options.skip):
+                    for i in batch:
                         t_start = MPI.Wtime()
-                    comm.Recv(r_msg, partner, 1)
-                    comm.Send(s_msg, partner, 1)
-                t_end = MPI.Wtime()
+                        comm.Recv(r_msg, partner, 1)
+                        comm.Send(s_msg, partner, 1)
+                        samples[i] = MPI.Wtime() - t_start
         
-        util.print_stats(t_end, t_start, 2*options.iterations, myid, comm, numprocs, size)
\ No newline at end of file
+        timer.report(size)
+
+    return timer.rows
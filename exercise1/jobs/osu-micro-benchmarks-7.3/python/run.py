@@ -8,8 +8,10 @@ For detailed copyright and licensing information, please refer to the
 copyright file COPYRIGHT in the top level OMB directory.
 """
 
+import copy
 import sys
 import util.parser as argparser
+from util.output import write_rows
 import numpy as np
 from mpi4py import MPI
 from mpi.collective import osu_allgather
@@ -30,47 +32,125 @@ from mpi.pt2pt import osu_bw
 from mpi.pt2pt import osu_latency
 from mpi.pt2pt import osu_multi_lat
 
-args = argparser.get_parser().parse_args()
-benchmark = args.benchmark
-
-if "/" in benchmark:
-    benchmark = benchmark.split("/")[1]
-if "osu_" in benchmark:
-    benchmark = benchmark.replace('osu_','')
-
-if(benchmark=='allgather'):
-    osu_allgather.osu_allgather(args=args)
-elif(benchmark=='allgatherv'):
-    osu_allgatherv.osu_allgatherv(args=args)
-elif(benchmark=='allreduce'):
-    osu_allreduce.osu_allreduce(args=args)
-elif(benchmark=='alltoall'):
-    osu_alltoall.osu_alltoall(args=args)
-elif(benchmark=='alltoallv'):
-    osu_alltoallv.osu_alltoallv(args=args)
-elif(benchmark=='barrier'):
-    osu_barrier.osu_barrier(args)
-elif(benchmark=='bcast'):
-    osu_bcast.osu_bcast(args=args)
-elif(benchmark=='gather'):
-    osu_gather.osu_gather(args=args)
-elif(benchmark=='gatherv'):
-    osu_gatherv.osu_gatherv(args=args)
-elif(benchmark=='reduce_scatter'):
-    osu_reduce_scatter.osu_reduce_scatter(args=args)
-elif(benchmark=='reduce'):
-    osu_reduce.osu_reduce(args=args)
-elif(benchmark=='scatter'):
-    osu_scatter.osu_scatter(args=args)
-elif(benchmark=='scatterv'):
-    osu_scatterv.osu_scatterv(args=args)
-elif(benchmark=='async_lat'):
-    async_osu_latency.async_osu_latency(args=args)
-elif(benchmark=='bibw'):
-    osu_bibw.osu_bibw(args=args)
-elif(benchmark=='bw'):
-    osu_bw.osu_bw(args=args)
-elif(benchmark=='latency'):
-    osu_latency.osu_latency(args=args)
-elif(benchmark=='multi_lat'):
-    osu_multi_lat.osu_multi_lat(args=args)
+# Benchmarks by name, each returning the rows of its results
+BENCHMARKS = {
+    'allgather': osu_allgather.osu_allgather,
+    'allgatherv': osu_allgatherv.osu_allgatherv,
+    'allreduce': osu_allreduce.osu_allreduce,
+    'alltoall': osu_alltoall.osu_alltoall,
+    'alltoallv': osu_alltoallv.osu_alltoallv,
+    'barrier': osu_barrier.osu_barrier,
+    'bcast': osu_bcast.osu_bcast,
+    'gather': osu_gather.osu_gather,
+    'gatherv': osu_gatherv.osu_gatherv,
+    'reduce_scatter': osu_reduce_scatter.osu_reduce_scatter,
+    'reduce': osu_reduce.osu_reduce,
+    'scatter': osu_scatter.osu_scatter,
+    'scatterv': osu_scatterv.osu_scatterv,
+    'bibw': osu_bibw.osu_bibw,
+    'bw': osu_bw.osu_bw,
+    'latency': osu_latency.osu_latency,
+    'multi_lat': osu_multi_lat.osu_multi_lat,
+}
+
+# Benchmarks that need exactly two processes
+PAIRS = {'bibw', 'bw', 'latency'}
+
+# Benchmarks choosing their pairs by locality with --placement, on any number
+# of processes
+PLACEMENT = {'latency', 'multi_lat'}
+
+
+def benchmark_name(name):
+    if "/" in name:
+        name = name.split("/")[1]
+    if "osu_" in name:
+        name = name.replace('osu_','')
+    return name
+
+
+def process_counts(schedule, world_size):
+    """Numbers of processes of a schedule like '2,4,8:64:8' (ranges as seq)."""
+    if schedule is None:
+        return [world_size]
+    counts = []
+    for item in schedule.split(','):
+        bounds = [int(bound) for bound in item.split(':')]
+        if len(bounds) == 1:
+            counts.append(bounds[0])
+        else:
+            first, last = bounds[0], bounds[1]
+            step = bounds[2] if len(bounds) > 2 else 1
+            counts.extend(range(first, last + 1, step))
+    return counts
+
+
+def sub_communicator(world, nprocs):
+    """Communicator of the first nprocs ranks (COMM_NULL for the others).
+
+    The ranks keep the order of COMM_WORLD, so a run on the first nprocs
+    ranks places the processes as a launch of nprocs processes with the same
+    mapping. Only the ranks of the group take part in its creation.
+    """
+    if nprocs == world.Get_size():
+        return world
+    if world.Get_rank() >= nprocs:
+        return MPI.COMM_NULL
+    group = world.Get_group().Range_incl([(0, nprocs - 1, 1)])
+    comm = world.Create_group(group)
+    group.Free()
+    return comm
+
+
+parser = argparser.get_parser()
+args = parser.parse_args()
+world = MPI.COMM_WORLD
+
+benchmarks = [benchmark_name(name)
+              for name in (args.benchmark or '').split(',')]
+for name in benchmarks:
+    if name not in BENCHMARKS:
+        parser.error("unknown benchmark: %s" % name)
+try:
+    counts = process_counts(args.nprocs, world.Get_size())
+except ValueError:
+    parser.error("invalid --nprocs: %s" % args.nprocs)
+for nprocs in counts:
+    if not 2 <= nprocs <= world.Get_size():
+        parser.error("cannot run on %d processes (%d available)"
+                     % (nprocs, world.Get_size()))
+    for name in benchmarks:
+        if args.placement and name in PLACEMENT:
+            continue
+        if name in PAIRS and nprocs != 2:
+            parser.error("%s needs exactly 2 processes, not %d"
+                         % (name, nprocs))
+        if name == 'multi_lat' and nprocs % 2:
+            parser.error("multi_lat needs an even number of processes")
+if args.format == 'parquet' and args.output is None:
+    parser.error("--format parquet needs an --output file")
+if args.format == 'parquet':
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        parser.error("--format parquet needs pyarrow")
+
+# All the runs share the launch: each number of processes runs every benchmark
+# on its own communicator. Results in text are printed by the benchmarks, the
+# others are collected on rank 0 and written at once
+rows = []
+for nprocs in counts:
+    comm = sub_communicator(world, nprocs)
+    if comm == MPI.COMM_NULL:
+        continue
+    for name in benchmarks:
+        run_args = copy.copy(args)
+        run_args.benchmark = name
+        if args.format == 'text' and len(counts) > 1 and comm.Get_rank() == 0:
+            print('# Processes: %d' % nprocs, flush=True)
+        rows += BENCHMARKS[name](args=run_args, comm=comm)
+    if comm != world:
+        comm.Free()
+
+if args.format != 'text' and world.Get_rank() == 0:
+    write_rows(rows, args.format, args.output)
@@ -0,0 +1,198 @@
+"""
+Copyright (C) 2002-2022 the Network-Based Computing Laboratory
+(NBCL), The Ohio State University.
+
+Contact: Dr. D. K. Panda (panda@cse.ohio-state.edu)
+
+For detailed copyright and licensing information, please refer to the
+copyright file COPYRIGHT in the top level OMB directory.
+"""
+
+import copy
+import os
+import socket
+import sys
+from collections import namedtuple
+from util.options import Options
+
+# Locality classes of a pair of ranks, from the closest one: same L3 cache
+# (CCX), same socket, same node and different nodes (the 'mapby' of the p2p
+# dataset)
+CLASSES = ['cache', 'core', 'socket', 'node']
+
+# Hardware locality of a rank: its host and the CPUs it is bound to, with their
+# socket and L3 cache (None when the CPUs span more of them or are unknown)
+Locality = namedtuple('Locality', ['rank', 'host', 'cpu', 'socket', 'l3'])
+
+
+# Content of a sysfs file of a CPU, None if it cannot be read
+def _sysfs(cpu, path):
+    try:
+        with open('/sys/devices/system/cpu/cpu%d/%s' % (cpu, path)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+# Identifier of the L3 cache of a CPU (the list of the CPUs sharing it)
+def _l3(cpu):
+    index = 0
+    while True:
+        level = _sysfs(cpu, 'cache/index%d/level' % index)
+        if level is None:
+            return None
+        if level == '3':
+            return _sysfs(cpu, 'cache/index%d/shared_cpu_list' % index)
+        index += 1
+
+
+# The common value of the CPUs, None if they differ
+def _common(values):
+    values = set(values)
+    return values.pop() if len(values) == 1 else None
+
+
+def discover(comm):
+    """Hardware locality of every rank of the communicator (collective).
+
+    Every rank reads its host name and CPU affinity, and the socket and L3
+    cache of its CPUs from sysfs, and the localities are exchanged with an
+    allgather.
+
+    Returns
+    -------
+    list of Locality
+        The locality of every rank, in rank order.
+    """
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = []
+    local = Locality(comm.Get_rank(), socket.gethostname(),
+                     cpus[0] if cpus else None,
+                     _common(_sysfs(c, 'topology/physical_package_id')
+                             for c in cpus),
+                     _common(_l3(c) for c in cpus))
+    return comm.allgather(local)
+
+
+def locality_class(a, b):
+    """Locality class of a pair of ranks, None if it cannot be told."""
+    if a.host != b.host:
+        return 'node'
+    if a.socket is None or b.socket is None:
+        return None
+    if a.socket != b.socket:
+        return 'socket'
+    if a.l3 is None or b.l3 is None:
+        return None
+    return 'core' if a.l3 != b.l3 else 'cache'
+
+
+def unknown_ranks(localities):
+    """Ranks sharing a host with a rank whose relative locality is unknown.
+
+    This is the case of the ranks that are not bound to a single socket or
+    L3 cache (e.g. without ``--bind-to core``): their pairs on the same host
+    have no locality class and are never measured.
+    """
+    unknown = set()
+    for a in localities:
+        for b in localities[a.rank + 1:]:
+            if a.host == b.host and locality_class(a, b) is None:
+                unknown.update((a.rank, b.rank))
+    return sorted(unknown)
+
+
+def representative_pairs(localities):
+    """Disjoint pairs of ranks of every locality class.
+
+    The pairs of a class are matched greedily in rank order, so the first
+    pair of every class includes rank 0 whenever rank 0 has a partner of
+    that class.
+
+    Returns
+    -------
+    dict
+        The list of pairs of each class with at least one pair.
+    """
+    pairs = {}
+    for mapby in CLASSES:
+        matched = set()
+        for a in localities:
+            if a.rank in matched:
+                continue
+            for b in localities[a.rank + 1:]:
+                if b.rank not in matched and locality_class(a, b) == mapby:
+                    matched.update((a.rank, b.rank))
+                    pairs.setdefault(mapby, []).append((a.rank, b.rank))
+                    break
+    return pairs
+
+
+def placement_sweep(benchmark, args, comm, name, max_pairs=None):
+    """Run a pair benchmark on representative pairs of every locality class.
+
+    The classes are measured one after the other, each on a communicator of
+    its pairs: the first ranks of the pairs followed by their partners, as
+    osu_multi_lat expects. Every row of the results carries the class as its
+    'mapby', and in text format each class is preceded by the header of the
+    latency job (``T:<test>|M:<mapby>|C:<cpu>,<cpu>|I:<iterations>``). The
+    header names the CPUs of the first pair, or its ranks when the CPU
+    affinity is not available, and the configured (maximum) number of
+    iterations: with ``--tolerance`` a run may stop earlier (see the
+    iterations of ``--full``). Rank 0 warns about the ranks whose same-host
+    pairs cannot be classified (see `unknown_ranks`).
+
+    Parameters
+    ----------
+    benchmark : callable
+        The benchmark, called with the arguments and the communicator.
+    args : argparse.Namespace
+        The arguments of the benchmark.
+    comm : MPI.Comm
+        The communicator of all the ranks to choose the pairs from.
+    name : str
+        The name of the test in the headers (e.g. 'osu_latency').
+    max_pairs : int, optional
+        The most pairs measured at once for each class, all by default.
+
+    Returns
+    -------
+    list of dict
+        The rows of the results of all the classes on rank 0.
+    """
+    localities = discover(comm)
+    unknown = unknown_ranks(localities)
+    if unknown and comm.Get_rank() == 0:
+        print("Warning: unknown socket or L3 cache of %d ranks (e.g. rank %d),"
+              " their pairs on the same host are not measured: bind the ranks"
+              " with `mpirun --bind-to core`" % (len(unknown), unknown[0]),
+              file=sys.stderr, flush=True)
+
+    rows = []
+    for mapby, pairs in representative_pairs(localities).items():
+        pairs = pairs[:max_pairs]
+        ranks = [a for a, _ in pairs] + [b for _, b in pairs]
+        if comm.Get_rank() in ranks:
+            group = comm.Get_group().Incl(ranks)
+            sub = comm.Create_group(group)
+            group.Free()
+
+            run_args = copy.copy(args)
+            run_args.placement = False
+            run_args.mapby = mapby
+            if args.format == 'text' and sub.Get_rank() == 0:
+                a, b = pairs[0]
+                if None not in (localities[a].cpu, localities[b].cpu):
+                    a, b = localities[a].cpu, localities[b].cpu
+                print('T:%s|M:%s|C:%d,%d|I:%d'
+                      % (name, mapby, a, b,
+                         Options(name, run_args).iterations), flush=True)
+            rows += benchmark(run_args, comm=sub)
+            sub.Free()
+        comm.Barrier()
+
+    # Rows of the pairs without rank 0 are gathered there
+    gathered = comm.gather(rows, root=0)
+    return [row for part in gathered for row in part] if gathered else []
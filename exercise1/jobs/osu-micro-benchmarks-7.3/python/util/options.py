@@ -21,6 +21,14 @@ class Options:
         self.pickle = self.args.pickle
         self.buffer = None
         self.benchmark = benchmark_name
+        self.full = False
+        self.tail = self.args.tail
+        self.tolerance = self.args.tolerance
+        self.confidence = self.args.confidence
+        self.min_iterations = self.args.min_iterations
+        self.calibrate = self.args.calibrate
+        self.format = self.args.format
+        self.mapby = self.args.mapby
         self.update_options()
 
     def update_options(self):
@@ -29,6 +37,14 @@ class Options:
 
         if self.args.buffer:
             self.buffer = self.args.buffer
+        if self.args.full and self.args.benchmark not in pt2pt:
+            self.full = True
+        if not 0 < self.confidence < 1:
+            raise SystemExit("The confidence level must be between 0 and 1")
+        if self.tolerance is not None and self.tolerance <= 0:
+            raise SystemExit("The tolerance must be positive")
+        if self.min_iterations < 2:
+            raise SystemExit("At least 2 iterations are needed between checks")
         if self.args.iterations:
             self.iterations = self.args.iterations
             self.iterations_large = int(self.args.iterations/100)+1
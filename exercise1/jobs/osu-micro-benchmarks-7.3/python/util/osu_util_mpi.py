@@ -8,31 +8,30 @@ For detailed copyright and licensing information, please refer to the
 copyright file COPYRIGHT in the top level OMB directory.
 """
 
+from collections import namedtuple
+from statistics import NormalDist
 from mpi4py import MPI
+from util.output import result_row
 import numpy as np
 import math
+import pickle
 
 
 class util:
-    def print_stats(t_end, t_start, iterations, myid, comm, numprocs, size):
-        avglatency = util.avg_lat(t_end, t_start, iterations, comm, numprocs)
-        if myid == 0:
-            print('%-10d%18.2f' % (size, avglatency), flush=True)
-
-    def avg_lat(t_end, t_start, iterations, comm, numprocs):
-        latency = np.array((t_end - t_start) * 1e6 / iterations, 'd')
-        avglatency = np.array(0.0, 'd')
-        comm.Reduce(
-            [latency, MPI.DOUBLE],
-            [avglatency, MPI.DOUBLE],
-            op=MPI.SUM, root=0)
-        avglatency /= numprocs
-        return avglatency
-
-    def print_header(benchmark, myid):
+    def print_header(benchmark, myid, options=None):
+        if options is not None and options.format != 'text':
+            return
         if myid == 0:
             print('# OMB Python MPI %s Test' % (benchmark))
-            print('# %-8s%18s' % ("Size (B)", "Latency (us)"))
+            header = '# %-8s%18s' % ("Size (B)", "Latency (us)")
+            if options is not None and options.full:
+                header += '%18s%18s%12s' % (
+                    "Min Latency(us)", "Max Latency(us)", "Iterations")
+            if options is not None and options.tail:
+                header += '%18s%18s%18s' % (
+                    "P50 Tail Lat(us)", "P95 Tail Lat(us)",
+                    "P99 Tail Lat(us)")
+            print(header, flush=True)
 
     def check_numprocs(numprocs, myid, limit):
         if limit == 2:
@@ -178,6 +177,15 @@ class util:
         elif(dtype == 'pycudaF'):
             return gpuarray.zeros(n, dtype=np.float32)
 
+    # Object of the first size items of the buffer sent by the pickle
+    # benchmarks, made once per message size: slices of arrays are views,
+    # bytearrays are sliced through a memoryview instead of being copied
+    # (pickled in-band as a bytearray, with protocol 5)
+    def pickle_message(buf, size):
+        if isinstance(buf, bytearray):
+            return pickle.PickleBuffer(memoryview(buf)[:size])
+        return buf[0:size]
+
     def find_structure(mode, reduce=False):
         if reduce:
             structure = 'numpyF'
@@ -220,4 +228,170 @@ class util:
         while (time_elapsed < seconds):
             util.compute_on_host()
             t2 = MPI.Wtime()
-            time_elapsed = (t2-t1)
\ No newline at end of file
+            time_elapsed = (t2-t1)
+
+# Statistics of the samples of a message size, reported by rank 0
+Stats = namedtuple('Stats', ['size', 'latency', 'min', 'max', 'iterations',
+                             'p50', 'p95', 'p99', 'ci_low', 'ci_high'])
+
+
+class Timer:
+    """Per-iteration timings of a benchmark.
+
+    Every rank records the time of each iteration in a buffer preallocated
+    once for the largest number of iterations, so nothing is allocated while
+    timing. As in the C benchmarks, the samples are averaged across the ranks
+    iteration by iteration, the tail latencies are the percentiles of these
+    averages and the min and max latencies are the extremes of the average
+    latencies of the ranks.
+
+    With ``--calibrate``, the residual overhead of an empty iteration of the
+    timed loops (the two calls of MPI.Wtime and the store of the sample) is
+    measured once, as the median of its timings, and subtracted from every
+    sample (which never goes below zero).
+
+    With a tolerance (``--tolerance``), the iterations are run in batches of
+    ``--min-iterations`` and stop as soon as the confidence interval of the
+    mean latency of every rank is narrower than the tolerance (relative to
+    the mean), so stable messages do not need all the iterations. The
+    decision is reduced across the ranks, which all stop together.
+
+    Parameters
+    ----------
+    comm : MPI.Comm
+        The communicator of the benchmark.
+    options : Options
+        The options of the benchmark.
+    scale : int, optional
+        The number of latencies timed by an iteration (2 for a ping-pong),
+        by default 1.
+    """
+
+    def __init__(self, comm, options, scale=1):
+        self.comm = comm
+        self.options = options
+        self.scale = 1e6 / scale
+        capacity = max(options.iterations + options.skip,
+                       options.iterations_large + options.skip_large)
+        self.samples = np.zeros(capacity)
+        self.total = np.zeros(capacity)
+        self.z = NormalDist().inv_cdf(0.5 + options.confidence / 2)
+        self.skip = 0
+        self.count = 0
+        self.rows = []
+        self._width = np.zeros(1)
+        self._mean = np.zeros(1)
+        self._reduced = np.zeros(3)
+        self.overhead = self.calibrate() if options.calibrate else 0.
+        if (options.calibrate and options.format == 'text'
+                and comm.Get_rank() == 0):
+            print('# Timer overhead (subtracted): %.3f us'
+                  % (self.overhead * self.scale), flush=True)
+
+    def calibrate(self, iterations=1000):
+        """Median time in s of an empty iteration of the timed loops."""
+        samples = self.samples[:min(iterations, len(self.samples))]
+        for i in range(len(samples)):
+            t_start = MPI.Wtime()
+            samples[i] = MPI.Wtime() - t_start
+        return float(np.median(samples))
+
+    def batches(self, iterations, skip):
+        """Ranges of the iterations to time, the warmup ones first.
+
+        Every iteration i of the ranges must store its time in
+        ``samples[i]``, the warmup ones are discarded.
+        """
+        if iterations + skip > len(self.samples):
+            raise ValueError("Too many iterations: %d (at most %d)."
+                             % (iterations + skip, len(self.samples)))
+        self.skip = self.count = skip
+        if skip > 0:
+            yield range(0, skip)
+
+        tolerance = self.options.tolerance
+        step = iterations if tolerance is None else self.options.min_iterations
+        while self.count < skip + iterations:
+            stop = min(self.count + step, skip + iterations)
+            yield range(self.count, stop)
+            self.count = stop
+            if tolerance is not None and self.width() <= tolerance:
+                return
+
+    def width(self):
+        """Largest relative half-width of the confidence intervals of the
+        mean latencies of the ranks (collective)."""
+        samples = self.samples[self.skip:self.count]
+        if len(samples) < 2:
+            self._width[0] = np.inf
+        else:
+            self._width[0] = (self.z * samples.std(ddof=1)
+                              / math.sqrt(len(samples))
+                              / max(samples.mean() - self.overhead, 1e-12))
+        self.comm.Allreduce(MPI.IN_PLACE, self._width, op=MPI.MAX)
+        return self._width[0]
+
+    def stats(self, size):
+        """Statistics of the samples of the last run (collective).
+
+        The confidence interval of the mean latency ('ci_low', 'ci_high')
+        uses the normal quantile of ``--confidence``, with its lower bound
+        clamped at 0: with few iterations a noisy interval could otherwise
+        go below zero.
+
+        Returns
+        -------
+        Stats
+            The latencies in us on rank 0, None on the other ranks.
+        """
+        n = self.count - self.skip
+        samples = self.samples[self.skip:self.count]
+        if self.overhead:
+            samples -= self.overhead
+            np.maximum(samples, 0., out=samples)
+        samples *= self.scale
+        total = self.total[:n]
+        self.comm.Reduce(samples, total, op=MPI.SUM, root=0)
+
+        self._mean[0] = samples.mean()
+        for i, op in enumerate([MPI.SUM, MPI.MIN, MPI.MAX]):
+            self.comm.Reduce(self._mean, self._reduced[i:i + 1], op=op,
+                             root=0)
+        if self.comm.Get_rank() != 0:
+            return None
+
+        numprocs = self.comm.Get_size()
+        total /= numprocs
+        latency = self._reduced[0] / numprocs
+        half = (self.z * total.std(ddof=1) / math.sqrt(n)) if n > 1 else 0.
+
+        # Nearest rank percentiles, as the C benchmarks
+        ranks = [int(math.floor(n * q + 0.5)) - 1 for q in (0.50, 0.95, 0.99)]
+        p50, p95, p99 = np.partition(total, ranks)[ranks].tolist()
+        return Stats(size, float(latency), float(self._reduced[1]),
+                     float(self._reduced[2]), n, p50, p95, p99,
+                     max(float(latency - half), 0.), float(latency + half))
+
+    def report(self, size):
+        """Report the statistics of the last run on rank 0 (collective).
+
+        In text format the statistics are printed right away, otherwise they
+        are added to the rows of the results (see `util.output`).
+        """
+        stats = self.stats(size)
+        if stats is not None and self.options.format != 'text':
+            row = result_row(self.options, self.comm.Get_size(),
+                             **stats._asdict())
+            if self.options.calibrate:
+                row['overhead'] = self.overhead * self.scale
+            self.rows.append(row)
+        elif stats is not None:
+            line = '%-10d%18.2f' % (size, stats.latency)
+            if self.options.full:
+                line += '%18.2f%18.2f%12d' % (stats.min, stats.max,
+                                              stats.iterations)
+            if self.options.tail:
+                line += '%18.2f%18.2f%18.2f' % (stats.p50, stats.p95,
+                                                stats.p99)
+            print(line, flush=True)
+        return stats
@@ -0,0 +1,75 @@
+"""
+Copyright (C) 2002-2022 the Network-Based Computing Laboratory
+(NBCL), The Ohio State University.
+
+Contact: Dr. D. K. Panda (panda@cse.ohio-state.edu)
+
+For detailed copyright and licensing information, please refer to the
+copyright file COPYRIGHT in the top level OMB directory.
+"""
+
+import csv
+import json
+import sys
+
+# Output formats of the results: the fixed-width text of the C benchmarks,
+# printed size by size, or one row per size written once at the end of the run
+FORMATS = ['text', 'json', 'csv', 'parquet']
+
+
+def result_row(options, nprocs, **values):
+    """Row of the results of a message size.
+
+    Every row carries the benchmark, the number of processes, the mapping of
+    the processes and the buffer type, followed by the measured values (the
+    size and statistics of the timings, or the bandwidth).
+    """
+    row = {'benchmark': options.args.benchmark, 'nprocs': nprocs,
+           'mapby': options.mapby, 'buffer': options.buffer or 'default'}
+    row.update(values)
+    return row
+
+
+def write_rows(rows, fmt, path=None):
+    """Write the rows of the results at once.
+
+    Parameters
+    ----------
+    rows : list of dict
+        The rows, possibly with different fields (e.g. latency and bandwidth
+        benchmarks), all the fields being written for all the rows.
+    fmt : str
+        'json' (one object per line), 'csv' or 'parquet'.
+    path : str, optional
+        The output file, by default the standard output (not for parquet).
+    """
+    if fmt not in FORMATS[1:]:
+        raise ValueError("Invalid format: %s. Use one of %s."
+                         % (fmt, FORMATS[1:]))
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    rows = [{key: row.get(key) for key in columns} for row in rows]
+
+    if fmt == 'parquet':
+        if path is None:
+            raise ValueError("An output file is needed for parquet.")
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("pyarrow is needed to write parquet files")
+        table = pa.table({key: [row[key] for row in rows] for key in columns})
+        pq.write_table(table, path)
+        return
+
+    f = open(path, 'w', newline='') if path is not None else sys.stdout
+    try:
+        if fmt == 'json':
+            f.write(''.join(json.dumps(row) + '\n' for row in rows))
+        else:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+        f.flush()
+    finally:
+        if path is not None:
+            f.close()
@@ -9,6 +9,7 @@ copyright file COPYRIGHT in the top level OMB directory.
 """
 
 import argparse
+from util.output import FORMATS
 
 
 def get_parser():
@@ -16,7 +17,12 @@ def get_parser():
         description='OMB-Py Script',
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('--benchmark', type=str,
-                        help='Name of benchmark to run')
+                        help='Name of benchmark to run, or comma separated'
+                             ' names of benchmarks to run in a single launch')
+    parser.add_argument(
+        '--nprocs', type=str, default=None,
+        help='Numbers of processes of the runs, as comma separated numbers'
+             ' or first:last:step ranges (all the processes by default)')
     parser.add_argument(
         '--buffer', type=str, default='',
         help='Buffer type to be used in benchmark')
@@ -32,4 +38,38 @@ def get_parser():
     parser.add_argument(
         '--iterations', type=int, default=None,
         help='Number of main iterations')
+    parser.add_argument(
+        '--full', action='store_true', default=False,
+        help='Print the min and max latency and the number of iterations')
+    parser.add_argument(
+        '--tail', action='store_true', default=False,
+        help='Print the P50, P95 and P99 tail latencies')
+    parser.add_argument(
+        '--tolerance', type=float, default=None,
+        help='Stop the iterations once the confidence interval of the mean'
+             ' latency is narrower than this fraction of the mean')
+    parser.add_argument(
+        '--confidence', type=float, default=0.95,
+        help='Confidence level of the confidence interval')
+    parser.add_argument(
+        '--min-iterations', type=int, default=100,
+        help='Iterations between two checks of the confidence interval')
+    parser.add_argument(
+        '--calibrate', action='store_true', default=False,
+        help='Measure the overhead of an empty timed iteration and subtract'
+             ' it from the latencies')
+    parser.add_argument(
+        '--format', type=str, default='text', choices=FORMATS,
+        help='Output format of the results')
+    parser.add_argument(
+        '--output', type=str, default=None,
+        help='Output file of the results (standard output by default)')
+    parser.add_argument(
+        '--mapby', type=str, default=None,
+        help='Mapping of the processes, recorded in the results')
+    parser.add_argument(
+        '--placement', action='store_true', default=False,
+        help='Measure representative pairs of every locality class (cache,'
+             ' core, socket, node) of the processes in a single launch'
+             ' (latency and multi_lat)')
     return parser
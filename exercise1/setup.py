@@ -5,6 +5,7 @@ setup(
     version='0.1',
     package_dir={'': 'src'},
     packages=find_packages(where='src'),
+    package_data={'epyc': ['data/*/*.npy', 'data/*/meta.json']},
     author='Marco Tallone',
     author_email='marcotallone85@gmail.com',
     description='Simple Python Model for AMD EPYC 7H12 (Rome) processors.',
@@ -4,18 +4,48 @@ __version__ = '0.1.0'
 NODES = 2
 SOCKETS_PER_NODE = 2
 CORES_PER_SOCKET = 64
+CCX_SIZE = 4  # Cores sharing the same L3 cache
 MAX_PROC_ID = NODES*SOCKETS_PER_NODE*CORES_PER_SOCKET - 1
-ASSIGNED_IDS = set()
+
+# Communication channels, from the closest (same L3 cache) to the farthest
+CHANNELS = ['cache', 'core', 'socket', 'node']
 
 # Modules imports ──────────────────────────────────────────────────────────────
-from .process import Process
+from .process import Process, ProcessList
 from .core import Core
 from .socket import Socket
 from .node import Node
+from .topology import Topology
+from .cluster import Cluster
 from .mpy import *
-from .fit import fit_p2p, fit_nbft, fit_nbft_reduce
+from .fit import (fit_p2p, fit_nbft, fit_nbft_reduce, fit_model, fit_groups,
+                  fit_robust, fit_statistics, update_coefficients, load_coefficients,
+                  build_datasets, export_csv)
+from .tables import load_tables
+from .schedule import Schedule, compile_schedule, placement_schedule
+from .predict import predict_grid
+from .segmentation import pipeline_latency, best_segment_size
+from .tuner import tune, select, write_rules, write_table, load_table
 
-__all__ = ['Process', 'Core', 'Socket', 'Node', 'initialize',
+__all__ = ['Process', 'ProcessList', 'Core', 'Socket', 'Node', 'Topology', 'Cluster',
+           'initialize',
            'linear_bcast', 'chain_bcast', 'binary_bcast',
+           'binomial_bcast', 'knomial_bcast', 'split_binary_bcast',
+           'pipeline_bcast', 'scatter_allgather_bcast',
            'linear_reduce', 'chain_reduce', 'binary_reduce',
-           'fit_p2p', 'fit_nbft', 'fit_nbft_reduce']
\ No newline at end of file
+           'binomial_reduce', 'pipeline_reduce',
+           'ring_allgather', 'recursive_doubling_allgather', 'bruck_allgather',
+           'ring_allreduce', 'recursive_doubling_allreduce',
+           'rabenseifner_allreduce',
+           'linear_alltoall', 'pairwise_alltoall', 'bruck_alltoall',
+           'linear_scatter', 'binomial_scatter',
+           'linear_gather', 'binomial_gather',
+           'ring_reduce_scatter', 'recursive_halving_reduce_scatter',
+           'recursive_doubling_barrier', 'bruck_barrier',
+           'fit_p2p', 'fit_nbft', 'fit_nbft_reduce', 'fit_model', 'fit_groups',
+           'fit_robust', 'fit_statistics', 'update_coefficients', 'load_coefficients',
+           'build_datasets', 'export_csv',
+           'load_tables',
+           'Schedule', 'compile_schedule', 'placement_schedule',
+           'predict_grid', 'pipeline_latency', 'best_segment_size',
+           'tune', 'select', 'write_rules', 'write_table', 'load_table']
\ No newline at end of file
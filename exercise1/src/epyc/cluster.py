@@ -0,0 +1,77 @@
+import threading
+
+from .node import Node
+from .topology import Topology
+from . import NODES, SOCKETS_PER_NODE, CORES_PER_SOCKET, CCX_SIZE
+
+# Cluster class ────────────────────────────────────────────────────────────────
+class Cluster:
+    """A class to simulate a cluster of identical computing nodes.
+
+    Every cluster owns its topology, hence its own process IDs and placement
+    state: many clusters (possibly of different shapes) can live in the same
+    interpreter and be simulated concurrently from different threads.
+
+    Parameters
+    ----------
+    nodes : int, optional
+        Number of nodes, by default NODES.
+    sockets_per_node : int, optional
+        Number of sockets in each node, by default SOCKETS_PER_NODE.
+    cores_per_socket : int, optional
+        Number of cores in each socket, by default CORES_PER_SOCKET.
+    ccx_size : int, optional
+        Number of cores sharing the same L3 cache, by default CCX_SIZE.
+
+    Attributes
+    ----------
+    topology : Topology
+        The array-backed state of the cluster.
+    nodes : list
+        The list of nodes in the cluster.
+
+    Examples
+    --------
+    >>> cluster = Cluster(nodes=4, cores_per_socket=32, ccx_size=8)
+    >>> p = cluster.initialize(n_processes=200, mapby='socket')
+    >>> binary_bcast(p, 1024)
+    """
+
+    # Constructor
+    def __init__(self, nodes=NODES, sockets_per_node=SOCKETS_PER_NODE,
+                 cores_per_socket=CORES_PER_SOCKET, ccx_size=CCX_SIZE):
+        self._lock = threading.Lock()
+        self.topology = Topology(nodes, sockets_per_node, cores_per_socket,
+                                 ccx_size)
+        self.nodes = [Node(self, i) for i in range(nodes)]
+
+    # Method to print the cluster
+    def __repr__(self):
+        t = self.topology
+        return (f'Cluster(nodes={t.nodes}, '
+                f'sockets_per_node={t.sockets_per_node}, '
+                f'cores_per_socket={t.cores_per_socket}, '
+                f'ccx_size={t.ccx_size})')
+
+    # Method to add a new empty node to the cluster
+    def add_node(self):
+        """Add an empty node to the cluster and return it."""
+        return Node(self)
+
+    # Method to fill the cluster with processes
+    def initialize(self, n_processes=1, mapby='core'):
+        """Initialize all the nodes of the cluster with processes.
+
+        See `initialize` for the meaning of the parameters.
+
+        Returns
+        -------
+        ProcessList
+            A list of processes initialized in the nodes in id order.
+        """
+        from .mpy import initialize
+        return initialize(*self.nodes, n_processes=n_processes, mapby=mapby)
+
+
+# Cluster of the nodes created with Node(), growing one node at a time
+DEFAULT_CLUSTER = Cluster(nodes=0)
@@ -1,10 +1,21 @@
-from .process import Process
-from . import ASSIGNED_IDS
-
 # Core class ───────────────────────────────────────────────────────────────────
 class Core:
     """A class to simulate a CPU core.
 
+    The core is a view over the arrays of a `Topology`: it holds no state
+    of its own, hence creating and discarding cores is cheap.
+
+    Parameters
+    ----------
+    topology : Topology
+        The topology the core belongs to.
+    node_id : int
+        The node ID where the core is located.
+    socket_id : int
+        The socket ID where the core is located.
+    id : int
+        The core ID (inside its socket).
+
     Attributes
     ----------
     id : int
@@ -21,46 +32,44 @@ class Core:
         The process running on the core.
     """
 
-    # Class variable to keep track of IDs
-    next_id = {}
-
     # Constructor
-    def __init__(self, socket_id, node_id):
+    def __init__(self, topology, node_id, socket_id, id):
+        self.topology = topology
+        self.id = id
+        self.socket_id = socket_id
+        self.node_id = node_id
+        self.index = topology.core_index(node_id, socket_id, id)
 
-        if (socket_id, node_id) not in Core.next_id:
-            Core.next_id[(socket_id, node_id)] = 0
+    # Status of the core
+    @property
+    def busy(self):
+        return bool(self.topology.occupied[self.index])
 
-        self.id = Core.next_id[(socket_id, node_id)]
-        Core.next_id[(socket_id, node_id)] += 1
+    # ID of the process running on the core
+    @property
+    def process_id(self):
+        rank = int(self.topology.rank[self.index])
+        return rank if rank >= 0 else None
 
-        self.busy = False
-        self.socket_id = socket_id
-        self.node_id = node_id
-        self.process_id = None
-        self.process = None
+    # Process running on the core
+    @property
+    def process(self):
+        return self.get_process()
 
     # Method to check if the core has a process running
     def occupied(self):
         return self.busy
-    
+
     # Method to add a process to the core
     def add_process(self, process_id):
-        if self.busy:
-            return False
-        self.busy = True
-        self.process_id = process_id
-        self.process = Process(process_id, self.id, self.socket_id, self.node_id)
-        return True
+        return self.topology.assign(process_id, self.index)
 
     # Method to get the process running on the core
     def get_process(self):
-        return self.process 
+        if not self.busy:
+            return None
+        return self.topology.get_process(self.process_id)
 
     # Method to remove the process from the core
     def remove_process(self):
-        ASSIGNED_IDS.remove(self.process_id)
-        self.busy = False
-        self.process_id = None
-        self.process = None
-
-        return True
+        return self.topology.remove_process(self.process_id)
@@ -1,166 +1,1081 @@
-import pandas as pd
-import statsmodels.api as sm
+import hashlib
+import itertools
+import json
 import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from . import CHANNELS
 
 # Load datasets ────────────────────────────────────────────────────────────────
-# nbft_file = 'datasets/nbft.csv'
-#p2p_file = 'datasets/p2p.csv'
+# The datasets are stored in src/epyc/data/<kind>/ as one .npy file per column,
+# sorted by channel, and a meta.json with the column types and the range of
+# rows of each channel, so that they are memory mapped instead of parsed (see
+# `build_datasets` to rebuild them from the csv files of datasets/)
 
 module_dir = os.path.dirname(os.path.abspath(__file__))
-nbft_file = os.path.join(module_dir, 'nbft.csv')
-nbft_reduce_file = os.path.join(module_dir, 'nbft_reduce.csv')
-p2p_file = os.path.join(module_dir, 'p2p.csv')
-
-try:
-    nbft_df = pd.read_csv(nbft_file)
-    nbft_reduce_df = pd.read_csv(nbft_reduce_file)
-    p2p_df = pd.read_csv(p2p_file)
-except:
-    print("ERROR: Could not load the datasets in the src/ directory."
-          " Make sure the paths are correct and the files exist.")
-    exit(1)
-
-# Splitted datasets ────────────────────────────────────────────────────────────
-p2p_cache = p2p_df[p2p_df['mapby']=='cache'].copy()
-p2p_core = p2p_df[p2p_df['mapby']=='core'].copy()
-p2p_socket = p2p_df[p2p_df['mapby']=='socket'].copy()
-p2p_node = p2p_df[p2p_df['mapby']=='node'].copy()
-nbft_cache = nbft_df[nbft_df['mapby']=='cache'].copy()
-nbft_core = nbft_df[nbft_df['mapby']=='core'].copy()
-nbft_socket = nbft_df[nbft_df['mapby']=='socket'].copy()
-nbft_node = nbft_df[nbft_df['mapby']=='node'].copy()
-nbft_reduce_cache = nbft_reduce_df[nbft_reduce_df['mapby']=='cache'].copy()
-nbft_reduce_core = nbft_reduce_df[nbft_reduce_df['mapby']=='core'].copy()
-nbft_reduce_socket = nbft_reduce_df[nbft_reduce_df['mapby']=='socket'].copy()
-nbft_reduce_node = nbft_reduce_df[nbft_reduce_df['mapby']=='node'].copy()
-
-# Hockney fits for p2p communications ──────────────────────────────────────────
-
-def fit_p2p():
-    # Dictionary to store hockney model parameters
-    hockney = {'cache': [], 'core': [], 'socket': [], 'node': []}
-
-    # Add dummy variable and interaction term for big sizes
-    p2p_cache['big'] = (p2p_cache['size'] > 2**17).astype(int)
-    p2p_cache['big_size'] = p2p_cache['size'] * p2p_cache['big']
-    p2p_core['big'] = (p2p_core['size'] > 2**17).astype(int)
-    p2p_core['big_size'] = p2p_core['size'] * p2p_core['big']
-    p2p_socket['big'] = (p2p_socket['size'] > 2**17).astype(int)
-    p2p_socket['big_size'] = p2p_socket['size'] * p2p_socket['big']
-    p2p_node['big'] = (p2p_node['size'] > 2**17).astype(int)
-    p2p_node['big_size'] = p2p_node['size'] * p2p_node['big']
-
-    # Fit
-    y = p2p_cache['latency']
-    X = p2p_cache[['size', 'big', 'big_size']]
-    X = sm.add_constant(X)
-    cache_model = sm.OLS(y, X).fit()
-    hockney['cache'] = list(cache_model.params)
-
-    y = p2p_core['latency']
-    X = p2p_core[['size', 'big', 'big_size']]
-    X = sm.add_constant(X)
-    core_model = sm.OLS(y, X).fit()
-    hockney['core'] = list(core_model.params)
-
-    y = p2p_socket['latency']
-    X = p2p_socket[['size', 'big', 'big_size']]
-    X = sm.add_constant(X)
-    socket_model = sm.OLS(y, X).fit()
-    hockney['socket'] = list(socket_model.params)
-
-    y = p2p_node['latency']
-    X = p2p_node[['size', 'big', 'big_size']]
-    X = sm.add_constant(X)
-    node_model = sm.OLS(y, X).fit()
-    hockney['node'] = list(node_model.params)
-
-    return hockney
+data_dir = os.path.join(module_dir, 'data')
+
+# Datasets the model is fitted on
+DATASETS = ['p2p', 'nbft', 'nbft_reduce']
+
+# Version of the on-disk coefficients cache (bump when its layout changes)
+CACHE_VERSION = 3
+
+# Latency statistics of the datasets that can be modelled (mean and
+# percentiles of the OSU timings)
+STATISTICS = ['latency', 'p50', 'p95', 'p99']
+
+# Resolution of the OSU latencies in us, the smallest spread of a measurement
+SPREAD_RESOLUTION = 0.01
+
+# Tuning constant of the Huber loss (95% efficiency on normal residuals)
+HUBER_T = 1.345
+
+# Number of breakpoints of the piecewise linear p2p model of each channel
+# (e.g. the eager and rendezvous protocol switches)
+P2P_BREAKPOINTS = 2
+
+# Losses of the regressions of the model (see `fit_model`)
+LOSSES = ['ols', 'huber', 'quantile']
+
+# Fitted coefficients of each model (statistic, loss and weights), loaded
+# lazily on first use
+_coefficients = {}
+_coefficients_lock = threading.Lock()
+
+# Splitted datasets, read lazily only when a fit is actually needed
+_datasets = None
+
+
+def load_datasets():
+    """Load the p2p and NBFT datasets split by mapping.
+
+    The columns are memory mapped from the binary datasets and each channel
+    is a zero-copy view of its contiguous range of rows. The datasets are
+    loaded only once: subsequent calls return the same dictionary of
+    dataframes. A `FileNotFoundError` naming the missing file is raised if a
+    dataset is incomplete.
+
+    Returns
+    -------
+    dict
+        A dictionary with keys 'p2p', 'nbft' and 'nbft_reduce', each mapping
+        the channel name to the corresponding slice of the dataset.
+    """
+    global _datasets
+    if _datasets is not None:
+        return _datasets
+
+    try:
+        datasets = {kind: _read_dataset(kind) for kind in DATASETS}
+    except FileNotFoundError as e:
+        raise FileNotFoundError(
+            f"Missing dataset file: {e.filename}. Make sure the datasets"
+            f" exist in {data_dir} (see `build_datasets`).") from None
+
+    _datasets = {kind: _split_dataset(*datasets[kind]) for kind in DATASETS}
+    return _datasets
+
+
+# Columns and metadata of a binary dataset
+def _read_dataset(kind, directory=None):
+    directory = os.path.join(directory or data_dir, kind)
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+    columns = {name: np.load(os.path.join(directory, f'{name}.npy'),
+                             mmap_mode='r')
+               for name in meta['columns']}
+    return columns, meta
+
+
+# Dataframes of the channels of a dataset, as views of its columns
+def _split_dataset(columns, meta, channels=None):
+    import pandas as pd
+
+    split = {}
+    for channel in channels or meta['partitions']:
+        start, stop = meta['partitions'][channel]
+        frame = {}
+        for name, column in columns.items():
+            column = column[start:stop]
+            if name in meta['categorical']:
+                column = pd.Categorical.from_codes(
+                    column, meta['categorical'][name])
+            frame[name] = column
+        df = pd.DataFrame(frame, copy=False)
+        df.index = pd.RangeIndex(start, stop)
+        split[channel] = df
+    return split
+
+
+# Binary datasets ──────────────────────────────────────────────────────────────
+
+def build_datasets(p2p, nbft, nbft_reduce, directory=None):
+    """Build the binary datasets from the csv files of the measurements.
+
+    Every column is stored as a .npy file (integers as int32 when they fit,
+    timings as float64 and the mapping as int8 codes), with the rows stably sorted by
+    channel so that each channel is a contiguous range, and a meta.json with
+    the column types and the range of rows of each channel.
+
+    Parameters
+    ----------
+    p2p, nbft, nbft_reduce : str or pandas.DataFrame
+        The csv files (or dataframes) of the datasets, e.g. the ones written
+        by the scripts of convert/ in datasets/.
+    directory : str, optional
+        Where to write the datasets, by default the package data directory.
+        The coefficients fitted on the previous datasets are not reused (see
+        `datasets_hash`).
+
+    Examples
+    --------
+    >>> build_datasets('datasets/p2p.csv', 'datasets/nbft.csv',
+    ...                'datasets/nbft_reduce.csv')
+    """
+    global _datasets
+    import pandas as pd
+
+    directory = directory or data_dir
+    for kind, df in zip(DATASETS, [p2p, nbft, nbft_reduce]):
+        if not isinstance(df, pd.DataFrame):
+            df = pd.read_csv(df)
+        invalid = set(df['mapby']) - set(CHANNELS)
+        if invalid:
+            raise ValueError(f"Invalid mapby in the {kind} dataset:"
+                             f" {sorted(invalid)}. Use one of {CHANNELS}.")
+        codes = df['mapby'].map(CHANNELS.index).to_numpy(np.int8)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(CHANNELS) + 1))
+
+        path = os.path.join(directory, kind)
+        os.makedirs(path, exist_ok=True)
+        columns = {}
+        for name in df.columns:
+            if name == 'mapby':
+                values = codes[order]
+            elif pd.api.types.is_integer_dtype(df[name]):
+                values = df[name].to_numpy(np.int64)[order]
+                if np.array_equal(values, values.astype(np.int32)):
+                    values = values.astype(np.int32)
+            else:
+                values = df[name].to_numpy(np.float64)[order]
+            np.save(os.path.join(path, f'{name}.npy'), values)
+            columns[name] = values.dtype.name
+        meta = {
+            'columns': columns,
+            'categorical': {'mapby': CHANNELS},
+            'rows': len(df),
+            'partitions': {c: [int(bounds[i]), int(bounds[i + 1])]
+                           for i, c in enumerate(CHANNELS)},
+        }
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    if directory == data_dir:
+        _datasets = None
+
+
+def export_csv(kind, path=None, directory=None):
+    """Export a binary dataset as csv.
+
+    Parameters
+    ----------
+    kind : str
+        The dataset, 'p2p', 'nbft' or 'nbft_reduce'.
+    path : str, optional
+        The csv file to write, if None the dataframe is only returned.
+    directory : str, optional
+        The directory of the binary datasets, by default the package data
+        directory.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The whole dataset, with the mapping as strings and the rows sorted
+        by channel.
+    """
+    import pandas as pd
+
+    if kind not in DATASETS:
+        raise ValueError(f"Invalid kind: {kind}."
+                         f" Use 'p2p', 'nbft' or 'nbft_reduce'.")
+    columns, meta = _read_dataset(kind, directory)
+    df = pd.concat(_split_dataset(columns, meta).values())
+    df['mapby'] = df['mapby'].astype(str)
+    df = df.reset_index(drop=True)
+    if path is not None:
+        df.to_csv(path, index=False)
+    return df
+
+# Batched least squares ────────────────────────────────────────────────────────
+
+# Ordinary least squares fits of many groups of rows
+GroupFit = namedtuple('GroupFit', ['groups', 'params', 'stderr', 'conf_int',
+                                   'rss', 'nobs', 'residuals'])
+
+# Fits of a component of the model over all its channels (and sizes)
+FitReport = namedtuple('FitReport', ['kind', 'sizes', 'params', 'stderr',
+                                     'conf_int', 'rss', 'nobs', 'residuals',
+                                     'cache', 'breakpoints'],
+                       defaults=(None,))
+
+
+def fit_groups(groups, X, y, alpha=0.05, weights=None):
+    """Ordinary least squares of y on X, solved separately for every group.
+
+    The rows are grouped once, every group is stored in its own zero-padded
+    block (zero rows do not change a least squares problem) and all the
+    regressions are solved together with a single stacked pseudo-inverse,
+    the same method used by `statsmodels.OLS` (or `statsmodels.WLS` with
+    weights).
+
+    Parameters
+    ----------
+    groups : array_like
+        Group of each row, array of shape (rows,) or (rows, keys).
+    X : array_like
+        Design matrix, array of shape (rows, k).
+    y : array_like
+        Response, array of shape (rows,).
+    alpha : float, optional
+        Significance level of the confidence intervals, by default 0.05.
+    weights : array_like, optional
+        Weight of each row (e.g. the inverse variance of the measurement), by
+        default all the rows have the same weight.
+
+    Returns
+    -------
+    GroupFit
+        A named tuple with the sorted distinct 'groups', the 'params', their
+        standard errors ('stderr') and confidence intervals ('conf_int',
+        array of shape (groups, k, 2)), the (weighted) residual sum of
+        squares ('rss'),
+        the number of rows ('nobs') of each group and the 'residuals' of
+        every row. Standard errors and intervals are NaN for the groups
+        without residual degrees of freedom.
+
+    Examples
+    --------
+    >>> X = np.column_stack((np.ones(len(df)), df['p']))
+    >>> fit = fit_groups(df['size'], X, df['latency'])
+    """
+    from scipy import stats
+
+    groups, X, y = np.asarray(groups), np.asarray(X, float), np.asarray(y, float)
+    keys, inverse, nobs = np.unique(groups, axis=0, return_inverse=True,
+                                    return_counts=True)
+    inverse = inverse.ravel()
+    w = np.ones(len(y)) if weights is None else np.asarray(weights, float)
+    if (w < 0).any():
+        raise ValueError("Weights must be non-negative.")
+
+    # One zero-padded block of rows per group, rows scaled by sqrt(weight)
+    order = np.argsort(inverse, kind='stable')
+    position = np.arange(len(y)) - np.repeat(np.cumsum(nobs) - nobs, nobs)
+    blocks = np.zeros((len(keys), nobs.max(), X.shape[1]))
+    response = np.zeros((len(keys), nobs.max()))
+    scale = np.sqrt(w[order])
+    blocks[inverse[order], position] = X[order] * scale[:, None]
+    response[inverse[order], position] = y[order] * scale
+
+    pinv = np.linalg.pinv(blocks)
+    params = (pinv @ response[..., None])[..., 0]
+    residuals = y - (X * params[inverse]).sum(axis=1)
+    rss = np.bincount(inverse, w * residuals**2, minlength=len(keys))
+
+    # Covariance of the parameters and confidence intervals
+    df_resid = nobs - np.linalg.matrix_rank(blocks)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sigma2 = np.where(df_resid > 0, rss / df_resid, np.nan)
+        cov = sigma2[:, None, None] * (pinv @ pinv.transpose(0, 2, 1))
+        stderr = np.sqrt(np.diagonal(cov, axis1=1, axis2=2))
+        q = stats.t.ppf(1 - alpha / 2, np.where(df_resid > 0, df_resid, 1))
+    q = np.where(df_resid > 0, q, np.nan)[:, None]
+    conf_int = np.stack((params - q * stderr, params + q * stderr), axis=-1)
+    return GroupFit(keys, params, stderr, conf_int, rss, nobs, residuals)
+
+
+# Median of the values of every group
+def _group_median(inverse, values, n_groups):
+    order = np.lexsort((values, inverse))
+    nobs = np.bincount(inverse, minlength=n_groups)
+    start = np.cumsum(nobs) - nobs
+    values = values[order]
+    lower = values[np.minimum(start + (nobs - 1) // 2, len(values) - 1)]
+    upper = values[np.minimum(start + nobs // 2, len(values) - 1)]
+    return np.where(nobs > 0, (lower + upper) / 2, 0.)
+
+
+# Robust fits of many groups of rows
+def fit_robust(groups, X, y, loss='huber', alpha=0.05, weights=None,
+               quantile=0.5, max_iter=100, tol=1e-8):
+    """Robust linear regression of y on X, solved separately for every group.
+
+    The fits are computed by iteratively reweighted least squares, every
+    iteration solving all the groups at once with `fit_groups`. The Huber
+    loss (quadratic for the residuals within `HUBER_T` robust standard
+    deviations of the group, linear beyond) limits the influence of the
+    outliers on the mean, while the quantile (pinball) loss fits a quantile
+    of the response instead of its mean.
+
+    Parameters
+    ----------
+    groups : array_like
+        Group of each row, array of shape (rows,) or (rows, keys).
+    X : array_like
+        Design matrix, array of shape (rows, k).
+    y : array_like
+        Response, array of shape (rows,).
+    loss : str, optional
+        The loss, 'huber' or 'quantile', by default 'huber'.
+    alpha : float, optional
+        Significance level of the confidence intervals, by default 0.05.
+    weights : array_like, optional
+        Prior weight of each row, multiplied by the robust weights.
+    quantile : float, optional
+        The quantile fitted by the quantile loss, by default 0.5 (median).
+    max_iter : int, optional
+        Maximum number of iterations, by default 100.
+    tol : float, optional
+        Relative change of the parameters below which the iterations stop,
+        by default 1e-8.
+
+    Returns
+    -------
+    GroupFit
+        The same named tuple returned by `fit_groups`, for the weighted least
+        squares of the last iteration (standard errors and confidence
+        intervals are those of this weighted fit, hence approximate).
+
+    Examples
+    --------
+    >>> X = np.column_stack((np.ones(len(df)), df['size']))
+    >>> fit = fit_robust(df['mapby'], X, df['latency'], loss='huber')
+    """
+    if loss not in ['huber', 'quantile']:
+        raise ValueError(f"Invalid loss: {loss}. Use 'huber' or 'quantile'.")
+    if not 0 < quantile < 1:
+        raise ValueError(f"Invalid quantile: {quantile}. Use 0 < quantile < 1.")
+
+    groups, y = np.asarray(groups), np.asarray(y, float)
+    prior = np.ones(len(y)) if weights is None else np.asarray(weights, float)
+    _, inverse = np.unique(groups, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    n_groups = inverse.max(initial=-1) + 1
+    eps = 1e-8 * max(1., np.abs(y).max(initial=0.))
+
+    fit = fit_groups(groups, X, y, alpha, prior)
+    for _ in range(max_iter):
+        r = np.abs(fit.residuals)
+        if loss == 'huber':
+            # Robust standard deviation of the residuals of each group (MAD)
+            sigma = _group_median(inverse, r, n_groups)[inverse] / 0.6745
+            t = HUBER_T * sigma
+            w = np.where(r > t, t / np.maximum(r, eps), 1.)
+        else:
+            w = np.where(fit.residuals >= 0, quantile, 1 - quantile)
+            w = w / np.maximum(r, eps)
+        previous, fit = fit.params, fit_groups(groups, X, y, alpha, prior * w)
+        if (np.abs(fit.params - previous)
+                <= tol * (np.abs(previous) + tol)).all():
+            break
+    return fit
+
+
+# Fit groups of rows with the requested loss
+def _fit_loss(groups, X, y, alpha, weights, loss, quantile):
+    if loss == 'ols':
+        return fit_groups(groups, X, y, alpha, weights)
+    if loss in ['huber', 'quantile']:
+        return fit_robust(groups, X, y, loss, alpha, weights, quantile)
+    raise ValueError(f"Invalid loss: {loss}."
+                     f" Use 'ols', 'huber' or 'quantile'.")
+
+
+# Weights of the rows of a dataset
+def _weights(df, weights):
+    if weights is None:
+        return None
+    if weights == 'spread':
+        # Inverse variance, estimated from the upper spread of the timings
+        spread = np.maximum((df['p95'] - df['p50']).to_numpy(float),
+                            SPREAD_RESOLUTION)
+        return 1 / spread**2
+    raise ValueError(f"Invalid weights: {weights}. Use None or 'spread'.")
+
+
+# Column of the modelled statistic
+def _response(df, statistic):
+    if statistic not in STATISTICS:
+        raise ValueError(f"Invalid statistic: {statistic}."
+                         f" Use one of {STATISTICS}.")
+    return df[statistic].to_numpy(float)
+
+
+# Piecewise linear fits for p2p communications ────────────────────────────────
+# The latency of every channel is a continuous piecewise linear function of
+# the message size (a Hockney model for each range of sizes), whose
+# breakpoints are learned among the measured sizes: with the design
+# [1, s, (s - k_1)+, ..., (s - k_m)+] the slope changes by the coefficient of
+# (s - k_j)+ after each breakpoint k_j.
+
+# Channel index of the rows of a dataset
+def _channel(df):
+    invalid = set(df['mapby']) - set(CHANNELS)
+    if invalid:
+        raise ValueError(f"Invalid channels: {sorted(invalid)}."
+                         f" Use one of {CHANNELS}.")
+    return df['mapby'].map(CHANNELS.index).to_numpy(int)
+
+
+# Design matrix of a piecewise linear function of the size
+def _hinge_design(size, breakpoints):
+    # Infinite breakpoints (unused) give null columns
+    size = np.asarray(size, float)[..., None]
+    hinges = np.maximum(size - np.asarray(breakpoints, float), 0.)
+    size = np.broadcast_to(size, hinges.shape[:-1] + (1,))
+    return np.concatenate((np.ones_like(size), size, hinges), axis=-1)
+
+
+# Best breakpoints of a piecewise linear fit of some measured sizes
+def _search_breakpoints(sizes, n, mean, n_breakpoints=P2P_BREAKPOINTS):
+    """Exhaustive search of the breakpoints among the measured sizes.
+
+    The residual sum of squares of the rows only differs by a constant from
+    the one of the mean response of each size, weighted by its number of
+    rows, so every combination of breakpoints is tried at once on the
+    distinct sizes only (e.g. the 23 powers of two of the OSU benchmarks).
+
+    Parameters
+    ----------
+    sizes : numpy.ndarray
+        Distinct measured sizes, sorted.
+    n : numpy.ndarray
+        Number (or total weight) of the rows of each size.
+    mean : numpy.ndarray
+        (Weighted) mean response of each size.
+    n_breakpoints : int, optional
+        Number of breakpoints, by default `P2P_BREAKPOINTS`.
+
+    Returns
+    -------
+    tuple
+        The breakpoints (array of shape (n_breakpoints,), infinite when there
+        are not enough measured sizes) and the parameters of the fit.
+    """
+    breakpoints = np.full(n_breakpoints, np.inf)
+    m = min(n_breakpoints, max(len(sizes) - 2, 0))
+    combinations = np.array(list(itertools.combinations(sizes[1:-1], m)),
+                            dtype=float).reshape(-1, m)
+    candidates = np.concatenate(
+        (combinations, np.full((len(combinations), n_breakpoints - m),
+                               np.inf)), axis=1)
+
+    # Weighted least squares of every candidate, columns scaled to unit norm
+    w = np.sqrt(n)
+    A = _hinge_design(sizes, candidates[:, None, :]) * w[:, None]
+    norm = np.linalg.norm(A, axis=1, keepdims=True)
+    d = np.divide(1., norm, out=np.zeros_like(norm), where=norm > 0)
+    params = (np.linalg.pinv(A * d) @ (mean * w)[:, None])[..., 0]
+    rss = (((A * d) @ params[..., None])[..., 0] - mean * w)**2
+    best = np.argmin(rss.sum(axis=1))
+    breakpoints[:] = candidates[best]
+    return breakpoints, params[best] * d[best, 0]
+
+
+# Breakpoints of every channel
+def _channel_breakpoints(channel, size, y, w, n_breakpoints=P2P_BREAKPOINTS):
+    sizes, z = np.unique(size, return_inverse=True)
+    n, total = np.zeros((4, len(sizes))), np.zeros((4, len(sizes)))
+    np.add.at(n, (channel, z), w)
+    np.add.at(total, (channel, z), w * y)
+    breakpoints = np.full((4, n_breakpoints), np.inf)
+    for c in range(4):
+        measured = n[c] > 0
+        breakpoints[c] = _search_breakpoints(
+            sizes[measured], n[c, measured],
+            total[c, measured] / n[c, measured], n_breakpoints)[0]
+    return breakpoints
+
+
+# Intercepts and slopes of the segments of a piecewise linear fit
+def _segments(params, breakpoints):
+    finite = np.isfinite(breakpoints)
+    d, k = params[2:][finite], breakpoints[finite]
+    return {
+        'breakpoints': k.tolist(),
+        'alpha': (params[0] - np.r_[0., np.cumsum(d * k)]).tolist(),
+        'beta': (params[1] + np.r_[0., np.cumsum(d)]).tolist(),
+    }
+
+
+# Piecewise linear fit of every channel
+def _fit_hockney(alpha=0.05, statistic='latency', loss='ols', weights=None,
+                 quantile=0.5, n_breakpoints=P2P_BREAKPOINTS):
+    import pandas as pd
+
+    df = pd.concat(load_datasets()['p2p'].values())
+    channel, size, y = _channel(df), df['size'].to_numpy(float), _response(
+        df, statistic)
+    w = _weights(df, weights)
+
+    # Breakpoints from the least squares fits, then all the channels at once
+    breakpoints = _channel_breakpoints(
+        channel, size, y, np.ones(len(y)) if w is None else w, n_breakpoints)
+    X = _hinge_design(size, breakpoints[channel])
+    fit = _fit_loss(channel, X, y, alpha, w, loss, quantile)
+    dense = [np.full((4,) + a.shape[1:], np.nan)
+             for a in (fit.params, fit.stderr, fit.conf_int)]
+    for a, values in zip(dense, (fit.params, fit.stderr, fit.conf_int)):
+        a[fit.groups] = values
+    rss, nobs = np.full(4, np.nan), np.zeros(4, dtype=int)
+    rss[fit.groups], nobs[fit.groups] = fit.rss, fit.nobs
+    return FitReport('hockney', None, *dense, rss, nobs,
+                     pd.Series(fit.residuals, index=df.index), None,
+                     breakpoints)
+
+
+def fit_p2p(statistic='latency', loss='ols', weights=None):
+    """Piecewise linear (Hockney) coefficients of each channel.
+
+    Parameters
+    ----------
+    statistic : str, optional
+        The modelled statistic of the timings, one of `STATISTICS`, by
+        default the mean 'latency'.
+    loss, weights : str, optional
+        The loss and the weights of the regressions (see `fit_model`), by
+        default unweighted least squares.
+
+    Returns
+    -------
+    dict
+        For each channel, the sorted 'breakpoints' (sizes in bytes) and the
+        'alpha' and 'beta' lists of the segments: a message of size s above
+        j breakpoints takes alpha[j] + beta[j] * s.
+    """
+    report = _fit_hockney(statistic=statistic, loss=loss, weights=weights)
+    return {channel: _segments(report.params[c], report.breakpoints[c])
+            for c, channel in enumerate(CHANNELS)}
 
 # NBFT fits ────────────────────────────────────────────────────────────────────
 
-# (Broadcast)
-def fit_nbft():
-    # Dictionary to store the linear NBFT fit parameters
-    nbft_coefficients = {'cache': {}, 'core': {}, 'socket': {}, 'node': {}}
+# Channel, size, design matrix and latency of the NBFT fits
+def _nbft_design(df, statistic='latency'):
+    X = np.column_stack((np.ones(len(df)), df['p'].to_numpy(float)))
+    return (_channel(df), df['size'].to_numpy(int), X,
+            _response(df, statistic))
 
-    # For the cache channel, the values of the latency, for every possible size 
-    # and every possible p, are directly copied from the dataset.
-    sizes = nbft_cache['size'].unique()
-    processes = nbft_cache['p'].unique()
-    for size in sizes:
-        nbft_coefficients['cache'][size] = {}
-        for p in processes:
-            nbft_coefficients['cache'][size][p] = nbft_cache[
-                (nbft_cache['size']==size) & 
-                (nbft_cache['p']==p)]['latency'].values[0]
-
-    # Fit
-    sizes = nbft_core['size'].unique()
-    for size in sizes:
-        y = nbft_core[nbft_core['size']==size]['latency']
-        X = nbft_core[nbft_core['size']==size][['p']]
-        X = sm.add_constant(X)
-        core_model = sm.OLS(y, X).fit()
-        nbft_coefficients['core'][size] = list(core_model.params)
-
-    sizes = nbft_socket['size'].unique()
-    for size in sizes:
-        y = nbft_socket[nbft_socket['size']==size]['latency']
-        X = nbft_socket[nbft_socket['size']==size][['p']]
-        X = sm.add_constant(X)
-        socket_model = sm.OLS(y, X).fit()
-        nbft_coefficients['socket'][size] = list(socket_model.params)
-
-    sizes = nbft_node['size'].unique()
-    for size in sizes:
-        y = nbft_node[nbft_node['size']==size]['latency']
-        X = nbft_node[nbft_node['size']==size][['p']]
-        X = sm.add_constant(X)
-        node_model = sm.OLS(y, X).fit()
-        nbft_coefficients['node'][size] = list(node_model.params)
-
-    return nbft_coefficients
-
-# (Reduce
-def fit_nbft_reduce():
-    # Dictionary to store the linear NBFT fit parameters
-    nbft_coefficients = {'cache': {}, 'core': {}, 'socket': {}, 'node': {}}
-
-    # For the cache channel, the values of the latency, for every possible size 
+
+def _fit_nbft(kind, alpha=0.05, statistic='latency', loss='ols',
+              weights=None, quantile=0.5):
+    import pandas as pd
+
+    # For the cache channel, the values of the latency, for every possible size
     # and every possible p, are directly copied from the dataset.
-    sizes = nbft_reduce_cache['size'].unique()
-    processes = nbft_reduce_cache['p'].unique()
-    for size in sizes:
-        nbft_coefficients['cache'][size] = {}
-        for p in processes:
-            nbft_coefficients['cache'][size][p] = nbft_reduce_cache[
-                (nbft_reduce_cache['size']==size) & 
-                (nbft_reduce_cache['p']==p)]['latency'].values[0]
-
-    # Fit
-    sizes = nbft_reduce_core['size'].unique()
-    for size in sizes:
-        y = nbft_reduce_core[nbft_reduce_core['size']==size]['latency']
-        X = nbft_reduce_core[nbft_reduce_core['size']==size][['p']]
-        X = sm.add_constant(X)
-        core_model = sm.OLS(y, X).fit()
-        nbft_coefficients['core'][size] = list(core_model.params)
-
-    sizes = nbft_reduce_socket['size'].unique()
-    for size in sizes:
-        y = nbft_reduce_socket[nbft_reduce_socket['size']==size]['latency']
-        X = nbft_reduce_socket[nbft_reduce_socket['size']==size][['p']]
-        X = sm.add_constant(X)
-        socket_model = sm.OLS(y, X).fit()
-        nbft_coefficients['socket'][size] = list(socket_model.params)
-
-    sizes = nbft_reduce_node['size'].unique()
-    for size in sizes:
-        y = nbft_reduce_node[nbft_reduce_node['size']==size]['latency']
-        X = nbft_reduce_node[nbft_reduce_node['size']==size][['p']]
-        X = sm.add_constant(X)
-        node_model = sm.OLS(y, X).fit()
-        nbft_coefficients['node'][size] = list(node_model.params)
-
-    return nbft_coefficients
+    datasets = load_datasets()[kind]
+    cache = datasets['cache'].drop_duplicates(['size', 'p'])
+    df = pd.concat([datasets[channel] for channel in CHANNELS[1:]])
+    sizes = np.unique(np.concatenate((cache['size'], df['size'])))
+    table = np.full((len(sizes), cache['p'].max() + 1), np.nan)
+    table[np.searchsorted(sizes, cache['size']), cache['p']] = _response(
+        cache, statistic)
+
+    # All the (channel, size) regressions of the latency on p at once
+    channel, size, X, y = _nbft_design(df, statistic)
+    z = np.searchsorted(sizes, size)
+    fit = _fit_loss(np.column_stack((channel, z)), X, y, alpha,
+                    _weights(df, weights), loss, quantile)
+
+    c, z = fit.groups.T
+    dense = []
+    for values in (fit.params, fit.stderr, fit.conf_int, fit.rss, fit.nobs):
+        a = np.full((4, len(sizes)) + values.shape[1:],
+                    0 if values is fit.nobs else np.nan)
+        a[c, z] = values
+        dense.append(a)
+    return FitReport(kind, sizes, *dense[:4], dense[4].astype(int),
+                     pd.Series(fit.residuals, index=df.index), table)
+
+
+# Fit report of a component of the model
+def fit_model(kind, alpha=0.05, statistic='latency', loss='ols',
+              weights=None, quantile=0.5):
+    """Fit one component of the model with a single batched least squares.
+
+    Parameters
+    ----------
+    kind : str
+        The component, 'hockney' (p2p), 'nbft' or 'nbft_reduce'.
+    alpha : float, optional
+        Significance level of the confidence intervals, by default 0.05.
+    statistic : str, optional
+        The modelled statistic of the timings, one of `STATISTICS` (e.g.
+        'p99' for a tail latency model), by default the mean 'latency'.
+    loss : str, optional
+        The loss of the regressions: 'ols' (least squares), 'huber' (robust
+        to the outliers) or 'quantile' (see `fit_robust`), by default 'ols'.
+    weights : str, optional
+        None for unweighted fits, or 'spread' to weight every measurement
+        by the inverse square of its spread (p95 - p50), by default None.
+    quantile : float, optional
+        The quantile fitted by the 'quantile' loss, by default 0.5.
+
+    Returns
+    -------
+    FitReport
+        A named tuple with the fitted 'kind', the message 'sizes' (None for
+        the Hockney fits), the dense 'params', 'stderr' and 'conf_int' arrays
+        indexed by channel (in the order of `CHANNELS`) and size (NaN where
+        nothing was fitted), the residual sum of squares 'rss' and number of
+        points 'nobs' of every regression, the 'residuals' of every row of
+        the dataset, for the NBFT fits, the 'cache' latencies copied from the
+        dataset (array of shape (sizes, p)) and, for the Hockney fits, the
+        'breakpoints' of each channel (the 'params' being the intercept, the
+        slope and its change after each breakpoint).
+
+    Examples
+    --------
+    >>> report = fit_model('nbft')
+    >>> report.params[3, -1]      # node channel alpha, beta at 1 MiB
+    >>> report.conf_int[3, -1]
+    >>> robust = fit_model('hockney', loss='huber', weights='spread')
+    """
+    if kind == 'hockney':
+        return _fit_hockney(alpha, statistic, loss, weights, quantile)
+    if kind in ['nbft', 'nbft_reduce']:
+        return _fit_nbft(kind, alpha, statistic, loss, weights, quantile)
+    raise ValueError(f"Invalid model component: {kind}."
+                     f" Use 'hockney', 'nbft' or 'nbft_reduce'.")
+
+
+# NBFT coefficients in the nested dictionaries of the coefficients cache
+def _nbft_coefficients(report):
+    coefficients = {'cache': {}, 'core': {}, 'socket': {}, 'node': {}}
+    for z, size in enumerate(report.sizes.tolist()):
+        latency = report.cache[z]
+        if not np.isnan(latency).all():
+            coefficients['cache'][size] = {
+                p: float(latency[p]) for p in np.flatnonzero(~np.isnan(latency))
+                .tolist()}
+        for c, channel in enumerate(CHANNELS[1:], start=1):
+            if report.nobs[c, z] > 0:
+                coefficients[channel][size] = report.params[c, z].tolist()
+    return coefficients
+
+# (Broadcast)
+def fit_nbft(statistic='latency', loss='ols', weights=None):
+    return _nbft_coefficients(_fit_nbft('nbft', statistic=statistic,
+                                        loss=loss, weights=weights))
+
+# (Reduce)
+def fit_nbft_reduce(statistic='latency', loss='ols', weights=None):
+    return _nbft_coefficients(_fit_nbft('nbft_reduce', statistic=statistic,
+                                        loss=loss, weights=weights))
+
+# Incremental fits ─────────────────────────────────────────────────────────────
+# Every regression keeps its sufficient statistics (number of points, XᵀX,
+# Xᵀy and yᵀy), so that new measurements are folded in with work
+# proportional to their number, without reading the datasets again. The cache
+# latencies keep the sum and the number of their measurements, and the p2p
+# fits the number, sum and sum of squares of the latencies of every size (the
+# breakpoints can then be searched again).
+
+# Sufficient statistics of the least squares fits of some groups
+def _statistics(groups, X, y, n_groups):
+    xtx = np.zeros((n_groups, X.shape[1], X.shape[1]))
+    np.add.at(xtx, groups, X[:, :, None] * X[:, None, :])
+    xty = np.zeros((n_groups, X.shape[1]))
+    np.add.at(xty, groups, X * y[:, None])
+    return {'n': np.bincount(groups, minlength=n_groups), 'xtx': xtx,
+            'xty': xty, 'yty': np.bincount(groups, y * y, minlength=n_groups)}
+
+
+# Least squares parameters from the sufficient statistics
+def _solve(xtx, xty):
+    # Normal equations scaled to a unit diagonal (the Hockney terms span
+    # several orders of magnitude), solved with a pseudo-inverse
+    d = np.sqrt(np.diagonal(xtx, axis1=-2, axis2=-1))
+    d = np.divide(1., d, out=np.zeros_like(d), where=d > 0)
+    scaled = xtx * d[..., :, None] * d[..., None, :]
+    return d * (np.linalg.pinv(scaled) @ (d * xty)[..., None])[..., 0]
+
+
+# Empty statistics of the p2p fits
+def _hockney_statistics():
+    return {'sizes': np.zeros(0, dtype=int), 'n': np.zeros((4, 0), dtype=int),
+            'sum': np.zeros((4, 0)), 'sumsq': np.zeros((4, 0))}
+
+
+# Empty statistics of the NBFT fits
+def _nbft_statistics():
+    return {'sizes': np.zeros(0, dtype=int), 'n': np.zeros((4, 0), dtype=int),
+            'xtx': np.zeros((4, 0, 2, 2)), 'xty': np.zeros((4, 0, 2)),
+            'yty': np.zeros((4, 0)), 'cache_sum': np.zeros((0, 0)),
+            'cache_count': np.zeros((0, 0), dtype=int)}
+
+
+# Fold measurements into the statistics of the p2p fits
+def _fold_hockney(statistics, df, statistic='latency'):
+    channel, size, y = _channel(df), df['size'].to_numpy(int), _response(
+        df, statistic)
+    old = statistics['sizes']
+    sizes = np.union1d(old, size)
+    grown = {'sizes': sizes}
+    for key in ['n', 'sum', 'sumsq']:
+        grown[key] = np.zeros((4, len(sizes)), dtype=statistics[key].dtype)
+        grown[key][:, np.searchsorted(sizes, old)] = statistics[key]
+    z = np.searchsorted(sizes, size)
+    np.add.at(grown['n'], (channel, z), 1)
+    np.add.at(grown['sum'], (channel, z), y)
+    np.add.at(grown['sumsq'], (channel, z), y * y)
+    return grown, np.unique(channel)
+
+
+# Fold measurements into the statistics of the NBFT fits
+def _fold_nbft(statistics, df, statistic='latency'):
+    channel, size, X, y = _nbft_design(df, statistic)
+    p = df['p'].to_numpy(int)
+
+    # Make room for the new sizes and numbers of processes
+    old = statistics['sizes']
+    sizes = np.union1d(old, size)
+    max_p = max(statistics['cache_sum'].shape[1] - 1, p.max(initial=0))
+    grown = {}
+    for key, value in statistics.items():
+        if key == 'sizes':
+            continue
+        if key.startswith('cache'):
+            shape = (len(sizes), max_p + 1)
+            index = (np.searchsorted(sizes, old),
+                     slice(0, value.shape[1]))
+        else:
+            shape = (4, len(sizes)) + value.shape[2:]
+            index = (slice(None), np.searchsorted(sizes, old))
+        grown[key] = np.zeros(shape, dtype=value.dtype)
+        grown[key][index] = value
+    statistics = dict(grown, sizes=sizes)
+    z = np.searchsorted(sizes, size)
+
+    # Cache latencies: sums and counts of every (size, p)
+    cache = channel == 0
+    np.add.at(statistics['cache_sum'], (z[cache], p[cache]), y[cache])
+    np.add.at(statistics['cache_count'], (z[cache], p[cache]), 1)
+
+    # Other channels: statistics of every (channel, size) regression
+    fitted = ~cache
+    groups = channel[fitted] * len(sizes) + z[fitted]
+    new = _statistics(groups, X[fitted], y[fitted], 4 * len(sizes))
+    for key, value in new.items():
+        statistics[key] += value.reshape((4, len(sizes)) + value.shape[1:])
+    touched = np.unique(np.column_stack((channel, z))[fitted], axis=0)
+    touched_cache = np.unique(np.column_stack((z, p))[cache], axis=0)
+    return statistics, touched, touched_cache
+
+
+# Statistics of the datasets
+def fit_statistics(statistic='latency'):
+    """Sufficient statistics of all the fits of the model on the datasets.
+
+    Parameters
+    ----------
+    statistic : str, optional
+        The modelled statistic of the timings, one of `STATISTICS`, by
+        default the mean 'latency'.
+
+    Returns
+    -------
+    dict
+        For 'hockney', the number of points 'n', the 'sum' and the sum of
+        squares 'sumsq' of the latencies of each channel and message size
+        ('sizes'). For 'nbft' and 'nbft_reduce', the number of points 'n',
+        'xtx', 'xty' and 'yty' of the regression of each channel and size,
+        plus the sum ('cache_sum') and number ('cache_count') of the cache
+        latencies of each size and p.
+    """
+    import pandas as pd
+
+    datasets = load_datasets()
+    statistics = {'hockney': _fold_hockney(
+        _hockney_statistics(), pd.concat(datasets['p2p'].values()),
+        statistic)[0]}
+    for kind in ['nbft', 'nbft_reduce']:
+        statistics[kind] = _fold_nbft(
+            _nbft_statistics(), pd.concat(datasets[kind].values()),
+            statistic)[0]
+    return statistics
+
+
+# Fold new measurements into the model
+def update_coefficients(kind, measurements, save=True, statistic='latency'):
+    """Update the fitted model with new measurements, without refitting.
+
+    The new rows are folded into the sufficient statistics of the fits
+    (kept in the coefficients cache) and only the regressions they touch are
+    solved again, so the cost only depends on the number of new rows. The
+    datasets are not read again: `load_coefficients(refresh=True)` drops all
+    the updates and fits the datasets from scratch. Only the unweighted
+    least squares models have sufficient statistics: the robust and weighted
+    models of `load_coefficients` are not updated.
+
+    Parameters
+    ----------
+    kind : str
+        The measured component, 'p2p', 'nbft' or 'nbft_reduce'.
+    measurements : pandas.DataFrame or dict
+        The new rows, with the same columns as the datasets ('mapby', 'size',
+        the modelled statistic and, for the NBFTs, 'p').
+    save : bool, optional
+        Write the updated coefficients to the on-disk cache, by default True.
+    statistic : str, optional
+        The updated model, one of `STATISTICS`, by default the mean
+        'latency'.
+
+    Returns
+    -------
+    dict
+        The updated coefficients (see `load_coefficients`).
+
+    Examples
+    --------
+    >>> df = pd.read_csv('datasets/new_p2p.csv')
+    >>> update_coefficients('p2p', df)
+    """
+    import pandas as pd
+
+    if kind not in ['p2p', 'nbft', 'nbft_reduce']:
+        raise ValueError(f"Invalid kind: {kind}."
+                         f" Use 'p2p', 'nbft' or 'nbft_reduce'.")
+    df = pd.DataFrame(measurements)
+    columns = ['mapby', 'size', statistic] + (['p'] if kind != 'p2p' else [])
+    missing = [c for c in columns if c not in df]
+    if missing:
+        raise ValueError(f"Missing columns in the measurements: {missing}.")
+
+    load_coefficients(statistic=statistic)
+    with _coefficients_lock:
+        coefficients = dict(_coefficients[statistic, 'ols', None])
+        statistics = dict(coefficients['statistics'])
+
+        if kind == 'p2p':
+            statistics['hockney'], touched = _fold_hockney(
+                statistics['hockney'], df, statistic)
+            hockney = dict(coefficients['hockney'])
+            stats = statistics['hockney']
+            for c in touched.tolist():
+                measured = stats['n'][c] > 0
+                if measured.sum() < 2:
+                    continue
+                n = stats['n'][c, measured]
+                breakpoints, params = _search_breakpoints(
+                    stats['sizes'][measured].astype(float), n,
+                    stats['sum'][c, measured] / n)
+                hockney[CHANNELS[c]] = _segments(params, breakpoints)
+            coefficients['hockney'] = hockney
+        else:
+            statistics[kind], touched, touched_cache = _fold_nbft(
+                statistics[kind], df, statistic)
+            stats = statistics[kind]
+            sizes = stats['sizes'].tolist()
+            table = {channel: dict(values)
+                     for channel, values in coefficients[kind].items()}
+            for z, p in touched_cache.tolist():
+                table['cache'][sizes[z]] = dict(table['cache'].get(sizes[z],
+                                                                   {}))
+                table['cache'][sizes[z]][p] = float(
+                    stats['cache_sum'][z, p] / stats['cache_count'][z, p])
+            for c, z in touched.tolist():
+                if stats['n'][c, z] >= 2:
+                    table[CHANNELS[c]][sizes[z]] = _solve(
+                        stats['xtx'][c, z], stats['xty'][c, z]).tolist()
+            coefficients[kind] = table
+
+        coefficients['statistics'] = statistics
+        _coefficients[statistic, 'ols', None] = coefficients
+
+    if save:
+        _save_coefficients(coefficients, statistic)
+    return coefficients
+
+# Coefficients cache ───────────────────────────────────────────────────────────
+
+def datasets_hash():
+    """Content hash of the datasets the model is fitted on.
+
+    Returns
+    -------
+    str
+        The hexadecimal SHA-256 digest of the columns and metadata of the
+        binary p2p and NBFT datasets.
+    """
+    digest = hashlib.sha256(f'v{CACHE_VERSION}'.encode())
+    for kind in DATASETS:
+        directory = os.path.join(data_dir, kind)
+        with open(os.path.join(directory, 'meta.json'), 'rb') as f:
+            meta = f.read()
+        digest.update(meta)
+        for name in json.loads(meta)['columns']:
+            with open(os.path.join(directory, f'{name}.npy'), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_dir():
+    """Directory where the fitted coefficients are cached.
+
+    The location can be changed with the ``EPYC_CACHE_DIR`` environment
+    variable, otherwise ``$XDG_CACHE_HOME/epyc`` (or ``~/.cache/epyc``)
+    is used.
+    """
+    if os.environ.get('EPYC_CACHE_DIR'):
+        return os.environ['EPYC_CACHE_DIR']
+    xdg = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+    return os.path.join(xdg, 'epyc')
+
+
+def _to_json(coefficients):
+    # JSON only accepts string keys and plain Python numbers
+    def convert(obj):
+        if isinstance(obj, dict):
+            return {str(int(k)) if not isinstance(k, str) else k: convert(v)
+                    for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [float(v) for v in obj]
+        return float(obj)
+    data = convert({key: coefficients[key]
+                    for key in ['hockney', 'nbft', 'nbft_reduce']})
+    data['statistics'] = {kind: {key: np.asarray(value).tolist()
+                                 for key, value in statistics.items()}
+                          for kind, statistics in
+                          coefficients['statistics'].items()}
+    return data
+
+
+def _from_json(data):
+    # Restore the integer keys used for sizes and number of processes
+    def convert(obj):
+        if isinstance(obj, dict):
+            return {int(k): convert(v) for k, v in obj.items()}
+        return obj
+    coefficients = {'hockney': data['hockney']}
+    for key in ['nbft', 'nbft_reduce']:
+        coefficients[key] = {channel: convert(table)
+                             for channel, table in data[key].items()}
+    integer = ['n', 'sizes', 'cache_count']
+    coefficients['statistics'] = {
+        kind: {key: np.asarray(value, dtype=int if key in integer else float)
+               for key, value in statistics.items()}
+        for kind, statistics in data['statistics'].items()}
+    return coefficients
+
+
+def load_coefficients(refresh=False, statistic='latency', loss='ols',
+                      weights=None):
+    """Load the fitted model coefficients, fitting them only if needed.
+
+    The coefficients are cached on disk keyed by the content hash of the
+    datasets and by the model (e.g. ``coefficients-<hash>-huber-spread.json``),
+    so the fits are computed once and later runs only read a small JSON
+    file. They are also kept in memory after the first call.
+
+    Parameters
+    ----------
+    refresh : bool, optional
+        Ignore any cached result and fit the model again, by default False.
+    statistic : str, optional
+        The modelled statistic of the timings, one of `STATISTICS`: the mean
+        'latency' (default) or a percentile for the tail latency models
+        (e.g. 'p99').
+    loss : str, optional
+        The loss of the regressions, one of `LOSSES`: 'ols' (default),
+        'huber' for a model robust to the outliers or 'quantile' for the
+        median regressions (see `fit_model`).
+    weights : str, optional
+        None for unweighted fits (default), or 'spread' to weight every
+        measurement by the inverse square of its spread (p95 - p50).
+
+    Returns
+    -------
+    dict
+        A dictionary with keys 'hockney', 'nbft' and 'nbft_reduce' holding
+        the same structures returned by `fit_p2p`, `fit_nbft` and
+        `fit_nbft_reduce`, and 'statistics' holding the sufficient
+        statistics of the fits (see `fit_statistics`, empty for the robust
+        and weighted models).
+
+    Examples
+    --------
+    >>> robust = load_coefficients(loss='huber', weights='spread')
+    """
+    model = (statistic, loss, weights)
+    coefficients = _coefficients.get(model)
+    if coefficients is not None and not refresh:
+        return coefficients
+    if statistic not in STATISTICS:
+        raise ValueError(f"Invalid statistic: {statistic}."
+                         f" Use one of {STATISTICS}.")
+    if loss not in LOSSES:
+        raise ValueError(f"Invalid loss: {loss}. Use one of {LOSSES}.")
+    if weights not in [None, 'spread']:
+        raise ValueError(f"Invalid weights: {weights}. Use None or 'spread'.")
+
+    # Only one thread fits (or reads) the coefficients
+    with _coefficients_lock:
+        if model in _coefficients and not refresh:
+            return _coefficients[model]
+        _coefficients[model] = _load_coefficients(refresh, *model)
+    return _coefficients[model]
+
+
+# Path of the coefficients cache of the current datasets
+def _cache_path(statistic='latency', loss='ols', weights=None):
+    suffix = ''.join(f'-{name}' for name, default in
+                     [(statistic, 'latency'), (loss, 'ols'), (weights, None)]
+                     if name != default)
+    return os.path.join(cache_dir(),
+                        f'coefficients-{datasets_hash()[:16]}{suffix}.json')
+
+
+def _load_coefficients(refresh, statistic, loss='ols', weights=None):
+    path = _cache_path(statistic, loss, weights)
+
+    if not refresh and os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return _from_json(json.load(f))
+        except (OSError, ValueError, KeyError):
+            pass  # Corrupted cache: fit again
+
+    # The sufficient statistics only describe the unweighted least squares
+    least_squares = loss == 'ols' and weights is None
+    coefficients = {
+        'hockney': fit_p2p(statistic, loss, weights),
+        'nbft': fit_nbft(statistic, loss, weights),
+        'nbft_reduce': fit_nbft_reduce(statistic, loss, weights),
+        'statistics': fit_statistics(statistic) if least_squares else {},
+    }
+    return _from_json(_save_coefficients(coefficients, statistic, loss,
+                                         weights))
+
+
+# Write the coefficients cache, returning its JSON data
+def _save_coefficients(coefficients, statistic='latency', loss='ols',
+                       weights=None):
+    data = _to_json(coefficients)
+    path = _cache_path(statistic, loss, weights)
+
+    # Writing the cache is best effort (e.g. read-only home directories)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+    return data
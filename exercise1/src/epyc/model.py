@@ -0,0 +1,120 @@
+import numpy as np
+
+from .tables import cache_latency, nbft_table, p2p_latency
+
+# Vectorized latency model ─────────────────────────────────────────────────────
+
+# Latency of a set of sender events (same arithmetic as Process.send)
+def send_cost(counts, sizes, kind='nbft', statistic='latency', loss='ols',
+              weights=None):
+    """Latency of senders reaching their receivers through an NBFT.
+
+    Every sender is described by the number of receivers it reaches through
+    each channel, and its latency is computed as in `Process.send` (or
+    `Process.send_reduce`), for all the sizes at once.
+
+    Parameters
+    ----------
+    counts : numpy.ndarray
+        Array of shape (senders, 4) with the number of receivers reached
+        through each channel.
+    sizes : array_like
+        Message sizes in bytes, either the same for all the senders (shape
+        (sizes,)) or one row per sender (shape (senders, sizes)).
+    kind : str, optional
+        The NBFT fit to use, 'nbft' (broadcast) or 'nbft_reduce', by default
+        'nbft'.
+    statistic : str, optional
+        The modelled statistic of the timings, 'latency' (mean, default) or
+        a percentile such as 'p99' (see `load_coefficients`).
+    loss, weights : str, optional
+        The loss and the weights of the fits, by default unweighted least
+        squares (see `load_coefficients`).
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (senders, sizes) with the latencies. Sizes and numbers
+        of processes that have not been measured are interpolated or
+        extrapolated (see `nbft_table` and `cache_latency`).
+    """
+    counts = np.asarray(counts)
+    sizes = np.asarray(sizes)
+
+    # Model tables over the distinct sizes, indexed by iz for every entry
+    unique, iz = np.unique(sizes, return_inverse=True)
+    iz = np.broadcast_to(iz.reshape(sizes.shape),
+                         (len(counts), sizes.shape[-1]))
+    t_p2p = p2p_latency(unique, statistic, loss, weights)
+    cache, alpha, beta = nbft_table(unique, kind, statistic, loss, weights)
+
+    n = [counts[:, c, None].astype(float) for c in range(4)]
+    top = np.where(counts[:, 3] > 0, 3,
+          np.where(counts[:, 2] > 0, 2,
+          np.where(counts[:, 1] > 0, 1, 0)))
+
+    cost = np.full(iz.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for c in range(1, 4):
+            mask = top == c
+            if not mask.any():
+                continue
+            t = t_p2p[:, iz[mask]]
+            p = n[c][mask]
+            for k in range(c - 1, -1, -1):
+                p = p + n[k][mask] // (t[c] / t[k])
+            p = p + 1
+            t_c = alpha[c][iz[mask]] + beta[c][iz[mask]] * p
+            cost[mask] = (t_c / t[c]) * t[c]
+
+        # Cache channel: latencies copied from the dataset for each p
+        mask = top == 0
+        if mask.any():
+            rows = iz[mask]
+            p = np.broadcast_to(counts[mask, 0, None] + 1, rows.shape)
+            t = t_p2p[0][rows]
+            t_c = cache_latency(cache[rows.ravel()],
+                                p.ravel()).reshape(rows.shape)
+            cost[mask] = (t_c / t) * t
+
+    return cost
+
+
+# Latency of senders sending a fraction of the message
+def event_cost(counts, fractions, sizes, kind='nbft', statistic='latency',
+               loss='ols', weights=None):
+    """Latency of senders each sending a fraction of the message.
+
+    Parameters
+    ----------
+    counts : numpy.ndarray
+        Array of shape (senders, 4) with the number of receivers reached
+        through each channel.
+    fractions : numpy.ndarray
+        Array of shape (senders, 2) with the numerator and denominator of the
+        fraction of the message sent by each sender (e.g. the chunks of a
+        scatter). Chunks are rounded up to whole bytes, and empty messages
+        (e.g. of a barrier) are costed as 1 byte messages.
+    sizes : array_like
+        Message sizes in bytes.
+    kind : str, optional
+        The NBFT fit to use, 'nbft' (broadcast) or 'nbft_reduce', by default
+        'nbft'.
+    statistic : str, optional
+        The modelled statistic of the timings, 'latency' (mean, default) or
+        a percentile such as 'p99' (see `load_coefficients`).
+    loss, weights : str, optional
+        The loss and the weights of the fits, by default unweighted least
+        squares (see `load_coefficients`).
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (senders, sizes) with the latencies.
+    """
+    sizes = np.asarray(sizes)
+    if (fractions[:, 0] == fractions[:, 1]).all():
+        return send_cost(counts, sizes, kind, statistic, loss, weights)
+    chunks = -(-sizes[None, :] * fractions[:, :1] // fractions[:, 1:])
+    return send_cost(counts, np.maximum(chunks, 1), kind, statistic, loss,
+                     weights)
@@ -1,6 +1,8 @@
-import itertools
-from .node import Node
-from . import NODES, CORES_PER_SOCKET, SOCKETS_PER_NODE
+import numpy as np
+
+from .cluster import DEFAULT_CLUSTER
+from .process import ProcessList
+from .schedule import PIPELINE_SEGMENT_SIZE, compile_schedule
 
 # MPI simulation functions ─────────────────────────────────────────────────────
 
@@ -8,6 +10,11 @@ from . import NODES, CORES_PER_SOCKET, SOCKETS_PER_NODE
 def initialize(*nodes, n_processes=1, mapby='core'):
     """Initialize the nodes with processes simulating MPI initialization.
 
+    The processes already running on the nodes are removed first. For the
+    nodes created with `Node()`, so are the ones still running on the other
+    nodes of the default cluster: every group of bare nodes can be
+    initialized again, like a new MPI job.
+
     Parameters
     ----------
     nodes : Node
@@ -19,56 +26,24 @@ def initialize(*nodes, n_processes=1, mapby='core'):
 
     Returns
     -------
-    list
-        A list of processes initialized in the nodes in id order.
+    ProcessList
+        A list of processes initialized in the nodes in id order, carrying
+        their locality as arrays.
     """
 
-    # Remove all resudual processes if there are any
-    for node in nodes:
-        node.remove_all_processes()
-
-    processes_list = []
-    n_id = 0
-    p = 0
-    if mapby == 'core':
-        s_id = 0
-        while n_processes > 0:
-            if nodes[n_id].is_full():
-                n_id += 1
-                s_id = 0
-            if not nodes[n_id].add_process(p, s_id):
-                s_id += 1
-            else:
-                processes_list.append(nodes[n_id].get_process(p))
-                p += 1
-                n_processes -= 1
-    elif mapby == 'socket':
-        s_iter = itertools.cycle(range(SOCKETS_PER_NODE))
-        while n_processes > 0:
-            if nodes[n_id].is_full():
-                n_id += 1
-            if not nodes[n_id].add_process(p, next(s_iter)):
-                n_id += 1
-            else:
-                processes_list.append(nodes[n_id].get_process(p))
-                p += 1
-                n_processes -= 1
-    elif mapby == 'node':
-        n_iter = itertools.cycle(range(NODES))
-        s_seq = [i for i in range(SOCKETS_PER_NODE) for _ in range(NODES)]
-        s_iter = itertools.cycle(s_seq)
-        while n_processes > 0:
-            n_id = next(n_iter)
-            s_id = next(s_iter)
-            nodes[n_id].add_process(p, s_id)
-            processes_list.append(nodes[n_id].get_process(p))
-            p += 1
-            n_processes -= 1
-    else:
-        raise ValueError(f"Invalid mapping method: {mapby}."
-                         f" Use 'core', 'socket' or 'node'.")
-    
-    return processes_list
+    # All the nodes must belong to the same cluster
+    topology = nodes[0].topology
+    if any(node.topology is not topology for node in nodes):
+        raise ValueError("All the nodes must belong to the same cluster.")
+
+    # Place the processes (removing any residual one) in a single shot. The
+    # nodes created with Node() share the default cluster, so the processes
+    # still running on the nodes of a previous initialization are released
+    topology.place(n_processes, mapby, [node.id for node in nodes],
+                   release=nodes[0].cluster is DEFAULT_CLUSTER)
+
+    return ProcessList([topology.get_process(p) for p in range(n_processes)],
+                       *topology.locality(np.arange(n_processes)))
 
 # Broadcast algorithms ─────────────────────────────────────────────────────────
 
@@ -86,85 +61,63 @@ def linear_bcast(processes_list, size=1):
 # Chain Broadcast
 def chain_bcast(processes_list, size=1, segments=1):
 
-    latency = 0
+    # The schedule only depends on the placement and on the segments, hence
+    # it is compiled once and reused for every message size
+    schedule = compile_schedule('chain', processes_list, segments)
 
-    # Prepare receivers
-    for process in processes_list:
-        process.sending = False
-        process.sent_segments = 0
-        process.received = False
-        process.received_segments = 0
+    return schedule.latency(size)
 
-        # Each process will be sending to the next one (except last)
-        if process.id < len(processes_list) - 1:
-            process.receivers = [processes_list[process.id + 1]]
+# Binary tree Broadcast
+def binary_bcast(processes_list, size=1, segments=1):
 
-    # Prepare master
-    master = processes_list[0]
-    master.sending = True
-    master.received = True
-    master.received_segments = segments
+    # The schedule only depends on the placement and on the segments, hence
+    # it is compiled once and reused for every message size
+    schedule = compile_schedule('binary', processes_list, segments)
 
-    while not all([process.received for process in processes_list]):
+    return schedule.latency(size)
 
-        # Initialize empty times list
-        times = []
+# Binomial tree Broadcast
+def binomial_bcast(processes_list, size=1, segments=1):
 
-        # Find all the senders that did not finished last iteration
-        senders = [p for p in processes_list[:-1] if p.sending]
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('binomial', processes_list, segments)
 
-        # Send the message to the receivers
-        for sender in senders:
-            times.append(sender.send(sender.receivers, size, segments)/segments)
+    return schedule.latency(size)
 
-        # Update latency
-        latency += max(times)
-    
-    return latency
+# K-nomial tree Broadcast (radix KNOMIAL_RADIX)
+def knomial_bcast(processes_list, size=1, segments=1):
 
-# Binary tree Broadcast
-def binary_bcast(processes_list, size=1, segments=1):
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('knomial', processes_list, segments)
 
-    latency = 0
-
-    # Prepare receivers
-    for process in processes_list:
-        process.sending = False
-        process.sent_segments = 0
-        process.received = False
-        process.received_segments = 0
-        process.receivers = []
-
-        # In a binary tree, each process will be sending to two others
-        child1 = 2*process.id + 1
-        child2 = 2*process.id + 2
-        if child1 < len(processes_list):
-            process.receivers.append(processes_list[child1])
-        if child2 < len(processes_list):
-            process.receivers.append(processes_list[child2])
-
-    # Prepare master
-    master = processes_list[0]
-    master.sending = True
-    master.received = True
-    master.received_segments = segments
+    return schedule.latency(size)
 
-    while not all([process.received for process in processes_list]):
+# Split binary tree Broadcast
+def split_binary_bcast(processes_list, size=1, segments=1):
 
-        # Initialize empty times list
-        times = []
+    # Each half of the message goes down one subtree of the root, then the
+    # processes of the two subtrees exchange their halves
+    schedule = compile_schedule('split_binary', processes_list, segments)
 
-        # Find all the senders that did not finished last iteration
-        senders = [p for p in processes_list[:-1] if p.sending and not p.receivers == []]
+    return schedule.latency(size)
 
-        # Send the message to the receivers
-        for sender in senders:
-            times.append(sender.send(sender.receivers, size, segments)/segments)
-            
-        # Update latency
-        latency += max(times)
-    
-    return latency
+# Pipeline Broadcast (chain sending segments of segment_size bytes)
+def pipeline_bcast(processes_list, size=1,
+                   segment_size=PIPELINE_SEGMENT_SIZE):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('pipeline', processes_list,
+                                segment_size=segment_size)
+
+    return schedule.latency(size)
+
+# Scatter + ring allgather Broadcast
+def scatter_allgather_bcast(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('scatter_allgather', processes_list)
+
+    return schedule.latency(size)
 
 # Reduce algorithms ────────────────────────────────────────────────────────────
 
@@ -182,82 +135,193 @@ def linear_reduce(processes_list, size=1):
 # Chain Reduce
 def chain_reduce(processes_list, size=1, segments=1):
 
-    latency = 0
+    # The schedule only depends on the placement and on the segments, hence
+    # it is compiled once and reused for every message size
+    schedule = compile_schedule('chain', processes_list, segments)
 
-    # Prepare receivers
-    for process in processes_list:
-        process.sending = False
-        process.sent_segments = 0
-        process.received = False
-        process.received_segments = 0
+    return schedule.latency(size, 'nbft_reduce')
 
-        # Each process will be sending to the next one (except last)
-        if process.id < len(processes_list) - 1:
-            process.receivers = [processes_list[process.id + 1]]
+# Binary tree Reduce
+def binary_reduce(processes_list, size=1, segments=1):
 
-    # Prepare master
-    master = processes_list[0]
-    master.sending = True
-    master.received = True
-    master.received_segments = segments
+    # The schedule only depends on the placement and on the segments, hence
+    # it is compiled once and reused for every message size
+    schedule = compile_schedule('binary', processes_list, segments)
 
-    while not all([process.received for process in processes_list]):
+    return schedule.latency(size, 'nbft_reduce')
 
-        # Initialize empty times list
-        times = []
+# Binomial tree Reduce
+def binomial_reduce(processes_list, size=1, segments=1):
 
-        # Find all the senders that did not finished last iteration
-        senders = [p for p in processes_list[:-1] if p.sending]
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('binomial', processes_list, segments)
 
-        # Send the message to the receivers
-        for sender in senders:
-            times.append(sender.send_reduce(sender.receivers, size, segments)/segments)
+    return schedule.latency(size, 'nbft_reduce')
 
-        # Update latency
-        latency += max(times)
-    
-    return latency
+# Pipeline Reduce (chain sending segments of segment_size bytes)
+def pipeline_reduce(processes_list, size=1,
+                    segment_size=PIPELINE_SEGMENT_SIZE):
 
-# Binary tree Reduce
-def binary_reduce(processes_list, size=1, segments=1):
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('pipeline', processes_list,
+                                segment_size=segment_size)
+
+    return schedule.latency(size, 'nbft_reduce')
+
+# Allgather algorithms ─────────────────────────────────────────────────────────
+# The size is the block of each process, as in osu_allgather
+
+# Ring Allgather
+def ring_allgather(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('ring_allgather', processes_list)
+
+    return schedule.latency(size)
+
+# Recursive doubling Allgather
+def recursive_doubling_allgather(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('recursive_doubling_allgather', processes_list)
+
+    return schedule.latency(size)
+
+# Bruck Allgather
+def bruck_allgather(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('bruck_allgather', processes_list)
+
+    return schedule.latency(size)
+
+# Allreduce algorithms ─────────────────────────────────────────────────────────
+# The size is the whole vector, as in osu_allreduce
+
+# Ring Allreduce (ring reduce_scatter + ring allgather)
+def ring_allreduce(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('ring_allreduce', processes_list)
+
+    return schedule.latency(size, 'nbft_reduce')
+
+# Recursive doubling Allreduce
+def recursive_doubling_allreduce(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('recursive_doubling_allreduce', processes_list)
+
+    return schedule.latency(size, 'nbft_reduce')
+
+# Rabenseifner Allreduce (recursive halving + recursive doubling)
+def rabenseifner_allreduce(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('rabenseifner_allreduce', processes_list)
 
-    latency = 0
-
-    # Prepare receivers
-    for process in processes_list:
-        process.sending = False
-        process.sent_segments = 0
-        process.received = False
-        process.received_segments = 0
-        process.receivers = []
-
-        # In a binary tree, each process will be sending to two others
-        child1 = 2*process.id + 1
-        child2 = 2*process.id + 2
-        if child1 < len(processes_list):
-            process.receivers.append(processes_list[child1])
-        if child2 < len(processes_list):
-            process.receivers.append(processes_list[child2])
-
-    # Prepare master
+    return schedule.latency(size, 'nbft_reduce')
+
+# Alltoall algorithms ──────────────────────────────────────────────────────────
+# The size is the block sent to each process, as in osu_alltoall
+
+# Linear Alltoall
+def linear_alltoall(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('linear_alltoall', processes_list)
+
+    return schedule.latency(size)
+
+# Pairwise Alltoall
+def pairwise_alltoall(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('pairwise_alltoall', processes_list)
+
+    return schedule.latency(size)
+
+# Bruck Alltoall
+def bruck_alltoall(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('bruck_alltoall', processes_list)
+
+    return schedule.latency(size)
+
+# Scatter and Gather algorithms ────────────────────────────────────────────────
+# The size is the block of each process, as in osu_scatter and osu_gather
+
+# Linear Scatter
+def linear_scatter(processes_list, size=1):
+
+    # The master sends its block to every other process at once
+    master = processes_list[0]
+    receivers = processes_list[1:]
+
+    return master.send(receivers, size)
+
+# Binomial tree Scatter
+def binomial_scatter(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('binomial_scatter', processes_list)
+
+    return schedule.latency(size)
+
+# Linear Gather
+def linear_gather(processes_list, size=1):
+
+    # Every other process sends its block to the master at once
     master = processes_list[0]
-    master.sending = True
-    master.received = True
-    master.received_segments = segments
-
-    while not all([process.received for process in processes_list]):
-
-        # Initialize empty times list
-        times = []
-
-        # Find all the senders that did not finished last iteration
-        senders = [p for p in processes_list[:-1] if p.sending and not p.receivers == []]
-
-        # Send the message to the receivers
-        for sender in senders:
-            times.append(sender.send_reduce(sender.receivers, size, segments)/segments)
-            
-        # Update latency
-        latency += max(times)
-    
-    return latency
+    senders = processes_list[1:]
+
+    return master.send_reduce(senders, size)
+
+# Binomial tree Gather
+def binomial_gather(processes_list, size=1):
+
+    # Same tree as the scatter, walked from the leaves to the root
+    schedule = compile_schedule('binomial_scatter', processes_list)
+
+    return schedule.latency(size, 'nbft_reduce')
+
+# Reduce_scatter algorithms ────────────────────────────────────────────────────
+# The size is the whole vector, as in osu_reduce_scatter
+
+# Ring Reduce_scatter
+def ring_reduce_scatter(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('ring_reduce_scatter', processes_list)
+
+    return schedule.latency(size, 'nbft_reduce')
+
+# Recursive halving Reduce_scatter
+def recursive_halving_reduce_scatter(processes_list, size=1):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('recursive_halving_reduce_scatter',
+                                processes_list)
+
+    return schedule.latency(size, 'nbft_reduce')
+
+# Barrier algorithms ───────────────────────────────────────────────────────────
+# Barrier messages are empty: the size is only accepted for uniformity with
+# the other collectives and does not change the latency
+
+# Recursive doubling Barrier
+def recursive_doubling_barrier(processes_list, size=0):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('recursive_doubling_barrier', processes_list)
+
+    return schedule.latency(size)
+
+# Bruck (dissemination) Barrier
+def bruck_barrier(processes_list, size=0):
+
+    # Compiled (and cached) schedule of the collective on these processes
+    schedule = compile_schedule('bruck_barrier', processes_list)
+
+    return schedule.latency(size)
@@ -1,5 +1,4 @@
 from .socket import Socket
-from . import NODES, SOCKETS_PER_NODE, CORES_PER_SOCKET, MAX_PROC_ID, ASSIGNED_IDS
 
 # Node class ───────────────────────────────────────────────────────────────────
 class Node:
@@ -7,12 +6,21 @@ class Node:
 
     Parameters
     ----------
-    None
+    cluster : Cluster, optional
+        The cluster the node belongs to. By default the node is added to
+        a shared cluster that grows every time a new node is created.
+    id : int, optional
+        The ID of an existing node of the cluster. By default a new node is
+        added to the cluster.
 
     Attributes
     ----------
     id : int
         The node ID.
+    cluster : Cluster
+        The cluster the node belongs to.
+    topology : Topology
+        The topology holding the state of the node.
     sockets : list
         The list of sockets in the node.
 
@@ -22,58 +30,36 @@ class Node:
     >>> n2 = Node()
     """
 
-    # Class variable to keep track of IDs
-    next_id = 0
-
     # Constructor
-    def __init__(self):
-        self.id = Node.next_id
-
-        # Check if the maximum number of nodes has been reached
-        if Node.next_id == NODES:
-            raise ValueError(f"Maximum number of nodes ({NODES})"
-                             f" already reached.")
-        Node.next_id += 1
-        self.sockets = [Socket(self.id) for i in range(SOCKETS_PER_NODE)]
+    def __init__(self, cluster=None, id=None):
+        if cluster is None:
+            from .cluster import DEFAULT_CLUSTER as cluster
+
+        # Add a new node to the cluster
+        if id is None:
+            with cluster._lock:
+                id = cluster.topology.add_nodes(1)
+                cluster.nodes.append(self)
+
+        self.id = id
+        self.cluster = cluster
+        self.topology = cluster.topology
+        self.sockets = [Socket(self.topology, self.id, i)
+                        for i in range(self.topology.sockets_per_node)]
 
     # Method to check if the node is empty
     def is_empty(self):
-        for socket in self.sockets:
-            if not socket.is_empty():
-                return False
-        return True
+        return self.active_cores() == 0
     
     # Method to check if the node is full
     def is_full(self):
-        for socket in self.sockets:
-            if not socket.is_full():
-                return False
-        return True
+        return self.active_cores() == self.n_cores()
     
     # Method to add a process to the node
+    # (the socket ID and the process ID are validated by the topology)
     def add_process(self, process_id, socket_id):
-
-        # Check if the user is asking for a socket out of range
-        if socket_id < 0 or socket_id >= SOCKETS_PER_NODE:
-            raise ValueError(f"Socket {socket_id} does not exist"
-                             f" in node {self.id}. Only {SOCKETS_PER_NODE}"
-                             f" sockets available")
-
-        # Check if the process ID is out of range
-        if process_id < 0 or process_id > MAX_PROC_ID:
-            raise ValueError(f"Process ID {process_id} is out of range."
-                             f" IDs must be in range [0, {MAX_PROC_ID}].")
-
-        # Check if the process ID has already been assigned
-        if process_id in ASSIGNED_IDS:
-            raise ValueError(f"Process ID {process_id} has already"
-                             f" been assigned.")
-        
-        if self.sockets[socket_id].add_process(process_id):
-            # Add the process ID to the set of assigned process IDs
-            ASSIGNED_IDS.add(process_id)
-            return True
-        return False
+        return self.topology.add_process(process_id, self.id,
+                                         socket_id) is not None
 
     # Method to remove a process from the node
     def remove_process(self, process_id):
@@ -84,14 +70,13 @@ class Node:
     
     # Method to remove all processes from the node
     def remove_all_processes(self):
-        for socket in self.sockets:
-            socket.remove_all_processes()
+        self.topology.clear([self.id])
 
     # Method to get a list of processes running on the node
     def get_processes(self):
         processes = []
         for socket in self.sockets:
-            processes.extend(socket.processes())
+            processes.extend(socket.get_processes())
         return processes
 
     # Method to get a specific process running on the node
@@ -104,10 +89,13 @@ class Node:
 
     # Method to count how many cores are occupied
     def active_cores(self):
-        count = 0
-        for socket in self.sockets:
-            count += socket.get_active_cores()
-        return count
+        sockets = self.topology.sockets_per_node
+        return int(self.topology.active[self.id*sockets:(self.id+1)*sockets]
+                   .sum())
+
+    # Method to count the cores of the node
+    def n_cores(self):
+        return self.topology.sockets_per_node * self.topology.cores_per_socket
 
     # Method to count how many sockets are occupied
     def active_sockets(self):
@@ -147,7 +135,7 @@ class Node:
             node_repr += '┌' + '─' * (core_ppr * 2 + 2) + '┐'
         node_repr += '\n'
         # Print cores
-        for row in range(CORES_PER_SOCKET // core_ppr):
+        for row in range(self.topology.cores_per_socket // core_ppr):
             for i, socket in enumerate(self.sockets):
                 if i > 0:  # Add space between sockets
                     node_repr += '  '
@@ -167,15 +155,17 @@ class Node:
 
     # Method to print the node status
     def status(self):
+        n_cores = self.n_cores()
+        n_sockets = self.topology.sockets_per_node
         print(self)
         print(f'Active cores:\t'
-              f'{self.active_cores()} / {SOCKETS_PER_NODE * CORES_PER_SOCKET}')
+              f'{self.active_cores()} / {n_cores}')
         print(f'Empty cores:\t'
-              f'{SOCKETS_PER_NODE * CORES_PER_SOCKET - self.active_cores()} /' f'{SOCKETS_PER_NODE * CORES_PER_SOCKET}')
-        print(f'Active sockets:\t{self.active_sockets()} / {SOCKETS_PER_NODE}')
+              f'{n_cores - self.active_cores()} /' f'{n_cores}')
+        print(f'Active sockets:\t{self.active_sockets()} / {n_sockets}')
         print(f'Empty sockets:\t'
-              f'{SOCKETS_PER_NODE - self.active_sockets()} /'
-              f' {SOCKETS_PER_NODE}')
+              f'{n_sockets - self.active_sockets()} /'
+              f' {n_sockets}')
 
     # Method to show the numbered processes running on each core
     def show_processes(self):
@@ -188,7 +178,7 @@ class Node:
             node_repr += '┌' + '─' * (core_ppr * 4 + 1) + '┐'
         node_repr += '\n'
         # Print cores
-        for row in range(CORES_PER_SOCKET // core_ppr):
+        for row in range(self.topology.cores_per_socket // core_ppr):
             for i, socket in enumerate(self.sockets):
                 if i > 0:  # Add space between sockets
                     node_repr += '  '
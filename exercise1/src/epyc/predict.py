@@ -0,0 +1,189 @@
+import numpy as np
+
+from .model import event_cost
+from .schedule import SEGMENTED, event_keys, placement_schedule
+
+# Vectorized latency predictions ───────────────────────────────────────────────
+
+# Collectives that can be predicted and the NBFT fit they are based on
+ALGORITHMS = {
+    'linear_bcast': ('linear', 'nbft'),
+    'chain_bcast': ('chain', 'nbft'),
+    'binary_bcast': ('binary', 'nbft'),
+    'binomial_bcast': ('binomial', 'nbft'),
+    'knomial_bcast': ('knomial', 'nbft'),
+    'split_binary_bcast': ('split_binary', 'nbft'),
+    'scatter_allgather_bcast': ('scatter_allgather', 'nbft'),
+    'pipeline_bcast': ('pipeline', 'nbft'),
+    'linear_reduce': ('linear', 'nbft_reduce'),
+    'chain_reduce': ('chain', 'nbft_reduce'),
+    'binary_reduce': ('binary', 'nbft_reduce'),
+    'binomial_reduce': ('binomial', 'nbft_reduce'),
+    'pipeline_reduce': ('pipeline', 'nbft_reduce'),
+    'ring_allgather': ('ring_allgather', 'nbft'),
+    'recursive_doubling_allgather': ('recursive_doubling_allgather', 'nbft'),
+    'bruck_allgather': ('bruck_allgather', 'nbft'),
+    'ring_allreduce': ('ring_allreduce', 'nbft_reduce'),
+    'recursive_doubling_allreduce': ('recursive_doubling_allreduce',
+                                     'nbft_reduce'),
+    'rabenseifner_allreduce': ('rabenseifner_allreduce', 'nbft_reduce'),
+    'linear_alltoall': ('linear_alltoall', 'nbft'),
+    'pairwise_alltoall': ('pairwise_alltoall', 'nbft'),
+    'bruck_alltoall': ('bruck_alltoall', 'nbft'),
+    'linear_scatter': ('linear', 'nbft'),
+    'binomial_scatter': ('binomial_scatter', 'nbft'),
+    'linear_gather': ('linear', 'nbft_reduce'),
+    'binomial_gather': ('binomial_scatter', 'nbft_reduce'),
+    'ring_reduce_scatter': ('ring_reduce_scatter', 'nbft_reduce'),
+    'recursive_halving_reduce_scatter': ('recursive_halving_reduce_scatter',
+                                         'nbft_reduce'),
+    'recursive_doubling_barrier': ('recursive_doubling_barrier', 'nbft'),
+    'bruck_barrier': ('bruck_barrier', 'nbft'),
+}
+
+
+# Open MPI (coll_tuned) algorithm IDs of the simulated collectives
+OMPI_ALGORITHMS = {
+    'bcast': {1: 'linear_bcast', 2: 'chain_bcast', 3: 'pipeline_bcast',
+              4: 'split_binary_bcast', 5: 'binary_bcast',
+              6: 'binomial_bcast', 7: 'knomial_bcast',
+              9: 'scatter_allgather_bcast'},
+    'reduce': {1: 'linear_reduce', 2: 'chain_reduce', 3: 'pipeline_reduce',
+               4: 'binary_reduce', 5: 'binomial_reduce'},
+    'allreduce': {3: 'recursive_doubling_allreduce', 4: 'ring_allreduce',
+                  6: 'rabenseifner_allreduce'},
+    'allgather': {2: 'bruck_allgather', 3: 'recursive_doubling_allgather',
+                  4: 'ring_allgather'},
+    'alltoall': {1: 'linear_alltoall', 2: 'pairwise_alltoall',
+                 3: 'bruck_alltoall'},
+    'scatter': {1: 'linear_scatter', 2: 'binomial_scatter'},
+    'gather': {1: 'linear_gather', 2: 'binomial_gather'},
+    'reduce_scatter': {2: 'recursive_halving_reduce_scatter',
+                       3: 'ring_reduce_scatter'},
+    'barrier': {3: 'recursive_doubling_barrier', 4: 'bruck_barrier'},
+}
+
+# Batch prediction over a grid of parameters
+def predict_grid(algorithms, sizes, nprocs, mapbys, segments=1,
+                 as_frame=False, cluster=None, segment_size=None,
+                 statistic='latency', loss='ols', weights=None):
+    """Predict the latency of collectives over a grid of parameters.
+
+    The same model used by the scalar functions (`linear_bcast`,
+    `chain_bcast`, ...) is evaluated with array arithmetic over all the
+    message sizes at once, without simulating `Process` objects, and gives
+    the very same results.
+
+    Parameters
+    ----------
+    algorithms : list
+        Names of the collectives to predict (e.g. 'linear_bcast',
+        'binary_reduce').
+    sizes : list
+        Message sizes in bytes.
+    nprocs : list
+        Numbers of processes.
+    mapbys : list
+        Mapping methods ('core', 'socket' or 'node').
+    segments : int, optional
+        Number of segments used by the tree algorithms that can be segmented
+        (see `SEGMENTED`), by default 1.
+    as_frame : bool, optional
+        Return a long pandas DataFrame instead of an array, by default False.
+    cluster : Cluster, optional
+        The cluster whose shape is used to place the processes, by default
+        the AMD EPYC nodes described by the constants of the module.
+    segment_size : int, optional
+        Segment size of the pipeline algorithms, by default the one of
+        `PIPELINED`.
+    statistic : str, optional
+        The predicted statistic, 'latency' (mean, default) or a percentile
+        of the timings such as 'p99'. Tail latencies are obtained combining
+        the tail latencies of every step, an upper bound of the percentile
+        of the whole collective.
+    loss : str, optional
+        The loss of the fitted model: 'ols' (least squares, default),
+        'huber' (robust to the outliers) or 'quantile' (see
+        `load_coefficients`).
+    weights : str, optional
+        None for the unweighted fits (default), or 'spread' for the fits
+        weighting every measurement by the inverse square of its spread.
+
+    Returns
+    -------
+    numpy.ndarray or pandas.DataFrame
+        Array of shape (algorithms, sizes, nprocs, mapbys) with the predicted
+        latencies in us, or a DataFrame with columns 'algorithm', 'size',
+        'cores', 'mapby' and 'latency'. Sizes and numbers of processes
+        that have not been measured are interpolated or extrapolated, while
+        predictions that the model cannot provide (a linear collective on a
+        single process) are NaN.
+
+    Examples
+    --------
+    >>> predict_grid(['linear_bcast'], [1, 1024], range(2, 257), ['core'])
+    """
+    algorithms, mapbys = list(algorithms), list(mapbys)
+    sizes, nprocs = np.asarray(sizes, dtype=int), np.asarray(nprocs, dtype=int)
+    for algorithm in algorithms:
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Invalid algorithm: {algorithm}."
+                             f" Use one of {list(ALGORITHMS)}.")
+
+    result = np.full((len(algorithms), len(sizes), len(nprocs), len(mapbys)),
+                     np.nan)
+
+    for m, mapby in enumerate(mapbys):
+        for tree in {ALGORITHMS[a][0] for a in algorithms}:
+            columns = [a for a, algorithm in enumerate(algorithms)
+                       if ALGORITHMS[algorithm][0] == tree]
+            steps = segments if tree in SEGMENTED else 1
+            pipelined = segment_size if tree == 'pipeline' else None
+
+            # A single process has nothing to send (except in the linear
+            # algorithm, where the model is not defined and NaN is kept)
+            if tree != 'linear':
+                result[np.ix_(columns, range(len(sizes)), nprocs <= 1, [m])] = 0.
+
+            # Channel mixes of every schedule, costed all at once
+            schedules = [(j, placement_schedule(tree, n_processes, mapby,
+                                                steps, cluster, pipelined))
+                         for j, n_processes in enumerate(nprocs.tolist())
+                         if n_processes > 1]
+            if not schedules:
+                continue
+            counts = np.concatenate([s.events for _, s in schedules])
+            fractions = np.concatenate([s.fractions for _, s in schedules])
+            _, index, inverse = np.unique(event_keys(counts, fractions),
+                                          return_index=True,
+                                          return_inverse=True)
+            message_sizes = schedules[0][1].message_sizes(sizes)
+            costs = {ALGORITHMS[algorithms[a]][1]: None for a in columns}
+            for kind in costs:
+                costs[kind] = event_cost(counts[index], fractions[index],
+                                         message_sizes, kind, statistic,
+                                         loss, weights)
+
+            offset = 0
+            for j, schedule in schedules:
+                index = inverse[offset:offset + len(schedule.events)]
+                offset += len(schedule.events)
+                for a in columns:
+                    kind = ALGORITHMS[algorithms[a]][1]
+                    result[a, :, j, m] = schedule.combine(costs[kind][index],
+                                                          sizes)
+
+    if not as_frame:
+        return result
+
+    import pandas as pd
+    a, z, j, m = np.meshgrid(np.arange(len(algorithms)), np.arange(len(sizes)),
+                             np.arange(len(nprocs)), np.arange(len(mapbys)),
+                             indexing='ij')
+    return pd.DataFrame({
+        'algorithm': np.asarray(algorithms, dtype=object)[a.ravel()],
+        'size': sizes[z.ravel()],
+        'cores': nprocs[j.ravel()],
+        'mapby': np.asarray(mapbys, dtype=object)[m.ravel()],
+        'latency': result.ravel(),
+    })
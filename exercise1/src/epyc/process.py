@@ -1,4 +1,50 @@
-from .fit import fit_p2p, fit_nbft, fit_nbft_reduce
+import bisect
+import functools
+
+import numpy as np
+
+from .fit import load_coefficients
+from .tables import load_tables, nbft_latency
+from . import CCX_SIZE, CHANNELS
+
+
+# Channel class between processes given their locality
+def channel(node_a, socket_a, core_a, node_b, socket_b, core_b,
+            ccx_size=CCX_SIZE):
+    """Channel used between two (arrays of) processes.
+
+    Returns
+    -------
+    numpy.ndarray
+        The channel index (see `CHANNELS`): 0 if the processes share the L3
+        cache (same CCX), 1 if they are in the same socket, 2 if they are in
+        the same node and 3 otherwise.
+    """
+    return np.where(node_a != node_b, 3,
+           np.where(socket_a != socket_b, 2,
+           np.where(core_a // ccx_size == core_b // ccx_size, 0, 1)))
+
+
+# Lazily loaded model coefficients ─────────────────────────────────────────────
+class _Coefficients:
+    """Class attribute resolving to the fitted coefficients on first access.
+
+    The fits are only loaded (from the on-disk cache or by fitting the
+    datasets) the first time a latency is actually computed.
+    """
+
+    def __init__(self, key):
+        self.key = key
+
+    def __get__(self, instance, owner):
+        return load_coefficients()[self.key]
+
+
+class _Tables(_Coefficients):
+    """Class attribute resolving to the dense coefficient tables."""
+
+    def __get__(self, instance, owner):
+        return getattr(load_tables(), self.key)
 
 # MPI Process class ────────────────────────────────────────────────────────────
 class Process:
@@ -14,6 +60,8 @@ class Process:
         The socket ID where the process is running.
     node_id : int
         The node ID where the process is running.
+    ccx_size : int, optional
+        Number of cores sharing the same L3 cache, by default CCX_SIZE.
     
     Attributes
     ----------
@@ -25,6 +73,8 @@ class Process:
         The socket ID where the process is running.
     node_id : int
         The node ID where the process is running.
+    ccx_size : int
+        Number of cores sharing the same L3 cache.
 
     Examples
     --------
@@ -33,26 +83,23 @@ class Process:
     """
 
     # Dictionary to numerically identify the channels
-    C = {'cache': 0, 'core': 1, 'socket': 2, 'node': 3}
+    C = {channel: c for c, channel in enumerate(CHANNELS)}
 
-    # Dictionary to store hockney model parameters
-    hockney = fit_p2p()
+    # Breakpoints and Hockney (alpha, beta) of the segments of each channel
+    p2p_coefficients = _Tables('p2p')
 
     # Dictionary to store the linear NBFT fit parameters
-    nbft_coefficients = fit_nbft()
-    nbft_reduce_coefficients = fit_nbft_reduce()
+    nbft_coefficients = _Coefficients('nbft')
+    nbft_reduce_coefficients = _Coefficients('nbft_reduce')
 
     # Constructor
-    def __init__(self, id, core_id, socket_id, node_id):
+    def __init__(self, id, core_id, socket_id, node_id, ccx_size=CCX_SIZE):
         self.id = id
         self.core_id = core_id
         self.socket_id = socket_id
         self.node_id = node_id
-        self.sending = False
+        self.ccx_size = ccx_size
         self.sent_segments = 0
-        self.received = False
-        self.received_segments = 0
-        self.receivers = []
 
     # Method to print the process
     def __repr__(self):
@@ -75,9 +122,32 @@ class Process:
     # (in this case it meanse that they share the L3 cache)
     def same_cache(self, other):
         if self.same_socket(other):
-            return self.core_id // 4 == other.core_id // 4  # [groups of 4]
+            return (self.core_id // self.ccx_size
+                    == other.core_id // other.ccx_size)
         return False
 
+    # Number of receivers reached through each channel
+    def channel_counts(self, others):
+        """Number of processes reached through each channel.
+
+        Parameters
+        ----------
+        others : list
+            The receivers. When they come from `initialize` (a `ProcessList`)
+            their locality is already available as arrays and no per-receiver
+            Python work is done.
+
+        Returns
+        -------
+        list
+            The number of receivers reached through the cache, core, socket
+            and node channels.
+        """
+        node, socket, core = ProcessList.locality_of(others)
+        c = channel(self.node_id, self.socket_id, self.core_id,
+                    node, socket, core, self.ccx_size)
+        return np.bincount(c, minlength=4).tolist()
+
     # Time of the NBFT only using channel 'c'
     def t_c_nbft(self, p, size, channel: str):
         """Time of the Non-Blocking Fat Tree (NBFT) only using channel 'c'.
@@ -94,18 +164,11 @@ class Process:
         Returns
         -------
         float
-            The latency of the NBFT message transmission.
+            The latency of the NBFT message transmission. Sizes and numbers
+            of processes that have not been measured are interpolated or
+            extrapolated from the dense coefficient tables.
         """
-        if channel == 'cache':
-            try:
-                return  self.nbft_coefficients['cache'][size][p]
-            except KeyError:
-                print(f'ERROR: t_c_nbft. '
-                      f'No fit for size {size} and {p} processes.')
-                exit(1)
-        else:
-            alpha, beta = self.nbft_coefficients[channel][size]
-            return alpha + beta * p
+        return nbft_latency(p, size, channel, 'nbft')
 
     # Time of a point-to-point (P2P) communication
     def t_p2p(self, size, channel: str):
@@ -123,11 +186,9 @@ class Process:
         float
             The latency of the P2P message transmission.
         """
-        alpha, beta, alpha_big, beta_big = self.hockney[channel]
-        if size <= 2**17:
-            return alpha + beta * size
-        else:
-            return (alpha + alpha_big) + (beta + beta_big) * size
+        breakpoints, alpha, beta = self.p2p_coefficients[channel]
+        segment = bisect.bisect_left(breakpoints, size)
+        return alpha[segment] + beta[segment] * size
         
     # Parallelization factor gamma
     def gamma(self, p, size, channel: str):
@@ -222,32 +283,7 @@ class Process:
         """
 
         # Number of communications for each channel
-        n0, n1, n2, n3 = 0, 0, 0, 0
-
-        for other in others:
-            if self.id == other.id:
-                ValueError(f'Process {self.id} cannot send messages to itself.')
-            elif other is None:
-                ValueError(f'Process {self.id} cannot send a message to'
-                        ' a non-existing process.')
-
-            # Determine the number of messages sent through each channel
-            if not self.same_node(other): n3+=1
-            elif not self.same_socket(other): n2+=1
-            elif self.same_cache(other): n0+=1
-            else: n1+=1
-
-            # Update the segment count at each send
-            other.received_segments += 1
-
-            # Check if the receiver has at least 1 segment so it can send
-            if other.received_segments == 1:
-                other.sending = True
-
-            # Check if each receivers should still be receiving
-            if other.received_segments == segments:
-                other.received = True
-                self.sending = False 
+        n0, n1, n2, n3 = self.channel_counts(others)
 
         # Update the segment count at each send
         self.sent_segments += 1
@@ -296,18 +332,11 @@ class Process:
         Returns
         -------
         float
-            The latency of the NBFT message transmission.
+            The latency of the NBFT message transmission. Sizes and numbers
+            of processes that have not been measured are interpolated or
+            extrapolated from the dense coefficient tables.
         """
-        if channel == 'cache':
-            try:
-                return  self.nbft_reduce_coefficients['cache'][size][p]
-            except KeyError:
-                print(f'ERROR: t_c_nbft. '
-                      f'No fit for size {size} and {p} processes.')
-                exit(1)
-        else:
-            alpha, beta = self.nbft_reduce_coefficients[channel][size]
-            return alpha + beta * p
+        return nbft_latency(p, size, channel, 'nbft_reduce')
         
     # Parallelization factor gamma reduce
     def gamma_reduce(self, p, size, channel: str):
@@ -368,32 +397,7 @@ class Process:
         """
 
         # Number of communications for each channel
-        n0, n1, n2, n3 = 0, 0, 0, 0
-
-        for other in others:
-            if self.id == other.id:
-                ValueError(f'Process {self.id} cannot send messages to itself.')
-            elif other is None:
-                ValueError(f'Process {self.id} cannot send a message to'
-                        ' a non-existing process.')
-
-            # Determine the number of messages sent through each channel
-            if not self.same_node(other): n3+=1
-            elif not self.same_socket(other): n2+=1
-            elif self.same_cache(other): n0+=1
-            else: n1+=1
-
-            # Update the segment count at each send
-            other.received_segments += 1
-
-            # Check if the receiver has at least 1 segment so it can send
-            if other.received_segments == 1:
-                other.sending = True
-
-            # Check if each receivers should still be receiving
-            if other.received_segments == segments:
-                other.received = True
-                self.sending = False 
+        n0, n1, n2, n3 = self.channel_counts(others)
 
         # Update the segment count at each send
         self.sent_segments += 1
@@ -422,3 +426,77 @@ class Process:
         
         else:
             return self.t_nbft_reduce(n0+1, size, 'cache')
+
+
+# List of processes with array locality ────────────────────────────────────────
+class ProcessList(list):
+    """A list of processes carrying their locality as arrays.
+
+    The node, socket and core of the processes are kept in NumPy arrays
+    (hierarchical rank -> locality encoding), so that the channels between a
+    process and any group of others can be counted with array operations.
+    Slices keep the arrays (sliced), while any other change to the list
+    drops them: they are rebuilt from the processes when needed.
+
+    Parameters
+    ----------
+    processes : iterable
+        The processes.
+    node, socket, core : numpy.ndarray, optional
+        The node, socket and (local) core IDs of the processes, by default
+        read from the processes.
+
+    Examples
+    --------
+    >>> p = initialize(Node(), Node(), n_processes=256)
+    >>> p.locality
+    >>> p[0].channel_counts(p[1:])
+    """
+
+    # Constructor
+    def __init__(self, processes=(), node=None, socket=None, core=None):
+        super().__init__(processes)
+        self._locality = None
+        if node is not None:
+            self._locality = (np.asarray(node), np.asarray(socket),
+                              np.asarray(core))
+
+    # Node, socket and core IDs of the processes
+    @property
+    def locality(self):
+        if self._locality is None:
+            self._locality = tuple(
+                np.fromiter((getattr(p, attr) for p in self), dtype=np.int64,
+                            count=len(self))
+                for attr in ['node_id', 'socket_id', 'core_id'])
+        return self._locality
+
+    # Locality of any list of processes
+    @staticmethod
+    def locality_of(processes):
+        """Node, socket and core IDs of a (possibly plain) list of processes."""
+        if isinstance(processes, ProcessList):
+            return processes.locality
+        return ProcessList(processes).locality
+
+    # Slices keep the locality arrays
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ProcessList(super().__getitem__(index),
+                               *(x[index] for x in self.locality))
+        return super().__getitem__(index)
+
+
+# Any other change to a ProcessList drops its locality arrays
+def _invalidate(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._locality = None
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+for _method in ['__setitem__', '__delitem__', '__iadd__', '__imul__',
+                'append', 'extend', 'insert', 'pop', 'remove', 'clear',
+                'sort', 'reverse']:
+    setattr(ProcessList, _method, _invalidate(getattr(list, _method)))
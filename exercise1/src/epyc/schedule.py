@@ -0,0 +1,771 @@
+import functools
+from collections import namedtuple
+
+import numpy as np
+
+from .model import event_cost
+from .process import ProcessList
+from .topology import channel, placement
+from . import NODES, SOCKETS_PER_NODE, CORES_PER_SOCKET, CCX_SIZE
+
+# Communication trees ──────────────────────────────────────────────────────────
+# Every tree returns, for a number of processes, the ranks of the senders, the
+# step they start sending at (their level), the edges of the tree as (index of
+# the sender, rank of the receiver), the fraction of the message sent by each
+# sender (None when they all send the whole message) and how many times each
+# level is repeated (None when they are all sent once). A process sending at
+# different levels (e.g. in a scatter and then in an allgather) appears once
+# for each of them.
+Tree = namedtuple('Tree', ['senders', 'levels', 'src', 'dst', 'fractions',
+                           'repeats'], defaults=[None, None])
+
+# Radix of the k-nomial trees (default of the coll_tuned component)
+KNOMIAL_RADIX = 4
+
+# Segment size of the pipelined trees (coll_tuned rules for large messages)
+PIPELINE_SEGMENT_SIZE = 2**17
+
+
+# Linear: the root sends to all the other processes at once
+def _linear_tree(n_processes):
+    receivers = np.arange(1, n_processes)
+    return Tree(np.zeros(1, dtype=int), np.zeros(1, dtype=int),
+                np.zeros(len(receivers), dtype=int), receivers)
+
+
+# Chain: each process sends to the next one
+def _chain_tree(n_processes):
+    senders = np.arange(n_processes - 1)
+    return Tree(senders, senders, senders, senders + 1)
+
+
+# Binary: process i sends to processes 2i+1 and 2i+2
+def _binary_tree(n_processes):
+    senders = np.arange(n_processes // 2)
+    levels = np.floor(np.log2(senders + 1)).astype(int)
+    full = senders[2*senders + 2 < n_processes]
+    src = np.concatenate((senders, full))
+    dst = np.concatenate((2*senders + 1, 2*full + 2))
+    return Tree(senders, levels, src, dst)
+
+
+# Weight of the lowest non-zero base-k digit of each rank (> 0)
+def _lowest_digit(ranks, radix):
+    weight = np.ones_like(ranks)
+    while True:
+        divisible = ranks % (weight * radix) == 0
+        if not divisible.any():
+            return weight
+        weight = np.where(divisible, weight * radix, weight)
+
+
+# K-nomial: the parent of a process clears its lowest non-zero digit in base k
+def _knomial_tree(n_processes, radix=KNOMIAL_RADIX):
+    """K-nomial tree as built by the coll_tuned component.
+
+    The subtree of a process is the contiguous range of ranks starting from
+    it and as long as the weight of its lowest non-zero digit, and a process
+    receives at the level given by its number of non-zero digits.
+    """
+    dst = np.arange(1, n_processes)
+    weight = _lowest_digit(dst, radix)
+    parent = dst - (dst // weight % radix) * weight
+    senders, src = np.unique(parent, return_inverse=True)
+    levels = np.zeros(len(senders), dtype=int)
+    ranks = senders.copy()
+    while (ranks > 0).any():
+        levels += ranks % radix > 0
+        ranks //= radix
+    return Tree(senders, levels, src.ravel(), dst)
+
+
+# Binomial: k-nomial tree of radix 2
+def _binomial_tree(n_processes):
+    return _knomial_tree(n_processes, 2)
+
+
+# Split binary: each half of the message goes down one subtree, then the
+# processes of the two subtrees exchange their halves
+def _split_binary_tree(n_processes):
+    if n_processes < 3:
+        return _binary_tree(n_processes)
+    senders, levels, src, dst = _binary_tree(n_processes)[:4]
+
+    # Subtree (1 left, 2 right) of every process
+    top = np.arange(n_processes)
+    while (top > 2).any():
+        top = np.where(top > 2, (top - 1) // 2, top)
+    left, right = np.flatnonzero(top == 1), np.flatnonzero(top == 2)
+    m = len(right)
+
+    # Pairs swap their halves, the extra left processes get it from the root
+    extra = len(left) - m
+    pairs = np.concatenate((left[:m], right))
+    exchange = np.concatenate((pairs, np.zeros(min(extra, 1), dtype=int)))
+    x_src = len(senders) + np.concatenate((np.arange(2*m),
+                                           np.full(extra, 2*m)))
+    x_dst = np.concatenate((right, left[:m], left[m:]))
+
+    senders = np.concatenate((senders, exchange))
+    levels = np.concatenate((levels, np.full(len(exchange), levels[-1] + 1)))
+    fractions = np.tile([1, 2], (len(senders), 1))
+    return Tree(senders, levels, np.concatenate((src, x_src)),
+                np.concatenate((dst, x_dst)), fractions)
+
+
+# Scatter + ring allgather: a binomial scatter of one chunk per process,
+# followed by n - 1 steps where every process forwards a chunk to the next one
+def _scatter_allgather_tree(n_processes):
+    senders, levels, src, dst = _binomial_tree(n_processes)[:4]
+    if n_processes < 2:
+        return _binomial_tree(n_processes)
+
+    # Each sender sends at once the chunks of its children subtrees (as
+    # large as the largest of them)
+    subtree = np.minimum(_lowest_digit(dst, 2), n_processes - dst)
+    chunks = np.zeros(len(senders), dtype=int)
+    np.maximum.at(chunks, src, subtree)
+    fractions = np.column_stack((chunks, np.full(len(senders), n_processes)))
+
+    # The steps of the ring are all the same: one level repeated n - 1 times
+    ring = np.arange(n_processes)
+    repeats = np.ones(levels.max() + 2, dtype=int)
+    repeats[-1] = n_processes - 1
+    return Tree(np.concatenate((senders, ring)),
+                np.concatenate((levels, np.full(n_processes, levels.max() + 1))),
+                np.concatenate((src, len(senders) + ring)),
+                np.concatenate((dst, (ring + 1) % n_processes)),
+                np.concatenate((fractions,
+                                np.tile([1, n_processes], (n_processes, 1)))),
+                repeats)
+
+
+# Other collectives ────────────────────────────────────────────────────────────
+# In the collectives below every process takes part in the exchanges and, at
+# each step, sends its part of the message to a single partner. The message
+# size is the one of the OSU benchmarks: the block of each process for
+# allgather, alltoall, scatter and gather, the whole vector for allreduce and
+# reduce_scatter.
+
+# Largest power of two not larger than n
+def _power_of_two(n_processes):
+    return 1 << (int(n_processes).bit_length() - 1)
+
+
+# Tree of steps, each given as (senders, receivers, numerator, denominator)
+# of the fraction of the message sent by every sender of the step
+def _steps_tree(steps, repeats=None):
+    if not steps:
+        empty = np.zeros(0, dtype=int)
+        return Tree(empty, empty, empty, empty)
+    senders = np.concatenate([src for src, _, _, _ in steps])
+    lengths = [len(src) for src, _, _, _ in steps]
+    levels = np.repeat(np.arange(len(steps)), lengths)
+    dst = np.concatenate([dst for _, dst, _, _ in steps])
+    fractions = np.column_stack((
+        np.concatenate([np.broadcast_to(num, n)
+                        for n, (_, _, num, _) in zip(lengths, steps)]),
+        np.repeat([den for _, _, _, den in steps], lengths)))
+    return Tree(senders, levels, np.arange(len(senders)), dst, fractions,
+                None if repeats is None else np.asarray(repeats))
+
+
+# Exchanges between the partners r and r ^ 2^k of the largest power of two,
+# with the fraction sent at step k given by fraction(k). The processes
+# beyond the power of two first send their whole part to r - 2^k (first)
+# and get back the result (last) at the end
+def _butterfly_steps(n_processes, fraction, first=(1, 1), last=(1, 1)):
+    p2 = _power_of_two(n_processes)
+    ranks = np.arange(p2)
+    extra = np.arange(p2, n_processes)
+    steps = [(ranks, ranks ^ (1 << k), *fraction(k))
+             for k in range(p2.bit_length() - 1)]
+    if len(extra) > 0:
+        steps = ([(extra, extra - p2, *first)] + steps
+                 + [(extra - p2, extra, *last)])
+    return steps
+
+
+# Ring allgather: n - 1 steps where every process forwards a block to the
+# next one
+def _ring_allgather_tree(n_processes):
+    if n_processes < 2:
+        return _steps_tree([])
+    ranks = np.arange(n_processes)
+    return _steps_tree([(ranks, (ranks + 1) % n_processes, 1, 1)],
+                       [n_processes - 1])
+
+
+# Recursive doubling allgather: at step k the partners exchange 2^k blocks
+def _recursive_doubling_allgather_tree(n_processes):
+    if n_processes < 2:
+        return _steps_tree([])
+    return _steps_tree(_butterfly_steps(n_processes, lambda k: (1 << k, 1),
+                                        last=(n_processes, 1)))
+
+
+# Bruck allgather: at step k every process sends 2^k blocks (the remaining
+# ones at the last step) to the process 2^k ranks before it
+def _bruck_allgather_tree(n_processes):
+    ranks = np.arange(n_processes)
+    return _steps_tree([
+        (ranks, (ranks - (1 << k)) % n_processes,
+         min(1 << k, n_processes - (1 << k)), 1)
+        for k in range((n_processes - 1).bit_length())])
+
+
+# Ring allreduce: a ring reduce_scatter followed by a ring allgather, 2(n - 1)
+# steps where every process sends one chunk of the vector to the next one
+def _ring_allreduce_tree(n_processes):
+    if n_processes < 2:
+        return _steps_tree([])
+    ranks = np.arange(n_processes)
+    return _steps_tree([(ranks, (ranks + 1) % n_processes, 1, n_processes)],
+                       [2 * (n_processes - 1)])
+
+
+# Recursive doubling allreduce: the partners exchange the whole vector
+def _recursive_doubling_allreduce_tree(n_processes):
+    if n_processes < 2:
+        return _steps_tree([])
+    return _steps_tree(_butterfly_steps(n_processes, lambda k: (1, 1)))
+
+
+# Rabenseifner allreduce: reduce_scatter by recursive halving (the partners
+# exchange half of what is left at each step), then allgather by recursive
+# doubling (the same steps in reverse order)
+def _rabenseifner_allreduce_tree(n_processes):
+    if n_processes < 2:
+        return _steps_tree([])
+    steps = _butterfly_steps(n_processes, lambda k: (1, 2 << k))
+    p2 = _power_of_two(n_processes)
+    if p2 < n_processes:
+        pre, halving, post = steps[:1], steps[1:-1], steps[-1:]
+    else:
+        pre, halving, post = [], steps, []
+    return _steps_tree(pre + halving + halving[::-1] + post)
+
+
+# Linear alltoall: every process sends its blocks to all the others at once
+def _linear_alltoall_tree(n_processes):
+    if n_processes < 2:
+        return _steps_tree([])
+    ranks = np.arange(n_processes)
+    src = np.repeat(ranks, n_processes - 1)
+    shift = np.tile(np.arange(1, n_processes), n_processes)
+    return Tree(ranks, np.zeros(n_processes, dtype=int), src,
+                (src + shift) % n_processes)
+
+
+# Pairwise alltoall: at step k every process sends one block to the process
+# k ranks after it
+def _pairwise_alltoall_tree(n_processes):
+    shift = np.repeat(np.arange(1, n_processes), n_processes)
+    senders = np.tile(np.arange(n_processes), max(n_processes - 1, 0))
+    return Tree(senders, shift - 1, np.arange(len(senders)),
+                (senders + shift) % n_processes)
+
+
+# Bruck alltoall: at step k every process sends the blocks whose index has
+# the bit k set to the process 2^k ranks after it
+def _bruck_alltoall_tree(n_processes):
+    ranks = np.arange(n_processes)
+    return _steps_tree([
+        (ranks, (ranks + (1 << k)) % n_processes,
+         int(((ranks >> k) & 1).sum()), 1)
+        for k in range((n_processes - 1).bit_length())])
+
+
+# Binomial scatter (and gather): every sender sends at once the blocks of its
+# children subtrees (as large as the largest of them)
+def _binomial_scatter_tree(n_processes):
+    senders, levels, src, dst = _binomial_tree(n_processes)[:4]
+    subtree = np.minimum(_lowest_digit(dst, 2), n_processes - dst)
+    chunks = np.zeros(len(senders), dtype=int)
+    np.maximum.at(chunks, src, subtree)
+    return Tree(senders, levels, src, dst,
+                np.column_stack((chunks, np.ones(len(senders), dtype=int))))
+
+
+# Ring reduce_scatter: n - 1 steps where every process sends one chunk of the
+# vector to the next one
+def _ring_reduce_scatter_tree(n_processes):
+    if n_processes < 2:
+        return _steps_tree([])
+    ranks = np.arange(n_processes)
+    return _steps_tree([(ranks, (ranks + 1) % n_processes, 1, n_processes)],
+                       [n_processes - 1])
+
+
+# Recursive halving reduce_scatter: the partners exchange half of what is
+# left at each step
+def _recursive_halving_reduce_scatter_tree(n_processes):
+    if n_processes < 2:
+        return _steps_tree([])
+    return _steps_tree(_butterfly_steps(n_processes, lambda k: (1, 2 << k),
+                                        last=(1, n_processes)))
+
+
+# Recursive doubling barrier: empty messages between the partners r, r ^ 2^k
+def _recursive_doubling_barrier_tree(n_processes):
+    if n_processes < 2:
+        return _steps_tree([])
+    return _steps_tree(_butterfly_steps(n_processes, lambda k: (0, 1),
+                                        first=(0, 1), last=(0, 1)))
+
+
+# Bruck (dissemination) barrier: at step k every process sends an empty
+# message to the process 2^k ranks after it
+def _bruck_barrier_tree(n_processes):
+    ranks = np.arange(n_processes)
+    return _steps_tree([(ranks, (ranks + (1 << k)) % n_processes, 0, 1)
+                        for k in range((n_processes - 1).bit_length())])
+
+
+TREES = {
+    'linear': _linear_tree,
+    'chain': _chain_tree,
+    'binary': _binary_tree,
+    'binomial': _binomial_tree,
+    'knomial': _knomial_tree,
+    'split_binary': _split_binary_tree,
+    'scatter_allgather': _scatter_allgather_tree,
+    'pipeline': _chain_tree,
+    'ring_allgather': _ring_allgather_tree,
+    'recursive_doubling_allgather': _recursive_doubling_allgather_tree,
+    'bruck_allgather': _bruck_allgather_tree,
+    'ring_allreduce': _ring_allreduce_tree,
+    'recursive_doubling_allreduce': _recursive_doubling_allreduce_tree,
+    'rabenseifner_allreduce': _rabenseifner_allreduce_tree,
+    'linear_alltoall': _linear_alltoall_tree,
+    'pairwise_alltoall': _pairwise_alltoall_tree,
+    'bruck_alltoall': _bruck_alltoall_tree,
+    'binomial_scatter': _binomial_scatter_tree,
+    'ring_reduce_scatter': _ring_reduce_scatter_tree,
+    'recursive_halving_reduce_scatter': _recursive_halving_reduce_scatter_tree,
+    'recursive_doubling_barrier': _recursive_doubling_barrier_tree,
+    'bruck_barrier': _bruck_barrier_tree,
+}
+
+# Trees accepting a number of segments
+SEGMENTED = ['chain', 'binary', 'binomial', 'knomial', 'split_binary']
+
+# Trees sending fixed size segments (pipelined, see Schedule.pipeline)
+PIPELINED = {'pipeline': PIPELINE_SEGMENT_SIZE}
+
+# Compiled schedules ───────────────────────────────────────────────────────────
+
+# Sequential (not pairwise) sum over the first axis, so that results do not
+# depend on the number of columns evaluated at once
+def _sum(values):
+    if len(values) == 0:
+        return np.zeros(values.shape[1:])
+    return np.add.accumulate(values, axis=0)[-1]
+
+
+# Integer keys identifying the channel mixes and message fractions of senders
+def event_keys(counts, fractions):
+    base = counts.max(initial=0) + 1
+    keys = ((counts[:, 3]*base + counts[:, 2])*base
+            + counts[:, 1])*base + counts[:, 0]
+    den = fractions.max(initial=0) + 1
+    return (keys*den + fractions[:, 0])*den + fractions[:, 1]
+
+class Schedule:
+    """Compiled schedule of a collective on a given placement.
+
+    The schedule only depends on the communication tree, the placement of the
+    processes and the number of segments, and it is independent of the
+    message size. Every sender is reduced to its channel mix (the number of
+    receivers it reaches through each channel) and the steps of the
+    collective are grouped by the set of channel mixes active in them: the
+    latency for any message size is then the sum, weighted by the number of
+    steps of each group, of the slowest active sender.
+
+    Parameters
+    ----------
+    levels : numpy.ndarray
+        The step each sender starts sending at.
+    counts : numpy.ndarray
+        Array of shape (senders, 4) with the channel mix of each sender.
+    segments : int, optional
+        Number of segments, by default 1. Senders of level `d` are active
+        during steps `d, ..., d + segments - 1`.
+    fractions : numpy.ndarray, optional
+        Array of shape (senders, 2) with the numerator and denominator of the
+        fraction of the message sent by each sender, by default the whole
+        message.
+    segment_size : int, optional
+        Size of the segments of a pipelined collective (see `pipeline`), by
+        default None (the message is split in `segments` parts instead).
+    repeats : numpy.ndarray, optional
+        Number of consecutive times each level is sent, by default once.
+
+    Attributes
+    ----------
+    events : numpy.ndarray
+        The distinct channel mixes, array of shape (events, 4).
+    fractions : numpy.ndarray
+        The fraction of the message sent with each channel mix, array of
+        shape (events, 2).
+    active : numpy.ndarray
+        Boolean array of shape (groups, events) with the channel mixes
+        active in each group of steps.
+    multiplicity : numpy.ndarray
+        Number of steps in each group.
+    step_group : numpy.ndarray
+        Group of every step of the collective.
+    level_active : numpy.ndarray
+        Boolean array of shape (levels, events) with the channel mixes of
+        the senders starting at each level.
+    """
+
+    # Constructor
+    def __init__(self, levels, counts, segments=1, fractions=None,
+                 segment_size=None, repeats=None):
+        self.segments = segments
+        self.segment_size = segment_size
+        if fractions is None:
+            fractions = np.ones((len(levels), 2), dtype=int)
+        if len(levels) == 0:
+            self.events = np.zeros((0, 4), dtype=int)
+            self.fractions = np.zeros((0, 2), dtype=int)
+            self.active = np.zeros((0, 0), dtype=bool)
+            self.multiplicity = np.zeros(0, dtype=int)
+            self.step_group = np.zeros(0, dtype=int)
+            self.level_active = np.zeros((0, 0), dtype=bool)
+            return
+
+        # Distinct channel mixes (and fractions of the message)
+        _, index, inverse = np.unique(event_keys(counts, fractions),
+                                      return_index=True, return_inverse=True)
+        events, fractions = counts[index], fractions[index]
+
+        # Channel mixes starting at each level, and cumulated over levels
+        n_levels = levels.max() + 1
+        starting = np.zeros((n_levels + 1, len(events)), dtype=int)
+        starting[levels + 1, inverse] = 1
+        if repeats is not None:
+            starting = np.concatenate((starting[:1],
+                                       np.repeat(starting[1:], repeats, axis=0)))
+            n_levels = len(starting) - 1
+        cumulated = np.cumsum(starting, axis=0)
+
+        # Senders of level d are active during steps d, ..., d + segments - 1
+        step = np.arange(n_levels + segments - 1)
+        last = np.minimum(step, n_levels - 1) + 1
+        first = np.maximum(step - segments + 1, 0)
+        active = cumulated[last] - cumulated[first] > 0
+
+        # Group the steps with the same active channel mixes
+        keys = np.packbits(active, axis=1)
+        keys = np.ascontiguousarray(keys).view(
+            np.dtype((np.void, keys.shape[1]))).ravel()
+        _, index, step_group = np.unique(keys, return_index=True,
+                                         return_inverse=True)
+
+        self.events = events
+        self.fractions = fractions
+        self.level_active = starting[1:] > 0
+        self.active = active[index]
+        self.step_group = step_group.ravel()
+        self.multiplicity = np.bincount(self.step_group, minlength=len(index))
+
+    # Number of steps of the collective
+    @property
+    def steps(self):
+        return len(self.step_group)
+
+    # Channel mixes active at each step
+    def step_counts(self, step):
+        """Channel mixes of the senders active at the given step."""
+        return self.events[self.active[self.step_group[step]]]
+
+    # Latency given the cost of each event
+    def evaluate(self, cost):
+        """Latency of the collective given the latency of each channel mix.
+
+        Parameters
+        ----------
+        cost : numpy.ndarray
+            Array of shape (events, sizes) with the latency of a sender with
+            the corresponding channel mix (e.g. from `event_cost`).
+
+        Returns
+        -------
+        numpy.ndarray
+            The latency of the collective for each size.
+        """
+        if len(self.multiplicity) == 0:
+            return np.zeros(cost.shape[1])
+        group_cost = np.where(self.active[:, :, None], cost[None],
+                              -np.inf).max(axis=1) / self.segments
+        return _sum(self.multiplicity[:, None] * group_cost)
+
+    # Latency of a pipelined collective given the cost of each segment
+    def pipeline(self, cost, segments):
+        """Latency of the collective when each segment is sent separately.
+
+        Unlike `evaluate`, where the latency of the whole message is split
+        evenly among the segments, here the cost of sending one segment is
+        given, so the startup latency is paid for every segment. Senders of
+        level `d` are active during steps `d, ..., d + segments - 1` and each
+        step lasts as long as its slowest sender. The number of segments is
+        not fixed by the schedule: only its levels are used.
+
+        Parameters
+        ----------
+        cost : numpy.ndarray
+            Array of shape (events, columns) with the latency of sending one
+            segment for a sender with the corresponding channel mix.
+        segments : int or array_like
+            Number of segments, one for every column of `cost` or the same
+            for all of them.
+
+        Returns
+        -------
+        numpy.ndarray
+            The latency of the collective for each column.
+        """
+        segments = np.broadcast_to(segments, cost.shape[1:])
+        if len(self.level_active) == 0:
+            return np.zeros(cost.shape[1])
+        level_cost = np.where(self.level_active[:, :, None], cost[None],
+                              -np.inf).max(axis=1)
+        n_levels = len(level_cost)
+
+        # Step t is as slow as the slowest level in t - segments + 1, ..., t
+        latency = np.empty(cost.shape[1])
+        prefix = np.maximum.accumulate(level_cost, axis=0)
+        suffix = np.maximum.accumulate(level_cost[::-1], axis=0)[::-1]
+        for s in np.unique(segments).tolist():
+            columns = segments == s
+            if s == 1:
+                latency[columns] = _sum(level_cost[:, columns])
+            elif s >= n_levels:
+                # Filling, all levels active (s - n_levels + 1 steps), draining
+                latency[columns] = (_sum(prefix[:-1, columns])
+                                    + (s - n_levels + 1) * prefix[-1, columns]
+                                    + _sum(suffix[1:, columns]))
+            else:
+                padding = np.full((s - 1, columns.sum()), -np.inf)
+                padded = np.concatenate((padding, level_cost[:, columns],
+                                         padding))
+                window = np.lib.stride_tricks.sliding_window_view(
+                    padded, s, axis=0)
+                latency[columns] = _sum(window.max(axis=-1))
+        return latency
+
+    # Latency of a pipelined collective for some segment sizes
+    def pipelined_latency(self, size, segment_size, kind='nbft',
+                          statistic='latency', loss='ols', weights=None):
+        """Latency of the collective sending the message in segments.
+
+        The message is split in `ceil(size / segment_size)` segments and the
+        latency of each of them is computed with the NBFT model at the
+        segment size (see `pipeline`).
+
+        Parameters
+        ----------
+        size : int
+            Message size in bytes.
+        segment_size : int or array_like
+            Segment size(s) in bytes.
+        kind : str, optional
+            The NBFT fit to use, 'nbft' (broadcast) or 'nbft_reduce', by
+            default 'nbft'.
+        statistic : str, optional
+            The modelled statistic of the timings, 'latency' (mean, default)
+            or a percentile such as 'p99', whose step latencies are combined
+            as the mean ones (an upper bound of the collective percentile).
+        loss, weights : str, optional
+            The loss and the weights of the fits, by default unweighted
+            least squares (see `load_coefficients`).
+
+        Returns
+        -------
+        float or numpy.ndarray
+            The latency in us (sizes that have not been measured are
+            interpolated).
+        """
+        segment_sizes = np.atleast_1d(segment_size)
+        if (segment_sizes < 1).any():
+            raise ValueError("Segment sizes must be positive.")
+        # An empty message is still sent as one (empty) segment
+        segments = np.maximum(-(-size // segment_sizes), 1)
+        segment_sizes = np.minimum(segment_sizes, size)
+        cost = event_cost(self.events, self.fractions, segment_sizes, kind,
+                          statistic, loss, weights)
+        latency = self.pipeline(cost, segments)
+        return float(latency[0]) if np.ndim(segment_size) == 0 else latency
+
+    # Sizes at which the senders are costed
+    def message_sizes(self, sizes):
+        """Size of the messages (or segments) sent for each message size."""
+        if self.segment_size is None:
+            return np.asarray(sizes)
+        return np.minimum(sizes, self.segment_size)
+
+    # Latency given the cost of each event at the sizes of `message_sizes`
+    def combine(self, cost, sizes):
+        """Latency of the collective given the latency of each channel mix.
+
+        Parameters
+        ----------
+        cost : numpy.ndarray
+            Array of shape (events, sizes) with the latency of each channel
+            mix at the sizes returned by `message_sizes`.
+        sizes : array_like
+            Message sizes in bytes.
+
+        Returns
+        -------
+        numpy.ndarray
+            The latency of the collective for each size.
+        """
+        if self.segment_size is None:
+            return self.evaluate(cost)
+        return self.pipeline(cost, np.maximum(
+            -(-np.asarray(sizes) // self.segment_size), 1))
+
+    # Latency for some message sizes
+    def latency(self, size, kind='nbft', statistic='latency', loss='ols',
+                weights=None):
+        """Latency of the collective for one or more message sizes.
+
+        Parameters
+        ----------
+        size : int or array_like
+            Message size(s) in bytes.
+        kind : str, optional
+            The NBFT fit to use, 'nbft' (broadcast) or 'nbft_reduce', by
+            default 'nbft'.
+        statistic : str, optional
+            The modelled statistic of the timings, 'latency' (mean, default)
+            or a percentile such as 'p99', whose step latencies are combined
+            as the mean ones (an upper bound of the collective percentile).
+        loss, weights : str, optional
+            The loss and the weights of the fits, by default unweighted
+            least squares (see `load_coefficients`).
+
+        Returns
+        -------
+        float or numpy.ndarray
+            The latency in us (sizes that have not been measured are
+            interpolated).
+        """
+        sizes = np.atleast_1d(size)
+        cost = event_cost(self.events, self.fractions,
+                          self.message_sizes(sizes), kind, statistic, loss,
+                          weights)
+        latency = self.combine(cost, sizes)
+        return float(latency[0]) if np.ndim(size) == 0 else latency
+
+
+# Compile the schedule of a tree on a placement
+def _compile(tree, node, socket, core, ccx_size, segments, segment_size):
+    if tree not in TREES:
+        raise ValueError(f"Invalid algorithm shape: {tree}."
+                         f" Use one of {list(TREES)}.")
+    if segments < 1:
+        raise ValueError(f"Invalid number of segments: {segments}.")
+    if segments > 1 and tree not in SEGMENTED:
+        raise ValueError(f"The {tree} algorithm cannot be segmented.")
+    if tree in PIPELINED:
+        segment_size = segment_size or PIPELINED[tree]
+    elif segment_size is not None:
+        raise ValueError(f"The {tree} algorithm is not pipelined.")
+
+    senders, levels, src, dst, fractions, repeats = TREES[tree](len(node))
+    a = senders[src]
+    c = channel(node[a], socket[a], core[a], node[dst], socket[dst], core[dst],
+                ccx_size)
+    counts = np.bincount(src*4 + c, minlength=4*len(senders)).reshape(-1, 4)
+    if fractions is not None:
+        fractions = fractions // np.gcd(fractions[:, :1], fractions[:, 1:])
+    return Schedule(levels, counts, segments, fractions, segment_size, repeats)
+
+
+@functools.lru_cache(maxsize=4096)
+def _locality_schedule(tree, node, socket, core, ccx_size, segments,
+                       segment_size):
+    node, socket, core = (np.frombuffer(b, dtype=np.int64)
+                          for b in (node, socket, core))
+    return _compile(tree, node, socket, core, ccx_size, segments, segment_size)
+
+
+@functools.lru_cache(maxsize=4096)
+def _placement_schedule(tree, n_processes, mapby, segments, segment_size,
+                        machine):
+    node, socket, core = placement(n_processes, mapby, *machine[:3])
+    return _compile(tree, node, socket, core, machine[3], segments,
+                    segment_size)
+
+
+# Schedule of a collective on a list of processes
+def compile_schedule(tree, processes, segments=1, segment_size=None):
+    """Compiled (and cached) schedule of a collective on some processes.
+
+    Parameters
+    ----------
+    tree : str
+        The communication tree (one of `TREES`).
+    processes : list
+        The processes involved, the first one being the root.
+    segments : int, optional
+        Number of segments, by default 1.
+    segment_size : int, optional
+        Segment size of the pipelined trees, by default the one of
+        `PIPELINED`.
+
+    Returns
+    -------
+    Schedule
+        The schedule, shared by all the calls with the same placement.
+
+    Examples
+    --------
+    >>> p = initialize(Node(), Node(), n_processes=256, mapby='node')
+    >>> compile_schedule('binary', p).latency([1, 1024, 2**20])
+    """
+    locality = ProcessList.locality_of(processes)
+    ccx_size = processes[0].ccx_size if processes else CCX_SIZE
+    return _locality_schedule(tree, *(np.ascontiguousarray(x, dtype=np.int64)
+                                      .tobytes() for x in locality),
+                              ccx_size, segments, segment_size)
+
+
+# Schedule of a collective on a mapping policy
+def placement_schedule(tree, n_processes, mapby, segments=1, cluster=None,
+                       segment_size=None):
+    """Compiled (and cached) schedule of a collective on empty nodes.
+
+    Parameters
+    ----------
+    tree : str
+        The communication tree (one of `TREES`).
+    n_processes : int
+        Number of processes.
+    mapby : str
+        The mapping method ('core', 'socket' or 'node').
+    segments : int, optional
+        Number of segments, by default 1.
+    cluster : Cluster, optional
+        The cluster whose shape is used to place the processes, by default
+        the AMD EPYC nodes described by the constants of the module.
+    segment_size : int, optional
+        Segment size of the pipelined trees, by default the one of
+        `PIPELINED`.
+
+    Returns
+    -------
+    Schedule
+        The schedule, shared by all the calls with the same arguments.
+    """
+    if cluster is None:
+        machine = (NODES, SOCKETS_PER_NODE, CORES_PER_SOCKET, CCX_SIZE)
+    else:
+        t = cluster.topology
+        machine = (t.nodes, t.sockets_per_node, t.cores_per_socket, t.ccx_size)
+    return _placement_schedule(tree, int(n_processes), mapby, int(segments),
+                               segment_size, machine)
@@ -0,0 +1,131 @@
+import numpy as np
+
+from .fit import load_coefficients
+from .predict import ALGORITHMS
+from .schedule import PIPELINED, SEGMENTED, placement_schedule
+
+# Pipelined segmentation ───────────────────────────────────────────────────────
+
+# Tree and NBFT fit of a segmented algorithm
+def _segmented(algorithm):
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Invalid algorithm: {algorithm}."
+                         f" Use one of {list(ALGORITHMS)}.")
+    tree, kind = ALGORITHMS[algorithm]
+    if tree not in SEGMENTED and tree not in PIPELINED:
+        raise ValueError(f"The {algorithm} algorithm is not segmented.")
+    return tree, kind
+
+
+# Segment sizes the model can evaluate
+def segment_sizes(algorithm, size=None):
+    """Segment sizes for which the NBFT model of an algorithm has a fit.
+
+    Parameters
+    ----------
+    algorithm : str
+        Name of the collective (e.g. 'chain_bcast').
+    size : int, optional
+        Message size: only the segment sizes not larger than it are returned.
+
+    Returns
+    -------
+    numpy.ndarray
+        The sorted segment sizes in bytes.
+    """
+    _, kind = _segmented(algorithm)
+    sizes = np.array(sorted(load_coefficients()[kind]['node']))
+    if size is not None:
+        sizes = sizes[sizes <= size]
+    return sizes
+
+
+# Latency of a pipelined collective
+def pipeline_latency(algorithm, size, nprocs, mapby, segment_size,
+                     cluster=None):
+    """Latency of a collective sending the message in pipelined segments.
+
+    The message is split in `ceil(size / segment_size)` segments: every
+    segment pays the full NBFT latency at the segment size (hence its own
+    startup cost), while the segments flow down the tree overlapping the
+    steps of the different levels.
+
+    Parameters
+    ----------
+    algorithm : str
+        Name of the collective (e.g. 'chain_bcast', 'binary_reduce').
+    size : int
+        Message size in bytes.
+    nprocs : int
+        Number of processes.
+    mapby : str
+        The mapping method ('core', 'socket' or 'node').
+    segment_size : int or array_like
+        Segment size(s) in bytes.
+    cluster : Cluster, optional
+        The cluster whose shape is used to place the processes, by default
+        the AMD EPYC nodes described by the constants of the module.
+
+    Returns
+    -------
+    float or numpy.ndarray
+        The latency in us for each segment size.
+
+    Examples
+    --------
+    >>> pipeline_latency('chain_bcast', 2**20, 256, 'core', [2**13, 2**16])
+    """
+    tree, kind = _segmented(algorithm)
+    schedule = placement_schedule(tree, nprocs, mapby, 1, cluster)
+    return schedule.pipelined_latency(size, segment_size, kind)
+
+
+# Optimal segment size
+def best_segment_size(algorithm, size, nprocs, mapby, candidates=None,
+                      cluster=None):
+    """Segment size minimizing the latency of a pipelined collective.
+
+    All the candidates are evaluated at once: the latency of each of them
+    only depends on the cost of one segment at every level of the tree, so
+    the search costs a single pass over the levels regardless of the number
+    of segments.
+
+    Parameters
+    ----------
+    algorithm : str
+        Name of the collective (e.g. 'chain_bcast', 'binary_reduce').
+    size : int
+        Message size in bytes.
+    nprocs : int
+        Number of processes.
+    mapby : str
+        The mapping method ('core', 'socket' or 'node').
+    candidates : array_like, optional
+        Segment sizes to try, by default all the sizes with a fit not larger
+        than the message (see `segment_sizes`).
+    cluster : Cluster, optional
+        The cluster whose shape is used to place the processes, by default
+        the AMD EPYC nodes described by the constants of the module.
+
+    Returns
+    -------
+    tuple
+        The best segment size in bytes (equal to `size` when segmenting does
+        not pay off, i.e. a `coll_tuned` segsize of 0) and its latency in us.
+
+    Examples
+    --------
+    >>> best_segment_size('binary_bcast', 2**20, 256, 'node')
+    """
+    if candidates is None:
+        candidates = segment_sizes(algorithm, size)
+    candidates = np.unique(np.minimum(np.asarray(candidates, dtype=int), size))
+    if len(candidates) == 0:
+        raise ValueError("No candidate segment size.")
+
+    latency = np.atleast_1d(pipeline_latency(algorithm, size, nprocs, mapby,
+                                             candidates, cluster))
+    if np.isnan(latency).all():
+        raise ValueError(f"No fit for the segments of a {size} bytes message.")
+    best = np.nanargmin(latency)
+    return int(candidates[best]), float(latency[best])
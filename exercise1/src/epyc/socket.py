@@ -1,10 +1,21 @@
 from .core import Core
-from . import CORES_PER_SOCKET
 
 # Socket class ─────────────────────────────────────────────────────────────────
 class Socket:
     """A class to simulate the socket of a computing node.
 
+    The socket is a view over the arrays of a `Topology`, so every query is
+    answered in constant time.
+
+    Parameters
+    ----------
+    topology : Topology
+        The topology the socket belongs to.
+    node_id : int
+        The node ID where the socket is located.
+    id : int
+        The socket ID (inside its node).
+
     Attributes
     ----------
     id : int
@@ -17,53 +28,61 @@ class Socket:
         The number of cores running a process.
     """
 
-    # Class variable to keep track of IDs
-    next_id = {}
-
     # Constructor
-    def __init__(self, node_id):
-        
-        if node_id not in Socket.next_id:
-            Socket.next_id[node_id] = 0
-
-        self.id = Socket.next_id[node_id]
-        Socket.next_id[node_id] += 1
+    def __init__(self, topology, node_id, id):
+        self.topology = topology
+        self.id = id
         self.node_id = node_id
-        self.cores = [Core(self.id, self.node_id) for i in range(CORES_PER_SOCKET)]
-        self.active_cores = 0
+        self.index = topology.socket_index(node_id, id)
+        self._cores = None
+
+    # List of cores in the socket (created only when needed)
+    @property
+    def cores(self):
+        if self._cores is None:
+            self._cores = [Core(self.topology, self.node_id, self.id, i)
+                           for i in range(self.topology.cores_per_socket)]
+        return self._cores
+
+    # Number of cores running a process
+    @property
+    def active_cores(self):
+        return int(self.topology.active[self.index])
+
+    # Range of global core indices of the socket
+    def _slice(self):
+        first = self.index * self.topology.cores_per_socket
+        return slice(first, first + self.topology.cores_per_socket)
+
+    # Method to check if a process is running on the socket
+    def _contains(self, process_id):
+        if not self.topology.is_assigned(process_id):
+            return False
+        core = self.topology.core_of[process_id]
+        return core // self.topology.cores_per_socket == self.index
 
     # Method to check if the socket is empty
     def is_empty(self):
-        for core in self.cores:
-            if core.occupied():
-                return False
-        return True
-    
+        return self.active_cores == 0
+
     # Method to check if the socket is full
     def is_full(self):
-        for core in self.cores:
-            if not core.occupied():
-                return False
-        return True
+        return self.active_cores == self.topology.cores_per_socket
 
     # Method to add a process to one core of the socket
     def add_process(self, process_id):
-        for core in self.cores:
-            if not core.occupied():
-                core.add_process(process_id)
-                self.active_cores += 1
-                return True
-        return False
+        core = self.topology.add_process(process_id, self.node_id, self.id)
+        return core is not None
 
     # Method to get a list of processes running on the socket
     def get_processes(self):
-        return [core.get_process() for core in self.cores if core.occupied()]
+        ranks = self.topology.rank[self._slice()]
+        return [self.topology.get_process(r) for r in ranks[ranks >= 0].tolist()]
 
     # Method to get a specific process running on the socket
     def get_process(self, process_id):
-        for core in self.cores:
-            if core.occupied() and core.process_id == process_id:
-                return core.get_process()
+        if self._contains(process_id):
+            return self.topology.get_process(process_id)
         return None
 
     # Method to count how many cores are occupied
@@ -72,17 +91,13 @@ class Socket:
 
     # Method to remove a process from the socket
     def remove_process(self, process_id):
-        for core in self.cores:
-            if core.occupied() and core.process_id == process_id:
-                core.remove_process()
-                self.active_cores -= 1
-                return True
+        if self._contains(process_id):
+            return self.topology.remove_process(process_id)
         return False
 
     # Method to remove all processes from the socket
     def remove_all_processes(self):
-        for core in self.cores:
-            if core.occupied():
-                core.remove_process()
-                self.active_cores -= 1
+        ranks = self.topology.rank[self._slice()]
+        for rank in ranks[ranks >= 0].tolist():
+            self.topology.remove_process(rank)
         return True
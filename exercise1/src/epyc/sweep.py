@@ -0,0 +1,240 @@
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from . import mpy
+from .cluster import Cluster
+from .fit import load_coefficients
+from .predict import ALGORITHMS, OMPI_ALGORITHMS
+from .schedule import SEGMENTED
+
+# Parallel sweeps of the collective latency predictions ────────────────────────
+
+# Columns identifying a point of the sweep
+COLUMNS = ['algorithm', 'size', 'cores', 'mapby']
+
+# File listing the parts of the last grid simulated in an output directory
+MANIFEST = 'sweep.json'
+
+# Cluster used by each worker process (created once per worker)
+_cluster = None
+
+
+# Initializer of the worker processes
+def _init_worker():
+    global _cluster
+    load_coefficients()
+    _cluster = Cluster()
+
+
+# Simulate all the points sharing the same placement
+def _run_shard(mapby, cores, points, segments):
+    """Latency of the given (algorithm, size) points on one placement."""
+    if _cluster is None:
+        _init_worker()
+
+    processes = _cluster.initialize(n_processes=cores, mapby=mapby)
+    latencies = []
+    for algorithm, size in points:
+        collective = getattr(mpy, algorithm)
+        if ALGORITHMS[algorithm][0] in SEGMENTED:
+            latencies.append(collective(processes, size, segments))
+        else:
+            latencies.append(collective(processes, size))
+    return latencies
+
+
+# Name of the file holding the results of a shard, keyed by its content
+def _part(mapby, cores, df, segments, fmt):
+    digest = hashlib.sha1(json.dumps([list(df.columns), segments]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return f'{mapby}-{cores:06d}-{digest.hexdigest()[:16]}.{fmt}'
+
+
+# Build the points of a parameter grid
+def _points(grid):
+    if isinstance(grid, pd.DataFrame):
+        points = grid.copy()
+    else:
+        points = pd.DataFrame(list(itertools.product(
+            *[list(grid[c]) for c in COLUMNS])), columns=COLUMNS)
+
+    missing = [c for c in COLUMNS if c not in points]
+    if missing:
+        raise ValueError(f"Missing columns in the grid: {missing}.")
+    invalid = set(points['algorithm']) - set(ALGORITHMS)
+    if invalid:
+        raise ValueError(f"Invalid algorithms: {sorted(invalid)}."
+                         f" Use one of {list(ALGORITHMS)}.")
+    points['size'] = points['size'].astype('int64')
+    points['cores'] = points['cores'].astype('int64')
+    return points
+
+
+# Points measured with the OSU benchmarks
+def measured_points(df, collective):
+    """Turn an OSU collective dataset into the points of a sweep.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        A dataset as returned by `utils.preproc` (with the 'algorithm',
+        'size', 'cores', 'mapby' and 'latency' columns).
+    collective : str
+        The measured collective, one of `OMPI_ALGORITHMS` (e.g. 'bcast',
+        'allreduce').
+
+    Returns
+    -------
+    pandas.DataFrame
+        The rows of the algorithms that can be simulated, with the algorithm
+        names used by `epyc` and the measured latency in the 'measured'
+        column.
+
+    Examples
+    --------
+    >>> df = preproc('datasets/bcast_core.csv', 'core', 5)
+    >>> run_sweep(measured_points(df, 'bcast'), 'sweeps/binary-core')
+    """
+    names = OMPI_ALGORITHMS[collective]
+    df = df[df['algorithm'].isin(list(names))]
+    return pd.DataFrame({
+        'algorithm': df['algorithm'].map(names).astype(str),
+        'size': df['size'].astype('int64'),
+        'cores': df['cores'].astype('int64'),
+        'mapby': df['mapby'].astype(str),
+        'measured': df['latency'],
+    }).reset_index(drop=True)
+
+
+# Parallel sweep
+def run_sweep(grid, output, workers=None, fmt='csv', segments=1,
+              resume=True):
+    """Simulate the collectives over a parameter grid with a process pool.
+
+    The grid is split in shards sharing the same placement (mapping and
+    number of cores), which are simulated in parallel by the workers with
+    `initialize` and the collectives of `epyc.mpy`. Every worker loads the
+    fitted model once. The results of each shard are written to their own
+    file in the output directory as soon as they are ready, so that an
+    interrupted sweep can be resumed by running it again. The files are
+    named after the content of their shard (points, extra columns and
+    segments), so only the shards of the same grid are skipped, and the
+    parts of the grid are listed in the manifest of the directory read by
+    `load_sweep`.
+
+    Parameters
+    ----------
+    grid : dict or pandas.DataFrame
+        Either a dictionary with the lists of values of 'algorithm', 'size',
+        'cores' and 'mapby' (all their combinations are simulated), or a
+        DataFrame with one point per row. Additional columns of the
+        DataFrame (e.g. measured latencies) are kept in the results.
+    output : str
+        Directory where the results are written.
+    workers : int, optional
+        Number of worker processes, by default the number of CPUs.
+    fmt : str, optional
+        Format of the results, 'csv' or 'parquet', by default 'csv'.
+    segments : int, optional
+        Number of segments for the tree algorithms that can be segmented,
+        by default 1.
+    resume : bool, optional
+        Skip the shards of the grid already written in the output directory,
+        by default True.
+
+    Returns
+    -------
+    pandas.DataFrame
+        All the results of the sweep, with the predicted latency in the
+        'predicted' column.
+
+    Examples
+    --------
+    >>> grid = {'algorithm': ['linear_bcast', 'binary_bcast'],
+    ...         'size': [2**i for i in range(21)],
+    ...         'cores': range(2, 257),
+    ...         'mapby': ['core', 'socket', 'node']}
+    >>> df = run_sweep(grid, 'sweeps/bcast', workers=8)
+    """
+    if fmt not in ['csv', 'parquet']:
+        raise ValueError(f"Invalid format: {fmt}. Use 'csv' or 'parquet'.")
+
+    points = _points(grid)
+    os.makedirs(output, exist_ok=True)
+
+    # Shards still to be simulated
+    shards, parts = [], []
+    for (mapby, cores), df in points.groupby(['mapby', 'cores'], sort=True):
+        part = _part(mapby, cores, df, segments, fmt)
+        parts.append(part)
+        if resume and os.path.exists(os.path.join(output, part)):
+            continue
+        shards.append((mapby, cores, df, part))
+    with open(os.path.join(output, MANIFEST), 'w') as f:
+        json.dump({'format': fmt, 'parts': parts}, f, indent=2)
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker) as executor:
+        futures = {
+            executor.submit(_run_shard, mapby, cores,
+                            list(zip(df['algorithm'], df['size'].tolist())),
+                            segments): (df, part)
+            for mapby, cores, df, part in shards
+        }
+        for future in as_completed(futures):
+            df, part = futures[future]
+            df = df.assign(predicted=future.result())
+
+            # Write to a temporary file first: a part file is always complete
+            path = os.path.join(output, part)
+            tmp = f'{path}.tmp'
+            if fmt == 'csv':
+                df.to_csv(tmp, index=False)
+            else:
+                df.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+
+    return load_sweep(output, fmt)
+
+
+# Load the results of a sweep
+def load_sweep(output, fmt='csv'):
+    """Load the results written by `run_sweep` in a directory.
+
+    Only the parts of the last grid simulated in the directory (listed in
+    its manifest) are loaded, the parts of other grids are ignored. Without
+    a manifest all the parts in the directory are loaded.
+
+    Parameters
+    ----------
+    output : str
+        Directory where the results have been written.
+    fmt : str, optional
+        Format of the results, 'csv' or 'parquet', by default 'csv'.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The results of the sweep.
+    """
+    manifest = os.path.join(output, MANIFEST)
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            parts = [part for part in json.load(f)['parts']
+                     if part.endswith(f'.{fmt}')
+                     and os.path.exists(os.path.join(output, part))]
+    else:
+        parts = sorted(f for f in os.listdir(output) if f.endswith(f'.{fmt}'))
+    if fmt == 'csv':
+        frames = [pd.read_csv(os.path.join(output, f),
+                              float_precision='round_trip') for f in parts]
+    else:
+        frames = [pd.read_parquet(os.path.join(output, f)) for f in parts]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS + ['predicted'])
+    return pd.concat(frames, ignore_index=True)
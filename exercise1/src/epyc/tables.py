@@ -0,0 +1,298 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from .fit import load_coefficients
+from . import CHANNELS
+
+# Dense coefficient tables ─────────────────────────────────────────────────────
+# The fitted coefficients are stored as arrays indexed by the channel (in the
+# order of `CHANNELS`), by the rank of the size among the measured ones and
+# (for the cache channel) by the number of processes p. Entries that have not
+# been measured inside the measured range are filled by linear interpolation
+# once, when the tables are built. The segments of the piecewise linear p2p
+# fits are found by a binary search of the size among the breakpoints of the
+# channel.
+P2PTable = namedtuple('P2PTable', ['breakpoints', 'alpha', 'beta'])
+NBFTTable = namedtuple('NBFTTable', ['sizes', 'cache', 'alpha', 'beta'])
+Tables = namedtuple('Tables', ['hockney', 'p2p', 'nbft', 'nbft_reduce'])
+
+# Tables of the coefficients currently loaded, for each model (statistic,
+# loss and weights)
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+# Dense table of the p2p fits
+def _p2p_table(hockney):
+    n_breakpoints = max(len(hockney[c]['breakpoints']) for c in CHANNELS)
+    breakpoints = np.full((4, n_breakpoints), np.inf)
+    alpha = np.full((4, n_breakpoints + 1), np.nan)
+    beta = np.full((4, n_breakpoints + 1), np.nan)
+    for c, channel in enumerate(CHANNELS):
+        m = len(hockney[channel]['breakpoints'])
+        breakpoints[c, :m] = hockney[channel]['breakpoints']
+        alpha[c, :m + 1] = hockney[channel]['alpha']
+        beta[c, :m + 1] = hockney[channel]['beta']
+    return P2PTable(breakpoints, alpha, beta)
+
+
+# Dense table of an NBFT fit
+def _nbft_table(nbft):
+    grid = np.array(sorted(set().union(*(nbft[c] for c in CHANNELS))),
+                    dtype=float)
+
+    # Cache channel: latency of each (size, p), interpolated over the
+    # missing sizes and the missing p between the measured ones
+    measured = sorted(nbft['cache'])
+    max_p = max(max(nbft['cache'][size]) for size in measured)
+    cache = np.full((len(measured), max_p + 1), np.nan)
+    for z, size in enumerate(measured):
+        for p, latency in nbft['cache'][size].items():
+            cache[z, p] = latency
+    for row in cache:
+        known = np.flatnonzero(~np.isnan(row))
+        row[known[0]:known[-1] + 1] = np.interp(
+            np.arange(known[0], known[-1] + 1), known, row[known])
+    cache = np.column_stack([np.interp(grid, measured, column)
+                             for column in cache.T])
+
+    # Other channels: alpha and beta of the linear fit in p
+    alpha = np.full((4, len(grid)), np.nan)
+    beta = np.full((4, len(grid)), np.nan)
+    for c, channel in enumerate(CHANNELS[1:], start=1):
+        measured = sorted(nbft[channel])
+        alpha[c] = np.interp(grid, measured, [nbft[channel][s][0]
+                                              for s in measured])
+        beta[c] = np.interp(grid, measured, [nbft[channel][s][1]
+                                             for s in measured])
+    return NBFTTable(grid, cache, alpha, beta)
+
+
+# Dense tables of all the fits
+def load_tables(statistic='latency', loss='ols', weights=None):
+    """Dense array tables of the fitted model coefficients.
+
+    The tables are built once from `load_coefficients` and rebuilt only when
+    the coefficients are loaded again (e.g. with ``refresh=True``).
+
+    Parameters
+    ----------
+    statistic : str, optional
+        The modelled statistic of the timings, 'latency' (mean, default) or
+        a percentile such as 'p99' (see `load_coefficients`).
+    loss, weights : str, optional
+        The loss and the weights of the fits, by default unweighted least
+        squares (see `load_coefficients`).
+
+    Returns
+    -------
+    Tables
+        A named tuple with:
+
+        - 'hockney': the `P2PTable` of the piecewise linear p2p fits, with
+          the 'breakpoints' of each channel (array of shape (4, breakpoints),
+          padded with infinities) and the 'alpha' and 'beta' of each of their
+          segments (arrays of shape (4, breakpoints + 1));
+        - 'p2p': for each channel name, the lists of breakpoints, alpha and
+          beta of its segments, as plain floats;
+        - 'nbft' and 'nbft_reduce': the `NBFTTable` of each NBFT fit, with
+          the sizes of its rows ('sizes', every size measured by a channel,
+          including the ones added by `update_coefficients`), the cache
+          latencies (array of shape (sizes, p), NaN for p below the measured
+          ones) and the 'alpha' and 'beta' coefficients of the other
+          channels (arrays of shape (4, sizes)).
+    """
+    model = (statistic, loss, weights)
+    coefficients = load_coefficients(statistic=statistic, loss=loss,
+                                     weights=weights)
+    tables = _tables.get(model)
+    if tables is not None and tables[0] is coefficients:
+        return tables[1]
+
+    with _tables_lock:
+        tables = _tables.get(model)
+        if tables is None or tables[0] is not coefficients:
+            hockney = coefficients['hockney']
+            _tables[model] = (coefficients, Tables(
+                _p2p_table(hockney),
+                {c: (list(h['breakpoints']), list(h['alpha']),
+                     list(h['beta'])) for c, h in hockney.items()},
+                _nbft_table(coefficients['nbft']),
+                _nbft_table(coefficients['nbft_reduce'])))
+    return _tables[model][1]
+
+
+# Interpolation of size-indexed rows
+def _size_interpolation(sizes, grid):
+    """Rows and weights interpolating a table at arbitrary sizes.
+
+    Between two measured sizes the coefficients are linearly interpolated in
+    the message size, below the smallest one they are clamped and above the
+    largest one they are scaled proportionally to the size (bandwidth bound
+    messages).
+
+    Returns
+    -------
+    tuple
+        The lower and upper rows, the weight of the upper row and the
+        scaling factor of each size.
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    hi = grid[-1]
+    clipped = np.clip(sizes, grid[0], hi)
+    row = np.searchsorted(grid, clipped, side='right') - 1
+    upper = np.minimum(row + 1, len(grid) - 1)
+    span = np.where(upper > row, grid[upper] - grid[row], 1.)
+    weight = np.where(upper > row, (clipped - grid[row]) / span, 0.)
+    scale = np.where(sizes > hi, sizes / hi, 1.)
+    return row, upper, weight, scale
+
+
+# Interpolate the rows of a table (exact at the measured sizes)
+def _interpolate(values, row, upper, weight, scale):
+    low = values[..., row]
+    interpolated = np.where(weight == 0, low,
+                            low + weight * (values[..., upper] - low))
+    return interpolated * scale
+
+
+# Point-to-point latency of every channel
+def p2p_latency(sizes, statistic='latency', loss='ols', weights=None):
+    """Hockney latency of every channel for the requested sizes.
+
+    Parameters
+    ----------
+    sizes : array_like
+        Message sizes in bytes.
+    statistic : str, optional
+        The modelled statistic of the timings, 'latency' (mean, default) or
+        a percentile such as 'p99' (see `load_coefficients`).
+    loss, weights : str, optional
+        The loss and the weights of the fits, by default unweighted least
+        squares (see `load_coefficients`).
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (4, sizes) with the latency of each channel (in the
+        order of `CHANNELS`), same arithmetic as `Process.t_p2p`.
+    """
+    table = load_tables(statistic, loss, weights).hockney
+    sizes = np.asarray(sizes)
+    t_p2p = np.empty((4, len(sizes)))
+    for c in range(4):
+        segment = np.searchsorted(table.breakpoints[c], sizes)
+        t_p2p[c] = table.alpha[c, segment] + table.beta[c, segment] * sizes
+    return t_p2p
+
+
+# NBFT coefficients of every channel
+def nbft_table(sizes, kind='nbft', statistic='latency', loss='ols',
+               weights=None):
+    """NBFT coefficients as arrays over the requested sizes.
+
+    Sizes that have not been measured are interpolated (see
+    `_size_interpolation`), the measured ones are returned exactly.
+
+    Parameters
+    ----------
+    sizes : array_like
+        Message sizes in bytes.
+    kind : str, optional
+        The NBFT fit to use, 'nbft' (broadcast) or 'nbft_reduce', by default
+        'nbft'.
+    statistic : str, optional
+        The modelled statistic of the timings, 'latency' (mean, default) or
+        a percentile such as 'p99' (see `load_coefficients`).
+    loss, weights : str, optional
+        The loss and the weights of the fits, by default unweighted least
+        squares (see `load_coefficients`).
+
+    Returns
+    -------
+    tuple
+        The cache latencies, array of shape (sizes, p), and the alpha and
+        beta coefficients of the other channels, arrays of shape (4, sizes).
+        The cache latencies are NaN for the p below the measured ones (see
+        `cache_latency` for the larger ones).
+    """
+    if kind not in ['nbft', 'nbft_reduce']:
+        raise ValueError(f"Invalid NBFT fit: {kind}."
+                         f" Use 'nbft' or 'nbft_reduce'.")
+    table = getattr(load_tables(statistic, loss, weights), kind)
+    weights = _size_interpolation(sizes, table.sizes)
+    return (_interpolate(table.cache.T, *weights).T,
+            _interpolate(table.alpha, *weights),
+            _interpolate(table.beta, *weights))
+
+
+# Cache latencies for any number of processes
+def cache_latency(cache, p):
+    """Cache channel latency for any number of processes.
+
+    Parameters
+    ----------
+    cache : numpy.ndarray
+        Cache latencies of shape (sizes, p), as returned by `nbft_table`.
+    p : array_like
+        Numbers of processes, broadcastable to (sizes,).
+
+    Returns
+    -------
+    numpy.ndarray
+        The latencies, linearly extrapolated from the last two measured p
+        beyond the largest one (never decreasing with p).
+    """
+    last = cache.shape[1] - 1
+    p = np.broadcast_to(p, cache.shape[:1])
+    z = np.arange(len(cache))
+    latency = cache[z, np.minimum(p, last)]
+    slope = np.maximum(cache[:, last] - cache[:, last - 1], 0.)
+    return np.where(p > last, cache[:, last] + (p - last) * slope, latency)
+
+
+# Latency of an NBFT through a single channel
+def nbft_latency(p, size, channel, kind='nbft', statistic='latency',
+                 loss='ols', weights=None):
+    """Latency of an NBFT of p processes only using one channel.
+
+    Parameters
+    ----------
+    p : int or float
+        Number of processes involved in the communication.
+    size : int
+        Size of the message in bytes (interpolated if not measured).
+    channel : str
+        Channel of communication.
+    kind : str, optional
+        The NBFT fit to use, 'nbft' (broadcast) or 'nbft_reduce', by default
+        'nbft'.
+    statistic : str, optional
+        The modelled statistic of the timings, 'latency' (mean, default) or
+        a percentile such as 'p99' (see `load_coefficients`).
+    loss, weights : str, optional
+        The loss and the weights of the fits, by default unweighted least
+        squares (see `load_coefficients`).
+
+    Returns
+    -------
+    float
+        The latency, NaN if p is below the measured ones.
+    """
+    table = getattr(load_tables(statistic, loss, weights), kind)
+    c = CHANNELS.index(channel)
+
+    # Measured sizes are plain lookups in the rows of the table
+    row = int(np.searchsorted(table.sizes, size))
+    if row < len(table.sizes) and table.sizes[row] == size:
+        if c > 0:
+            return float(table.alpha[c, row] + table.beta[c, row] * p)
+        if p < table.cache.shape[1]:
+            return float(table.cache[row, int(p)])
+
+    cache, alpha, beta = nbft_table([size], kind, statistic, loss, weights)
+    if c == 0:
+        return float(cache_latency(cache, int(p))[0])
+    return float(alpha[c, 0] + beta[c, 0] * p)
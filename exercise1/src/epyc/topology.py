@@ -0,0 +1,315 @@
+import numpy as np
+
+from .process import Process, channel
+from . import NODES, SOCKETS_PER_NODE, CORES_PER_SOCKET, CCX_SIZE
+
+
+# Placement of the processes according to the mapping policy
+def placement(n_processes, mapby, nodes=NODES,
+              sockets_per_node=SOCKETS_PER_NODE,
+              cores_per_socket=CORES_PER_SOCKET):
+    """Node, socket and core of each rank for a given mapping policy.
+
+    Reproduces the `--map-by` policies of `mpirun` on empty nodes, as done by
+    `initialize`: 'core' fills one socket after the other, 'socket' alternates
+    the sockets of a node and 'node' alternates the nodes (and their sockets).
+
+    Parameters
+    ----------
+    n_processes : int
+        Number of processes to place.
+    mapby : str
+        The mapping method ('core', 'socket' or 'node').
+    nodes : int, optional
+        Number of nodes available, by default NODES.
+    sockets_per_node : int, optional
+        Number of sockets in each node, by default SOCKETS_PER_NODE.
+    cores_per_socket : int, optional
+        Number of cores in each socket, by default CORES_PER_SOCKET.
+
+    Returns
+    -------
+    tuple
+        Three arrays with the (local) node, socket and core index of each rank.
+    """
+    per_node = sockets_per_node * cores_per_socket
+    if n_processes > nodes * per_node:
+        raise ValueError(f"Cannot place {n_processes} processes: only"
+                         f" {nodes * per_node} cores available.")
+    r = np.arange(n_processes)
+    if mapby == 'core':
+        node = r // per_node
+        socket = (r // cores_per_socket) % sockets_per_node
+        core = r % cores_per_socket
+    elif mapby == 'socket':
+        node = r // per_node
+        socket = r % sockets_per_node
+        core = (r % per_node) // sockets_per_node
+    elif mapby == 'node':
+        node = r % nodes
+        socket = (r % (nodes * sockets_per_node)) // nodes
+        core = r // (nodes * sockets_per_node)
+    else:
+        raise ValueError(f"Invalid mapping method: {mapby}."
+                         f" Use 'core', 'socket' or 'node'.")
+    return node, socket, core
+
+
+# Topology class ───────────────────────────────────────────────────────────────
+class Topology:
+    """Array-backed model of a cluster of nodes, sockets and cores.
+
+    Cores are identified by a global index
+    ``(node * sockets_per_node + socket) * cores_per_socket + core`` and all
+    the state is kept in NumPy arrays, so that placing, finding and removing
+    a process take constant time whatever the size of the cluster.
+
+    Parameters
+    ----------
+    nodes : int, optional
+        Number of nodes, by default NODES.
+    sockets_per_node : int, optional
+        Number of sockets in each node, by default SOCKETS_PER_NODE.
+    cores_per_socket : int, optional
+        Number of cores in each socket, by default CORES_PER_SOCKET.
+    ccx_size : int, optional
+        Number of cores sharing the same L3 cache, by default CCX_SIZE.
+
+    Attributes
+    ----------
+    occupied : numpy.ndarray
+        Occupancy bitmap of the cores.
+    rank : numpy.ndarray
+        Rank of the process running on each core (-1 if the core is free).
+    core_of : numpy.ndarray
+        Global core index of each rank (-1 if the rank is not assigned).
+    active : numpy.ndarray
+        Number of occupied cores of each socket (global socket index).
+
+    Examples
+    --------
+    >>> t = Topology(nodes=1000)
+    >>> t.place(4096, mapby='node')
+    >>> t.locality([0, 1])
+    """
+
+    # Constructor
+    def __init__(self, nodes=NODES, sockets_per_node=SOCKETS_PER_NODE,
+                 cores_per_socket=CORES_PER_SOCKET, ccx_size=CCX_SIZE):
+        self.nodes = nodes
+        self.sockets_per_node = sockets_per_node
+        self.cores_per_socket = cores_per_socket
+        self.ccx_size = ccx_size
+
+        n_sockets = nodes * sockets_per_node
+        n_cores = n_sockets * cores_per_socket
+        self.occupied = np.zeros(n_cores, dtype=bool)
+        self.rank = np.full(n_cores, -1, dtype=np.int64)
+        self.core_of = np.full(n_cores, -1, dtype=np.int64)
+        self.active = np.zeros(n_sockets, dtype=np.int64)
+
+        # Lowest core of each socket that may be free
+        self._next_free = np.zeros(n_sockets, dtype=np.int64)
+
+        # Process objects, created only when requested
+        self._processes = {}
+
+    # Total number of cores
+    @property
+    def n_cores(self):
+        return len(self.occupied)
+
+    # Method to extend the topology with new (empty) nodes
+    def add_nodes(self, count=1):
+        """Append empty nodes, returning the ID of the first new node."""
+        first = self.nodes
+        n_sockets = count * self.sockets_per_node
+        n_cores = n_sockets * self.cores_per_socket
+        self.nodes += count
+        self.occupied = np.concatenate([self.occupied,
+                                        np.zeros(n_cores, dtype=bool)])
+        self.rank = np.concatenate([self.rank,
+                                    np.full(n_cores, -1, dtype=np.int64)])
+        self.core_of = np.concatenate([self.core_of,
+                                       np.full(n_cores, -1, dtype=np.int64)])
+        self.active = np.concatenate([self.active,
+                                      np.zeros(n_sockets, dtype=np.int64)])
+        self._next_free = np.concatenate([self._next_free,
+                                          np.zeros(n_sockets, dtype=np.int64)])
+        return first
+
+    # Global index of a socket
+    def socket_index(self, node_id, socket_id):
+        if not 0 <= node_id < self.nodes:
+            raise ValueError(f"Node {node_id} does not exist."
+                             f" Only {self.nodes} nodes available.")
+        if not 0 <= socket_id < self.sockets_per_node:
+            raise ValueError(f"Socket {socket_id} does not exist"
+                             f" in node {node_id}. Only"
+                             f" {self.sockets_per_node} sockets available")
+        return node_id * self.sockets_per_node + socket_id
+
+    # Global index of a core
+    def core_index(self, node_id, socket_id, core_id):
+        return (self.socket_index(node_id, socket_id) * self.cores_per_socket
+                + core_id)
+
+    # Method to check if a rank is running on some core
+    def is_assigned(self, rank):
+        return 0 <= rank < self.n_cores and self.core_of[rank] >= 0
+
+    # Method to check that a rank can be assigned
+    def _check_rank(self, rank):
+        if rank < 0 or rank >= self.n_cores:
+            raise ValueError(f"Process ID {rank} is out of range."
+                             f" IDs must be in range [0, {self.n_cores - 1}].")
+        if self.core_of[rank] >= 0:
+            raise ValueError(f"Process ID {rank} has already been assigned.")
+
+    # Method to assign a process to a specific core
+    def assign(self, rank, core):
+        """Place a rank on a given (global) core, returning False if busy."""
+        self._check_rank(rank)
+        if self.occupied[core]:
+            return False
+
+        self.occupied[core] = True
+        self.rank[core] = rank
+        self.core_of[rank] = core
+        self.active[core // self.cores_per_socket] += 1
+        return True
+
+    # Method to add a process to the first free core of a socket
+    def add_process(self, rank, node_id, socket_id):
+        """Place a rank on the first free core of a socket.
+
+        Returns
+        -------
+        int or None
+            The global index of the core, or None if the socket is full.
+        """
+        s = self.socket_index(node_id, socket_id)
+        self._check_rank(rank)
+        if self.active[s] == self.cores_per_socket:
+            return None
+
+        # Amortized O(1): the pointer only moves back when a core is freed
+        first = s * self.cores_per_socket
+        core = first + self._next_free[s]
+        while self.occupied[core]:
+            core += 1
+        self._next_free[s] = core - first + 1
+
+        self.assign(rank, core)
+        return core
+
+    # Method to remove a process
+    def remove_process(self, rank):
+        if not self.is_assigned(rank):
+            return False
+        core = self.core_of[rank]
+        s = core // self.cores_per_socket
+        self.occupied[core] = False
+        self.rank[core] = -1
+        self.core_of[rank] = -1
+        self.active[s] -= 1
+        self._next_free[s] = min(self._next_free[s],
+                                 core - s * self.cores_per_socket)
+        self._processes.pop(rank, None)
+        return True
+
+    # Method to remove all the processes of some nodes
+    def clear(self, nodes=None):
+        """Remove all the processes from the given nodes (all by default)."""
+        if nodes is None:
+            nodes = range(self.nodes)
+        per_node = self.sockets_per_node * self.cores_per_socket
+        for n in nodes:
+            cores = slice(n * per_node, (n + 1) * per_node)
+            ranks = self.rank[cores]
+            ranks = ranks[ranks >= 0]
+            self.core_of[ranks] = -1
+            if self._processes:
+                for rank in ranks.tolist():
+                    self._processes.pop(rank, None)
+            self.occupied[cores] = False
+            self.rank[cores] = -1
+            sockets = slice(n * self.sockets_per_node,
+                            (n + 1) * self.sockets_per_node)
+            self.active[sockets] = 0
+            self._next_free[sockets] = 0
+
+    # Method to place many processes at once according to a mapping policy
+    def place(self, n_processes, mapby='core', nodes=None, release=False):
+        """Place ranks 0, ..., n_processes-1 on (empty) nodes.
+
+        The nodes are first emptied, then the processes are placed as done
+        by `mpirun --map-by`, using array operations only.
+
+        Parameters
+        ----------
+        n_processes : int
+            Number of processes to place.
+        mapby : str, optional
+            The mapping method ('core', 'socket' or 'node'), by default 'core'.
+        nodes : list, optional
+            IDs of the nodes to use, in order, by default all of them.
+        release : bool, optional
+            Empty all the other nodes too, as when a new job is started,
+            instead of raising a ValueError if they hold some of the ranks,
+            by default False.
+
+        Returns
+        -------
+        numpy.ndarray
+            The global index of the core of each rank.
+        """
+        nodes = np.arange(self.nodes) if nodes is None else np.asarray(nodes)
+        if release:
+            busy = self.active.reshape(self.nodes, -1).any(axis=1)
+            self.clear(np.union1d(nodes, np.flatnonzero(busy)).tolist())
+        else:
+            self.clear(nodes.tolist())
+        node, socket, core = placement(n_processes, mapby, len(nodes),
+                                       self.sockets_per_node,
+                                       self.cores_per_socket)
+        if (self.core_of[:n_processes] >= 0).any():
+            raise ValueError("Some process IDs have already been assigned"
+                             " on other nodes.")
+
+        s = nodes[node] * self.sockets_per_node + socket
+        cores = s * self.cores_per_socket + core
+        self.occupied[cores] = True
+        self.rank[cores] = np.arange(n_processes)
+        self.core_of[:n_processes] = cores
+        self.active += np.bincount(s, minlength=len(self.active))
+        self._next_free[:] = 0
+        return cores
+
+    # Method to get the process object of a rank
+    def get_process(self, rank):
+        """The `Process` running as the given rank (None if not assigned)."""
+        if not self.is_assigned(rank):
+            return None
+        process = self._processes.get(rank)
+        if process is None:
+            s, core = divmod(int(self.core_of[rank]), self.cores_per_socket)
+            node, socket = divmod(s, self.sockets_per_node)
+            process = Process(rank, core, socket, node, self.ccx_size)
+            self._processes[rank] = process
+        return process
+
+    # Method to get the node, socket and core of some ranks
+    def locality(self, ranks):
+        """Node, socket and (local) core IDs of the given ranks."""
+        cores = self.core_of[ranks]
+        if np.any(cores < 0):
+            raise ValueError("Some of the processes are not assigned.")
+        s, core = np.divmod(cores, self.cores_per_socket)
+        node, socket = np.divmod(s, self.sockets_per_node)
+        return node, socket, core
+
+    # Method to get the channel used between ranks
+    def channel(self, a, b):
+        """Channel index (see `CHANNELS`) between ranks a and b."""
+        return channel(*self.locality(a), *self.locality(b), self.ccx_size)
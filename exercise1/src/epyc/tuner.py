@@ -0,0 +1,222 @@
+import json
+
+import numpy as np
+
+from .predict import ALGORITHMS, OMPI_ALGORITHMS, predict_grid
+from .schedule import PIPELINED
+from . import NODES, SOCKETS_PER_NODE, CORES_PER_SOCKET, CCX_SIZE
+
+# Algorithm selection tables ───────────────────────────────────────────────────
+
+# Collective IDs used in the coll_tuned dynamic rules files (COLLTYPE_T)
+COLLECTIVE_IDS = {'allgather': 0, 'allreduce': 2, 'alltoall': 3, 'barrier': 6,
+                  'bcast': 7, 'gather': 9, 'reduce': 11, 'reduce_scatter': 12,
+                  'scatter': 15}
+
+# Collectives whose coll_tuned message size is the block of each process
+# times the size of the communicator (the predictions use the block)
+PER_PROCESS = ['allgather', 'alltoall', 'gather', 'scatter']
+
+
+# Message size used by coll_tuned for a predicted size
+def _ompi_size(collective, size, n_processes):
+    return size * n_processes if collective in PER_PROCESS else size
+
+
+# Size rules of one communicator size, as (message size, algorithm) runs
+def _size_rules(collective, best, sizes, n_processes):
+    known = np.flatnonzero(best >= 0)
+    if len(known) == 0:
+        return ((0, -1),)
+
+    # Sizes without a prediction keep the choice of the previous size (or of
+    # the next one, below the first prediction)
+    last = np.searchsorted(known, np.arange(len(best)), side='right') - 1
+    best = best[known[np.maximum(last, 0)]]
+    starts = np.flatnonzero(np.r_[True, best[1:] != best[:-1]])
+    return tuple((0 if z == 0 else _ompi_size(collective, int(sizes[z]),
+                                              n_processes), int(best[z]))
+                 for z in starts)
+
+
+# Build the decision table of a collective
+def tune(collective, sizes=None, nprocs=None, mapby='core', cluster=None,
+         statistic='latency', loss='ols', weights=None):
+    """Fastest predicted algorithm of a collective over a dense grid.
+
+    The latency of every algorithm of the collective is predicted with
+    `predict_grid` for all the sizes and numbers of processes at once, and
+    the fastest one is picked for each point. The choices are then
+    compressed in ranges: for each number of processes, the message sizes
+    are split in runs with the same algorithm, and consecutive numbers of
+    processes with the same runs are merged.
+
+    Parameters
+    ----------
+    collective : str
+        The collective, one of `OMPI_ALGORITHMS` (e.g. 'bcast', 'allreduce').
+    sizes : array_like, optional
+        Message sizes in bytes, by default the powers of two from 1 B to
+        1 MiB (the sizes measured by the OSU benchmarks).
+    nprocs : array_like, optional
+        Numbers of processes, by default all of them from 2 up to the number
+        of cores of the cluster.
+    mapby : str, optional
+        The mapping method ('core', 'socket' or 'node'), by default 'core'.
+    cluster : Cluster, optional
+        The cluster whose shape is used to place the processes, by default
+        the AMD EPYC nodes described by the constants of the module.
+    statistic : str, optional
+        The minimized statistic, 'latency' (mean, default) or a tail
+        percentile such as 'p99' (see `predict_grid`).
+    loss, weights : str, optional
+        The loss and the weights of the fitted model, by default unweighted
+        least squares (see `predict_grid`).
+
+    Returns
+    -------
+    dict
+        The decision table, with the 'collective', the 'mapby', the
+        minimized 'statistic', the 'loss' and 'weights' of the model, the
+        shape of the 'machine' and the 'rules': a list of communicator
+        ranges ('min_procs', 'max_procs') each with its list of message size
+        rules ('min_size', 'algorithm', 'id', 'segsize'). Message sizes are the ones used by `coll_tuned` (the
+        block of each process times the number of processes for allgather,
+        alltoall, gather and scatter), a rule applies from its 'min_size' up
+        to the next one, and the algorithm 'id' 0 leaves the choice to the
+        fixed `coll_tuned` rules (no prediction available).
+
+    Examples
+    --------
+    >>> table = tune('bcast', mapby='node')
+    >>> select(table, 1024, 64)
+    """
+    if collective not in OMPI_ALGORITHMS:
+        raise ValueError(f"Invalid collective: {collective}."
+                         f" Use one of {list(OMPI_ALGORITHMS)}.")
+    if cluster is None:
+        machine = (NODES, SOCKETS_PER_NODE, CORES_PER_SOCKET, CCX_SIZE)
+    else:
+        t = cluster.topology
+        machine = (t.nodes, t.sockets_per_node, t.cores_per_socket, t.ccx_size)
+    if sizes is None:
+        sizes = [2**i for i in range(21)]
+    if nprocs is None:
+        nprocs = range(2, machine[0] * machine[1] * machine[2] + 1)
+    sizes = np.unique(np.asarray(sizes, dtype=int))
+    nprocs = np.unique(np.asarray(nprocs, dtype=int))
+    if len(sizes) == 0 or len(nprocs) == 0:
+        raise ValueError("Empty grid of sizes or numbers of processes.")
+
+    # Fastest algorithm of every point (-1 where nothing can be predicted)
+    ids = list(OMPI_ALGORITHMS[collective])
+    names = [OMPI_ALGORITHMS[collective][i] for i in ids]
+    latency = predict_grid(names, sizes, nprocs, [mapby],
+                           cluster=cluster, statistic=statistic, loss=loss,
+                           weights=weights)[..., 0]
+    valid = ~np.isnan(latency)
+    best = np.where(valid.any(axis=0),
+                    np.argmin(np.where(valid, latency, np.inf), axis=0), -1)
+
+    # Merge consecutive numbers of processes with the same size rules
+    ranges = []
+    for j, n_processes in enumerate(nprocs.tolist()):
+        rules = _size_rules(collective, best[:, j], sizes, n_processes)
+        if ranges and ranges[-1][2] == rules:
+            ranges[-1][1] = n_processes
+        else:
+            ranges.append([n_processes, n_processes, rules])
+
+    segsize = [PIPELINED.get(ALGORITHMS[name][0], 0) for name in names]
+    return {
+        'collective': collective,
+        'mapby': mapby,
+        'statistic': statistic,
+        'loss': loss,
+        'weights': weights,
+        'machine': dict(zip(['nodes', 'sockets_per_node', 'cores_per_socket',
+                             'ccx_size'], machine)),
+        'rules': [{
+            'min_procs': first,
+            'max_procs': last,
+            'sizes': [{
+                'min_size': size,
+                'algorithm': names[a] if a >= 0 else None,
+                'id': ids[a] if a >= 0 else 0,
+                'segsize': segsize[a] if a >= 0 else 0,
+            } for size, a in rules],
+        } for first, last, rules in ranges],
+    }
+
+
+# Algorithm chosen by a decision table
+def select(table, size, n_processes):
+    """Algorithm of a decision table for a message size and communicator.
+
+    Parameters
+    ----------
+    table : dict
+        A decision table returned by `tune` (or loaded from its JSON file).
+    size : int
+        Message size in bytes, as used by `coll_tuned` (see `tune`).
+    n_processes : int
+        Number of processes.
+
+    Returns
+    -------
+    str or None
+        The name of the algorithm, None when the choice is left to the
+        fixed `coll_tuned` rules.
+    """
+    rules = [r for r in table['rules'] if r['min_procs'] <= n_processes]
+    if not rules:
+        return None
+    sizes = [r for r in rules[-1]['sizes'] if r['min_size'] <= size]
+    return sizes[-1]['algorithm'] if sizes else None
+
+
+# Write the decision tables as a coll_tuned dynamic rules file
+def write_rules(tables, path):
+    """Write decision tables as an Open MPI `coll_tuned` dynamic rules file.
+
+    The file is used by Open MPI with `--mca coll_tuned_use_dynamic_rules 1
+    --mca coll_tuned_dynamic_rules_filename <path>`.
+
+    Parameters
+    ----------
+    tables : list
+        Decision tables returned by `tune`, at most one per collective.
+    path : str
+        Path of the rules file.
+    """
+    tables = sorted(tables, key=lambda t: COLLECTIVE_IDS[t['collective']])
+    collectives = [t['collective'] for t in tables]
+    if len(set(collectives)) < len(collectives):
+        raise ValueError("At most one decision table per collective.")
+
+    lines = [f"{len(tables)}  # number of collectives"]
+    for table in tables:
+        lines += [f"{COLLECTIVE_IDS[table['collective']]}"
+                  f"  # {table['collective']} (mapby {table['mapby']})",
+                  f"{len(table['rules'])}  # number of communicator sizes"]
+        for rule in table['rules']:
+            lines += [f"{rule['min_procs']}  # communicator size",
+                      f"{len(rule['sizes'])}  # number of message sizes"]
+            lines += [f"{r['min_size']} {r['id']} 0 {r['segsize']}"
+                      for r in rule['sizes']]
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+# Write the decision tables as JSON
+def write_table(tables, path):
+    """Write decision tables returned by `tune` to a JSON file."""
+    with open(path, 'w') as f:
+        json.dump(list(tables), f, indent=2)
+
+
+# Load the decision tables written by write_table
+def load_table(path):
+    """Load the decision tables written by `write_table`."""
+    with open(path) as f:
+        return json.load(f)
@@ -2,7 +2,9 @@ __version__ = '0.1.0'
 
 # Mpdule imports ───────────────────────────────────────────────────────────────
 
-from .preprocessing import preproc
+from .preprocessing import preproc, derive_features, MeasurementStore
+from .osu import convert, read_osu
 from .plot import latency_vs_size, latency_vs_cores
 
-__all__ = ['preproc', 'latency_vs_size', 'latency_vs_cores']
\ No newline at end of file
+__all__ = ['preproc', 'derive_features', 'MeasurementStore', 'convert',
+           'read_osu', 'latency_vs_size', 'latency_vs_cores']
\ No newline at end of file
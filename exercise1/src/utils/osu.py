@@ -0,0 +1,499 @@
+import argparse
+import gzip
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Streaming parser of the OSU benchmarks output ────────────────────────────────
+# The job scripts write a header line before every run of a benchmark, followed
+# by the output of the benchmark itself. The files are read line by line and
+# the rows are collected in fixed size batches of typed arrays, so that the
+# memory used does not depend on the size of the logs.
+
+# Header of the collective runs (bcast.job, reduce.job, nbft.job):
+# algorithm, mapping and number of processes
+COLLECTIVE_HEADER = re.compile(r'A:\s*(\d+)\s*\|\s*M:\s*(\w+)\s*\|\s*C:\s*(\d+)')
+
+# Header of the point-to-point runs (latency.job): test, mapping, cores of
+# the two processes and number of iterations
+P2P_HEADER = re.compile(r'T:\s*([\w.]+)\s*\|\s*M:\s*(\w+)\s*\|\s*'
+                        r'C:\s*(\d+)\s*,\s*(\d+)\s*\|\s*I:\s*(\d+)')
+
+# Fields of the data lines, all the shorter layouts being their prefixes
+# (collectives run with -f -z, -f or neither, osu_latency with -z or not)
+P2P_FIELDS = ['size', 'latency', 'p50', 'p95', 'p99']
+COLLECTIVE_FIELDS = ['size', 'latency', 'min', 'max', 'iterations',
+                     'p50', 'p95', 'p99']
+LAYOUTS = {'p2p': (2, 5), 'collective': (2, 5, 8)}
+
+# Columns of the converted datasets and their types
+SCHEMAS = {
+    'p2p': {'mapby': 'category', 'size': 'int64', 'latency': 'float64',
+            'iterations': 'int64', 'p50': 'float64', 'p95': 'float64',
+            'p99': 'float64', 'recv': 'int64'},
+    'nbft': {'mapby': 'category', 'p': 'int64', 'comm': 'int64',
+             'size': 'int64', 'latency': 'float64', 'min': 'float64',
+             'max': 'float64', 'iterations': 'int64', 'p50': 'float64',
+             'p95': 'float64', 'p99': 'float64'},
+    'collective': {'algorithm': 'int64', 'mapby': 'category',
+                   'cores': 'int64', 'size': 'int64', 'latency': 'float64',
+                   'min': 'float64', 'max': 'float64', 'iterations': 'int64',
+                   'p50': 'float64', 'p95': 'float64', 'p99': 'float64'},
+}
+
+# Default number of rows of a batch
+BATCH_SIZE = 65536
+
+# Fields of the data lines that must be ordered (min <= max, p50 <= p95 <= p99)
+ORDERED = {'p2p': [(2, 3), (3, 4)],
+           'collective': [(2, 3), (5, 6), (6, 7)]}
+
+# Output formats, by file extension
+FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.arrow': 'arrow',
+           '.feather': 'arrow'}
+
+
+# Open a text file, compressed with gzip or not
+def _open(path):
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(path, 'rt')
+    return open(path, 'r')
+
+
+# Reason why the numbers of a data line are not a valid measurement
+def _invalid(numbers, ordered):
+    if any(not math.isfinite(x) or x < 0 for x in numbers):
+        return "negative or non-finite value"
+    if not numbers[0].is_integer():
+        return "non-integer size"
+    for i, j in ordered:
+        if j < len(numbers) and numbers[i] > numbers[j]:
+            return "unordered statistics"
+    return None
+
+
+# Typed dataframe of the rows of a batch
+def _frame(kind, values, run, runs):
+    def header(i, cast=str):
+        return np.array([cast(r[i]) for r in runs])[run]
+
+    def integer(column):
+        return np.nan_to_num(column, nan=0.).astype('int64')
+
+    if kind == 'p2p':
+        columns = dict(zip(P2P_FIELDS, values.T))
+        data = {'mapby': header(1), 'size': columns['size'],
+                'latency': columns['latency'],
+                'iterations': header(4, int), 'p50': columns['p50'],
+                'p95': columns['p95'], 'p99': columns['p99'],
+                'recv': header(3, int)}
+    else:
+        columns = dict(zip(COLLECTIVE_FIELDS, values.T))
+        cores = header(2, int)
+        data = {'algorithm': header(0, int), 'mapby': header(1), 'p': cores,
+                'cores': cores, 'comm': cores - 1}
+        data.update(columns, iterations=integer(columns['iterations']))
+    data['size'] = integer(data['size'])
+    return pd.DataFrame({column: pd.Series(data[column]).astype(dtype)
+                         for column, dtype in SCHEMAS[kind].items()})
+
+
+# Parse OSU output files in batches
+def iter_batches(paths, kind, batch_size=BATCH_SIZE):
+    """Parse OSU benchmark output files in a single streaming pass.
+
+    The files are read line by line: every data line is attributed to the
+    last header line met in its file (``A:<algorithm>|M:<mapby>|C:<cores>``
+    for the collectives, ``T:<test>|M:<mapby>|C:<core>,<core>|I:<iterations>``
+    for osu_latency) and the rows are returned in batches of typed columns.
+    Every data line is validated while parsed: its numbers must be finite,
+    non-negative, with an integer size and ordered statistics (min <= max,
+    p50 <= p95 <= p99), otherwise a ValueError reports the file and line.
+
+    Parameters
+    ----------
+    paths : str or list
+        Output file(s) of the job scripts, plain text or gzip compressed.
+    kind : str
+        The layout of the rows, 'p2p', 'nbft' or 'collective' (see
+        `SCHEMAS`).
+    batch_size : int, optional
+        Maximum number of rows of a batch, by default `BATCH_SIZE`.
+
+    Yields
+    ------
+    pandas.DataFrame
+        The rows of each batch, with the columns of `SCHEMAS[kind]`. Fields
+        missing from the output (e.g. the percentiles without ``-z``) are NaN
+        (0 for the iterations).
+
+    Examples
+    --------
+    >>> for batch in iter_batches(['outputs/nbft.txt.gz'], 'nbft'):
+    ...     print(batch['latency'].mean())
+    """
+    if kind not in SCHEMAS:
+        raise ValueError(f"Invalid kind: {kind}. Use one of {list(SCHEMAS)}.")
+    if batch_size < 1:
+        raise ValueError("The batch size must be positive.")
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    pattern = P2P_HEADER if kind == 'p2p' else COLLECTIVE_HEADER
+    layout = LAYOUTS['p2p' if kind == 'p2p' else 'collective']
+    ordered = ORDERED['p2p' if kind == 'p2p' else 'collective']
+
+    # Measured values and run (index in runs) of every row of the batch
+    values = np.empty((batch_size, layout[-1]))
+    run = np.empty(batch_size, dtype=int)
+    runs, n = [], 0
+
+    for path in paths:
+        header = None
+        with _open(path) as f:
+            for number, line in enumerate(f, start=1):
+                if not line[:1].isdigit():
+                    match = pattern.search(line)
+                    if match:
+                        header = match.groups()
+                    continue
+                if header is None:
+                    continue  # Data without a run to attribute it to
+
+                fields = line.split()
+                if len(fields) not in layout:
+                    raise ValueError(f"{path}:{number}: unexpected data line"
+                                     f" {line.strip()!r}.")
+                try:
+                    numbers = [float(x) for x in fields]
+                except ValueError:
+                    raise ValueError(f"{path}:{number}: invalid number in"
+                                     f" {line.strip()!r}.") from None
+                reason = _invalid(numbers, ordered)
+                if reason:
+                    raise ValueError(f"{path}:{number}: {reason} in"
+                                     f" {line.strip()!r}.")
+                values[n, :len(numbers)] = numbers
+                values[n, len(numbers):] = np.nan
+                if not runs or runs[-1] is not header:
+                    runs.append(header)
+                run[n] = len(runs) - 1
+                n += 1
+
+                if n == batch_size:
+                    yield _frame(kind, values.copy(), run, runs)
+                    runs, n = [], 0
+
+    if n > 0:
+        yield _frame(kind, values[:n], run[:n], runs)
+
+
+# Parse OSU output files at once
+def read_osu(paths, kind):
+    """Parse OSU benchmark output files into a single dataframe.
+
+    Parameters
+    ----------
+    paths : str or list
+        Output file(s) of the job scripts, plain text or gzip compressed.
+    kind : str
+        The layout of the rows, 'p2p', 'nbft' or 'collective'.
+
+    Returns
+    -------
+    pandas.DataFrame
+        All the rows, with the columns of `SCHEMAS[kind]`.
+    """
+    frames = list(iter_batches(paths, kind))
+    if not frames:
+        return pd.DataFrame({column: pd.Series(dtype=dtype)
+                             for column, dtype in SCHEMAS[kind].items()})
+    df = pd.concat(frames, ignore_index=True)
+    return df.astype({'mapby': 'category'})
+
+
+# Arrow schema of a kind of rows
+def _arrow_schema(kind):
+    import pyarrow as pa
+
+    types = {'int64': pa.int64(), 'float64': pa.float64(),
+             'category': pa.string()}
+    return pa.schema([(column, types[dtype])
+                      for column, dtype in SCHEMAS[kind].items()])
+
+
+# Write batches of rows to a file
+def write_batches(batches, output, kind, fmt=None):
+    """Write batches of rows to a CSV, Parquet or Arrow file, one at a time.
+
+    Parameters
+    ----------
+    batches : iterable
+        Dataframes with the columns of `SCHEMAS[kind]`.
+    output : str
+        Path of the output file, written only once complete.
+    kind : str
+        The layout of the rows, 'p2p', 'nbft' or 'collective'.
+    fmt : str, optional
+        'csv', 'parquet' or 'arrow' (IPC file), by default deduced from the
+        extension of `output`. Parquet and Arrow require `pyarrow`.
+
+    Returns
+    -------
+    int
+        The number of rows written.
+    """
+    if fmt is None:
+        fmt = FORMATS.get(os.path.splitext(output)[1])
+    if fmt not in FORMATS.values():
+        raise ValueError(f"Invalid format of {output}."
+                         f" Use one of {sorted(set(FORMATS.values()))}.")
+
+    rows = 0
+    tmp = f'{output}.{os.getpid()}.tmp'
+    try:
+        if fmt == 'csv':
+            with open(tmp, 'w', newline='') as f:
+                f.write(','.join(SCHEMAS[kind]) + '\n')
+                for batch in batches:
+                    batch.to_csv(f, header=False, index=False)
+                    rows += len(batch)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = _arrow_schema(kind)
+            if fmt == 'parquet':
+                writer = pq.ParquetWriter(tmp, schema)
+            else:
+                writer = pa.ipc.new_file(tmp, schema)
+            with writer:
+                for batch in batches:
+                    table = pa.Table.from_pandas(
+                        batch.astype({'mapby': str}), schema=schema,
+                        preserve_index=False)
+                    writer.write_table(table)
+                    rows += len(batch)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, output)
+    return rows
+
+
+# Convert OSU output files
+def convert(paths, output, kind, fmt=None, batch_size=BATCH_SIZE):
+    """Convert OSU benchmark output files to a typed dataset file.
+
+    The files are parsed and written batch by batch (see `iter_batches` and
+    `write_batches`), so logs of any size are converted in bounded memory.
+
+    Parameters
+    ----------
+    paths : str or list
+        Output file(s) of the job scripts, plain text or gzip compressed.
+    output : str
+        Path of the dataset file (.csv, .parquet, .arrow or .feather).
+    kind : str
+        The layout of the rows, 'p2p', 'nbft' or 'collective'.
+    fmt : str, optional
+        'csv', 'parquet' or 'arrow', by default deduced from the extension.
+    batch_size : int, optional
+        Maximum number of rows held in memory, by default `BATCH_SIZE`.
+
+    Returns
+    -------
+    int
+        The number of rows written.
+
+    Examples
+    --------
+    >>> convert(['outputs/nbft.txt', 'outputs/nbft_node.txt.gz'],
+    ...         'datasets/nbft.parquet', 'nbft')
+    """
+    return write_batches(iter_batches(paths, kind, batch_size), output, kind,
+                         fmt)
+
+
+# Parallel ingestion of many output files ─────────────────────────────────────
+# Every output file (e.g. one per task of a job array) is parsed by a worker
+# process, the runs measured more than once are deduplicated and the rows are
+# merged in a dataset partitioned by mapping: one file per mapping, sorted by
+# the key of the runs.
+
+# Columns identifying a measurement of each kind of dataset
+KEYS = {'p2p': ['mapby', 'recv', 'size'],
+        'nbft': ['mapby', 'p', 'size'],
+        'collective': ['mapby', 'cores', 'size', 'algorithm']}
+
+
+# Name of the file holding a partition of a dataset
+def _partition(output, mapby, fmt):
+    return os.path.join(output, f'{mapby}.{fmt}')
+
+
+# Merge the rows parsed from many files
+def _merge(frames, kind):
+    # Files in sorted order: a measurement repeated in a later file (or later
+    # in the same file) replaces the previous one
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates(KEYS[kind], keep='last')
+    df = df.astype({'mapby': str}).sort_values(KEYS[kind], kind='stable')
+    return df.reset_index(drop=True)
+
+
+# Parse and merge many output files with a process pool
+def ingest(paths, output, kind, workers=None, fmt='csv'):
+    """Ingest many OSU output files into a dataset partitioned by mapping.
+
+    The files are parsed (and validated, see `iter_batches`) concurrently by
+    a pool of worker processes. The rows are then merged: the measurements
+    repeated in more files (same `KEYS[kind]`, e.g. mapping, cores, size and
+    algorithm of a collective) are deduplicated deterministically, keeping
+    the last one in the sorted order of the paths, and every mapping is
+    written to its own file of the output directory (replacing the previous
+    content of the dataset).
+
+    Parameters
+    ----------
+    paths : list
+        Output files of the job scripts, plain text or gzip compressed.
+    output : str
+        Directory of the dataset.
+    kind : str
+        The layout of the rows, 'p2p', 'nbft' or 'collective'.
+    workers : int, optional
+        Number of worker processes, by default the number of CPUs.
+    fmt : str, optional
+        Format of the partitions, 'csv', 'parquet' or 'arrow', by default
+        'csv'.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The merged dataset (see `load_dataset`).
+
+    Examples
+    --------
+    >>> ingest(glob.glob('outputs/bcast-*.txt.gz'), 'datasets/bcast',
+    ...        'collective', workers=8)
+    >>> load_dataset('datasets/bcast', mapby='core')
+    """
+    if kind not in SCHEMAS:
+        raise ValueError(f"Invalid kind: {kind}. Use one of {list(SCHEMAS)}.")
+    if fmt not in FORMATS.values():
+        raise ValueError(f"Invalid format: {fmt}."
+                         f" Use one of {sorted(set(FORMATS.values()))}.")
+    paths = sorted(set(os.fspath(path) for path in paths))
+
+    if workers == 1 or len(paths) <= 1:
+        frames = [read_osu(path, kind) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            frames = list(executor.map(read_osu, paths,
+                                       [kind] * len(paths)))
+    df = _merge(frames or [read_osu([], kind)], kind)
+
+    # Write the partitions, then drop the ones of a previous ingestion
+    os.makedirs(output, exist_ok=True)
+    written = set()
+    for mapby, partition in df.groupby('mapby', sort=True):
+        path = _partition(output, mapby, fmt)
+        write_batches([partition], path, kind, fmt)
+        written.add(path)
+    for name in os.listdir(output):
+        path = os.path.join(output, name)
+        if name.endswith(f'.{fmt}') and path not in written:
+            os.remove(path)
+
+    return load_dataset(output, fmt)
+
+
+# Load a dataset written by ingest
+def load_dataset(output, fmt='csv', mapby=None):
+    """Load a dataset written by `ingest`, or only some of its mappings.
+
+    Parameters
+    ----------
+    output : str
+        Directory of the dataset.
+    fmt : str, optional
+        Format of the partitions, 'csv', 'parquet' or 'arrow', by default
+        'csv'.
+    mapby : str or list, optional
+        Mapping(s) to load, by default all of them. Only their partitions are
+        read.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The rows, with the columns and types of the corresponding
+        `SCHEMAS` layout.
+    """
+    if mapby is None:
+        names = sorted(f for f in os.listdir(output) if f.endswith(f'.{fmt}'))
+        paths = [os.path.join(output, f) for f in names]
+    else:
+        mapbys = [mapby] if isinstance(mapby, str) else list(mapby)
+        paths = [_partition(output, m, fmt) for m in mapbys]
+        paths = [path for path in paths if os.path.exists(path)]
+
+    if fmt == 'csv':
+        frames = [pd.read_csv(path) for path in paths]
+    elif fmt == 'parquet':
+        frames = [pd.read_parquet(path) for path in paths]
+    else:
+        frames = [pd.read_feather(path) for path in paths]
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    for schema in SCHEMAS.values():
+        if list(schema) == list(df.columns):
+            df = df.astype(schema)
+    return df
+
+
+# Command line interface
+def main(argv=None):
+    """Command line interface of `convert`."""
+    parser = argparse.ArgumentParser(
+        description='Convert the output of the OSU benchmark jobs to typed'
+                    ' CSV, Parquet or Arrow datasets.')
+    parser.add_argument('kind', choices=list(SCHEMAS),
+                        help='layout of the rows')
+    parser.add_argument('output',
+                        help='dataset file (.csv, .parquet, .arrow, .feather)'
+                             ' or directory (--ingest)')
+    parser.add_argument('inputs', nargs='+',
+                        help='OSU output files (plain text or gzip)')
+    parser.add_argument('--format', choices=sorted(set(FORMATS.values())),
+                        help='output format (default: from the extension)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='maximum number of rows held in memory')
+    parser.add_argument('--ingest', action='store_true',
+                        help='parse the inputs in parallel, deduplicate the'
+                             ' runs and write a dataset directory'
+                             ' partitioned by mapping')
+    parser.add_argument('--workers', type=int,
+                        help='worker processes of --ingest (default: CPUs)')
+    args = parser.parse_args(argv)
+
+    if args.ingest:
+        df = ingest(args.inputs, args.output, args.kind, args.workers,
+                    args.format or 'csv')
+        print(f"{len(df)} rows written to {args.output}")
+        return
+    rows = convert(args.inputs, args.output, args.kind, args.format,
+                   args.batch_size)
+    print(f"{rows} rows written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
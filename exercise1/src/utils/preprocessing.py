@@ -56,14 +56,281 @@ def merge(*dfs):
     # Merge the dataframes
     df = pd.concat(dflist)
 
-    # Create a dummy variable for the 'mapby' column
-    mapby_dummies = pd.get_dummies(df['mapby'], prefix='mapby', drop_first=False).astype(int)
-    df = pd.concat([df, mapby_dummies], axis=1)
-
-    # Create interaction terms
-    df['cores_mapby_node'] = df['cores'] * df['mapby_node']
-    df['cores_mapby_socket'] = df['cores'] * df['mapby_socket']
-    df['cores_mapby_core'] = df['cores'] * df['mapby_core']
+    # Create a dummy variable for the 'mapby' column and interaction terms
+    dummies = [f'mapby_{m}' for m in sorted(df['mapby'].unique())]
+    df = derive_features(df, dummies + ['cores_mapby_node',
+                                        'cores_mapby_socket',
+                                        'cores_mapby_core'])
 
     return df
 
+
+# Measurement store ────────────────────────────────────────────────────────────
+# The measurements of each mapping are read only when a query needs them and
+# kept sorted by (algorithm, cores, size), so that a query only matches the
+# few distinct keys and finds the ranges of the selected rows with binary
+# searches: only the rows inside them are ever copied
+
+# Sort keys of the rows of a mapping (the mapping itself is the partition)
+LEVELS = ['algorithm', 'cores', 'size']
+
+# Keys that can be queried
+KEYS = ['algorithm', 'mapby', 'cores', 'size']
+
+
+# Read and sort the measurements of one mapping
+def _load_partition(source, mapping):
+    df = source if isinstance(source, pd.DataFrame) else pd.read_csv(source)
+    df = df.assign(mapby=mapping).astype({
+        'algorithm': 'int64', 'size': 'int64', 'latency': 'float64',
+        'min': 'float64', 'max': 'float64', 'iterations': 'int64',
+        'cores': 'int64'})
+    return df.sort_values(LEVELS, kind='stable')
+
+
+# Index of the sorted measurements of a mapping
+def _index(df):
+    """Keys of the (algorithm, cores) groups of rows and code of the rows.
+
+    The code of a row is its group times the number of distinct sizes plus
+    the rank of its size, so it increases along the sorted rows and the rows
+    of any size range of any group are found by binary searches.
+    """
+    algorithm, cores, size = (df[level].to_numpy() for level in LEVELS)
+    starts = np.flatnonzero(np.r_[True, (algorithm[1:] != algorithm[:-1])
+                                        | (cores[1:] != cores[:-1])])
+    sizes = np.unique(size)
+    group = np.repeat(np.arange(len(starts)),
+                      np.diff(np.r_[starts, len(size)]))
+    return {'algorithm': algorithm[starts], 'cores': cores[starts],
+            'sizes': sizes, 'code': group * len(sizes) +
+            np.searchsorted(sizes, size)}
+
+
+# Mask of the (few) distinct keys matching a predicate
+def _match(values, predicate):
+    if predicate is None:
+        return np.ones(len(values), dtype=bool)
+    if isinstance(predicate, slice):
+        mask = np.ones(len(values), dtype=bool)
+        if predicate.start is not None:
+            mask &= values >= predicate.start
+        if predicate.stop is not None:
+            mask &= values <= predicate.stop
+        return mask
+    return np.isin(values, np.atleast_1d(predicate))
+
+
+def derive_features(df, columns=None, mappings=None):
+    """Derived regression features of the measurements.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The measurements, with the 'mapby' and 'cores' columns.
+    columns : list of str, optional
+        The features to compute, among the dummy variables of the mappings
+        ('mapby_<mapping>') and their interactions with the number of cores
+        ('cores_mapby_<mapping>'). By default all of them.
+    mappings : list of str, optional
+        The mappings with a dummy variable, by default the categories of the
+        'mapby' column (or its distinct values).
+
+    Returns
+    -------
+    pandas.DataFrame
+        A copy of the dataframe with the requested features added.
+
+    Examples
+    --------
+    >>> derive_features(df, ['mapby_node', 'cores_mapby_node'])
+    """
+    if mappings is None:
+        mappings = list(df['mapby'].cat.categories) \
+            if isinstance(df['mapby'].dtype, pd.CategoricalDtype) \
+            else sorted(df['mapby'].unique())
+    available = [f'mapby_{m}' for m in mappings] + \
+                [f'cores_mapby_{m}' for m in mappings]
+    if columns is None:
+        columns = available
+    invalid = set(columns) - set(available)
+    if invalid:
+        raise ValueError(f"Invalid features: {sorted(invalid)}."
+                         f" Use some of {available}.")
+
+    mapby = df['mapby'].to_numpy(dtype=object)
+    derived = {}
+    for column in columns:
+        dummy = (mapby == column.split('mapby_', 1)[1]).astype(int)
+        derived[column] = dummy * df['cores'].to_numpy() \
+            if column.startswith('cores_') else dummy
+    return df.assign(**derived)
+
+
+class MeasurementStore:
+    """Indexed store of the collective measurements.
+
+    The measurements of every mapping are read lazily, the first time a
+    query selects that mapping, and indexed by (algorithm, cores, size).
+    Queries are lazy too: `select` only records the predicates, and the
+    selected rows are looked up by binary searches when the result is
+    materialized, without scanning the whole dataset.
+
+    Parameters
+    ----------
+    sources : dict
+        The csv file (or dataframe) of the measurements of each mapping.
+
+    Examples
+    --------
+    >>> store = MeasurementStore({'core': 'datasets/bcast_core.csv',
+    ...                           'socket': 'datasets/bcast_socket.csv',
+    ...                           'node': 'datasets/bcast_node.csv'})
+    >>> store.select(algorithm=1, mapby='core', size=slice(1, 1024)).frame()
+    """
+
+    def __init__(self, sources):
+        self.sources = dict(sources)
+        self._partitions = {}
+
+    # Store of a dataframe with a 'mapby' column
+    @classmethod
+    def from_frame(cls, df):
+        """Build a store from the measurements of all the mappings."""
+        return cls({m: df[df['mapby'] == m].drop(columns='mapby')
+                    for m in df['mapby'].unique()})
+
+    @property
+    def mappings(self):
+        """The mappings of the measurements in the store."""
+        return list(self.sources)
+
+    # Sorted measurements and index of a mapping, read on first use
+    def _partition(self, mapping):
+        if mapping not in self._partitions:
+            df = _load_partition(self.sources[mapping], mapping)
+            df['mapby'] = pd.Categorical(df['mapby'], self.mappings)
+            self._partitions[mapping] = (df, _index(df))
+        return self._partitions[mapping]
+
+    # Positions of the rows of a mapping matching the predicates
+    def _rows(self, mapping, predicates):
+        _, index = self._partition(mapping)
+        groups = np.flatnonzero(
+            _match(index['algorithm'], predicates.get('algorithm'))
+            & _match(index['cores'], predicates.get('cores')))
+        ranks = np.flatnonzero(_match(index['sizes'], predicates.get('size')))
+        if not len(groups) or not len(ranks):
+            return np.empty(0, dtype=int)
+
+        # Runs of consecutive sizes, searched in every selected group
+        cuts = np.flatnonzero(np.diff(ranks) > 1) + 1
+        lo = ranks[np.r_[0, cuts]]
+        hi = ranks[np.r_[cuts, len(ranks)] - 1]
+        base = groups[:, None] * len(index['sizes'])
+        starts = np.searchsorted(index['code'], (base + lo).ravel(), 'left')
+        stops = np.searchsorted(index['code'], (base + hi).ravel(), 'right')
+
+        lengths = stops - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(lengths.sum())
+
+    def select(self, **predicates):
+        """Lazy selection of the measurements.
+
+        Parameters
+        ----------
+        **predicates
+            Constraints on the keys 'algorithm', 'mapby', 'cores' and 'size':
+            a single value, a list of values or a ``slice(lo, hi)`` of the
+            values between lo and hi (both included, either can be None).
+
+        Returns
+        -------
+        Selection
+            The selection, evaluated only when it is materialized.
+        """
+        return Selection(self, {})._with(predicates)
+
+
+class Selection:
+    """Lazy selection of the measurements of a `MeasurementStore`.
+
+    Materialize it with `frame` (or `len`); only the selected mappings are
+    read and only the selected rows are copied.
+    """
+
+    def __init__(self, store, predicates):
+        self.store = store
+        self.predicates = predicates
+
+    # Selection with more predicates
+    def _with(self, predicates):
+        invalid = set(predicates) - set(KEYS)
+        if invalid:
+            raise ValueError(f"Invalid keys: {sorted(invalid)}."
+                             f" Use some of {KEYS}.")
+        repeated = set(predicates) & set(self.predicates)
+        if repeated:
+            raise ValueError(f"Keys already selected: {sorted(repeated)}.")
+        mapby = predicates.get('mapby')
+        if mapby is not None and not isinstance(mapby, slice):
+            unknown = set(np.atleast_1d(mapby).tolist()) \
+                - set(self.store.mappings)
+            if unknown:
+                raise ValueError(f"Invalid mappings: {sorted(unknown)}."
+                                 f" Use some of {self.store.mappings}.")
+        return Selection(self.store, {**self.predicates, **predicates})
+
+    def where(self, **predicates):
+        """Narrow down the selection with predicates on other keys."""
+        return self._with(predicates)
+
+    # Mappings of the selection
+    def _mappings(self):
+        mapby = self.predicates.get('mapby')
+        if mapby is None:
+            return self.store.mappings
+        if isinstance(mapby, slice):
+            raise ValueError("Select the mappings by value, not by range.")
+        mappings = set(np.atleast_1d(mapby).tolist())
+        return [m for m in self.store.mappings if m in mappings]
+
+    def __len__(self):
+        return sum(len(self.store._rows(m, self.predicates))
+                   for m in self._mappings())
+
+    def frame(self, features=None):
+        """Materialize the selection.
+
+        Parameters
+        ----------
+        features : bool or list of str, optional
+            The derived regression features to add (see `derive_features`),
+            True for all of them, by default none.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The selected measurements sorted by mapping, algorithm, cores and
+            size, with the 'mapby' column as a categorical of all the mappings
+            of the store.
+        """
+        frames = []
+        for mapping in self._mappings():
+            df, _ = self.store._partition(mapping)
+            rows = self.store._rows(mapping, self.predicates)
+            if len(rows) and rows[-1] - rows[0] == len(rows) - 1:
+                frames.append(df.iloc[rows[0]:rows[-1] + 1])
+            else:
+                frames.append(df.iloc[rows])
+        if frames:
+            df = pd.concat(frames)
+        else:
+            df = _load_partition(pd.DataFrame(columns=[
+                'algorithm', 'cores', 'iterations', 'size', 'latency', 'min',
+                'max']), None)
+            df['mapby'] = pd.Categorical(df['mapby'], self.store.mappings)
+        if features is None or features is False:
+            return df
+        return derive_features(df, None if features is True else features)